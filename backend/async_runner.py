@@ -0,0 +1,135 @@
+"""
+Background Async Runner
+
+One long-lived asyncio event loop on a daemon thread, shared by the
+synchronous Flask / Socket.IO apps. Handlers submit coroutines and wait on
+the returned futures instead of creating and closing an event loop per call,
+so loop setup/teardown leaves the hot path and loop-bound state (aiohttp
+sessions, batchers, background tasks started by a coroutine) survives
+between calls.
+
+Usage:
+    from async_runner import run_coroutine
+    result = run_coroutine(vision_analyzer.analyze_detected_product(data))
+"""
+
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class AsyncRunner:
+    """
+    Event loop running forever on a dedicated thread.
+    """
+
+    def __init__(self, name: str = "async-runner"):
+        """
+        Initialize the runner (the loop starts on first use).
+
+        Args:
+            name: Name of the loop thread
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            # Cancel whatever is still pending so coroutines see CancelledError
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread if needed and return the loop."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run_loop, args=(loop, ready), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.start()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the loop.
+
+        Returns:
+            A concurrent.futures.Future resolving to the coroutine's result
+        """
+        self.submitted += 1
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and block until it finishes.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Maximum seconds to wait (the coroutine is cancelled on timeout)
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            RuntimeError: If called from the loop thread itself (would deadlock)
+            concurrent.futures.TimeoutError: If the timeout expires
+        """
+        if self._thread is not None and threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("AsyncRunner.run() called from its own event loop; await the coroutine instead")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the loop, cancelling pending tasks, and join the thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+
+_runner_lock = threading.Lock()
+_shared_runner: Optional[AsyncRunner] = None
+
+
+def get_async_runner() -> AsyncRunner:
+    """Return the process-wide async runner (started on first use, stopped at exit)."""
+    global _shared_runner
+    with _runner_lock:
+        if _shared_runner is None:
+            _shared_runner = AsyncRunner()
+            atexit.register(_shared_runner.stop)
+        return _shared_runner
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared background loop and return its result (see AsyncRunner.run)."""
+    return get_async_runner().run(coro, timeout)
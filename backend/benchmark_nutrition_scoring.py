@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: scalar vs vectorized nutrition scoring
+
+Scores the same synthetic products with NutritionFetcher.calculate_nutrition_score
+(one call per product) and with calculate_nutrition_scores (one batch call),
+checks that both produce identical scores and breakdowns, and prints the timings.
+
+Usage:
+    python benchmark_nutrition_scoring.py            # 5000 products
+    python benchmark_nutrition_scoring.py 20000
+"""
+
+import contextlib
+import io
+import random
+import sys
+import time
+
+from nutrition_fetcher import NutritionFetcher
+
+
+def make_products(count: int, seed: int = 42):
+    """Random per-100g nutrition data; each product has a random subset of components."""
+    rng = random.Random(seed)
+    ranges = {
+        'sugar': 40, 'saturated_fat': 15, 'sodium': 1500, 'trans_fat': 1.5,
+        'protein': 30, 'fiber': 15, 'vitamins': 80, 'minerals': 80
+    }
+    products = []
+    for _ in range(count):
+        product = {}
+        for component, upper in ranges.items():
+            roll = rng.random()
+            if roll < 0.15:
+                continue  # Component missing
+            product[component] = 0 if roll < 0.2 else round(rng.uniform(0, upper), 2)
+        products.append(product)
+    products[0] = {}  # No data at all
+    return products
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    fetcher = NutritionFetcher(cache_file=None)
+    products = make_products(count)
+
+    # The scalar path prints every breakdown; keep output out of both timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        scalar = [fetcher.calculate_nutrition_score(product) for product in products]
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_scores, batch_breakdowns = fetcher.calculate_nutrition_scores(products)
+        batch_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores_only, _ = fetcher.calculate_nutrition_scores(products, include_breakdown=False)
+        scores_only_time = time.perf_counter() - start
+
+    scalar_scores = [score for score, _ in scalar]
+    scalar_breakdowns = [breakdown for _, breakdown in scalar]
+    if scalar_scores != batch_scores or scalar_scores != scores_only:
+        mismatches = sum(a != b for a, b in zip(scalar_scores, batch_scores))
+        print(f"❌ Scores differ for {mismatches} of {count} products")
+        sys.exit(1)
+    if scalar_breakdowns != batch_breakdowns:
+        print("❌ Breakdowns differ")
+        sys.exit(1)
+
+    print(f"🥗 Nutrition scoring benchmark ({count} products, results identical)")
+    print(f"   Scalar (per product):       {scalar_time * 1000:9.1f} ms")
+    print(f"   Batch with breakdowns:      {batch_time * 1000:9.1f} ms  ({scalar_time / batch_time:5.1f}x)")
+    print(f"   Batch scores only:          {scores_only_time * 1000:9.1f} ms  ({scalar_time / scores_only_time:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
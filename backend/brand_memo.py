@@ -0,0 +1,184 @@
+"""
+Brand Research Memo
+
+News search, news sentiment and ethics analysis depend only on a product's
+brand, so a category page with ten SKUs of one brand needs the research only
+once. BrandMemo stores each kind of research in its own PersistentTTLCache
+namespace with its own TTL (news goes stale daily, ethics rarely), so results
+survive process restarts. Concurrent requests for the same brand are
+single-flighted: the first caller runs the lookup and the others wait for its
+result instead of repeating it.
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from persistent_cache import PersistentTTLCache
+
+BRAND_CACHE_FILE = Path(os.getenv("BRAND_CACHE_FILE", "brand_cache.sqlite3"))
+BRAND_CACHE_TTLS = {
+    "news": float(os.getenv("BRAND_NEWS_TTL", 24 * 3600)),  # Articles found for a brand
+    "sentiment": float(os.getenv("BRAND_SENTIMENT_TTL", 24 * 3600)),  # Gemini sentiment of those articles
+    "ethics": float(os.getenv("BRAND_ETHICS_TTL", 30 * 24 * 3600)),  # Gemini ethics analysis of the brand
+}
+BRAND_EMPTY_TTL = 3600  # Seconds an empty result (no articles) is reused; may be an upstream outage
+BRAND_CACHE_MAX_ENTRIES = 2000  # LRU bound per kind
+
+
+def normalize_brand(brand_name: str) -> str:
+    """Lowercase, whitespace-collapsed brand name used as the memo key."""
+    return " ".join((brand_name or "").lower().split())
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.shared = 0  # Calls answered by another caller's execution
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func() unless a call with the same key is already running, in which case wait for it.
+
+        Args:
+            key: Deduplication key
+            func: Zero-argument callable producing the value
+
+        Returns:
+            The value of the (possibly shared) execution
+
+        Raises:
+            Exception: Whatever func() raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class BrandMemo:
+    """
+    Persistent, single-flighted memo of per-brand research results.
+    """
+
+    def __init__(self, cache_file: Optional[Path] = BRAND_CACHE_FILE,
+                 ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = BRAND_CACHE_MAX_ENTRIES):
+        """
+        Initialize the memo.
+
+        Args:
+            cache_file: SQLite file for the caches (None keeps results in memory only
+                for the duration of each single-flighted call)
+            ttls: Seconds each kind of result stays fresh (defaults to BRAND_CACHE_TTLS)
+            max_entries: Maximum entries kept per kind
+        """
+        self.ttls = dict(BRAND_CACHE_TTLS, **(ttls or {}))
+        self.caches: Dict[str, PersistentTTLCache] = {}
+        if cache_file is not None:
+            for kind, ttl in self.ttls.items():
+                self.caches[kind] = PersistentTTLCache(
+                    cache_file, namespace=f"brand_{kind}", ttl=ttl, max_entries=max_entries
+                )
+        self.single_flight = SingleFlight()
+        self.computed = 0  # Lookups that actually ran
+
+    def get_or_compute(self, kind: str, brand_name: str, compute: Callable[[], Any],
+                       key_suffix: str = "",
+                       cacheable: Optional[Callable[[Any], bool]] = None,
+                       decode: Optional[Callable[[Any], Any]] = None,
+                       empty: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the memoized result for a brand, computing it at most once at a time.
+
+        Args:
+            kind: Result kind ("news", "sentiment" or "ethics")
+            brand_name: Brand the result belongs to
+            compute: Zero-argument callable running the actual lookup
+            key_suffix: Extra key part for parameters the result depends on
+            cacheable: Predicate deciding whether a computed result is stored
+                (e.g. to skip fallbacks after an API error); default stores all
+            decode: Converts a cached JSON value back to the caller's type
+                (e.g. list -> tuple)
+            empty: Predicate marking a result computed from no upstream data, stored
+                for only BRAND_EMPTY_TTL; default treats falsy results as empty
+
+        Returns:
+            The cached or freshly computed result
+        """
+        key = normalize_brand(brand_name) + (f"|{key_suffix}" if key_suffix else "")
+        cache = self.caches.get(kind)
+
+        if cache is not None:
+            entry = cache.get(key)
+            if entry is not None and not entry.stale:
+                return decode(entry.value) if decode else entry.value
+
+        def run() -> Any:
+            # Another flight may have stored the value while this one waited to lead
+            if cache is not None:
+                entry = cache.get(key)
+                if entry is not None and not entry.stale:
+                    return decode(entry.value) if decode else entry.value
+
+            self.computed += 1
+            value = compute()
+            if cache is not None and (cacheable is None or cacheable(value)):
+                is_empty = empty(value) if empty is not None else not value
+                ttl = BRAND_EMPTY_TTL if is_empty else None
+                cache.set(key, value, ttl=min(ttl, cache.ttl) if ttl else None)
+            return value
+
+        return self.single_flight.do(f"{kind}:{key}", run)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-kind cache counters and single-flight savings."""
+        return {
+            "computed": self.computed,
+            "shared_in_flight": self.single_flight.shared,
+            "caches": {kind: cache.stats() for kind, cache in self.caches.items()},
+        }
+
+    def close(self) -> None:
+        """Close the underlying caches."""
+        for cache in self.caches.values():
+            cache.close()
+
+
+_memo_lock = threading.Lock()
+_shared_memo: Optional[BrandMemo] = None
+
+
+def get_brand_memo() -> BrandMemo:
+    """Return the process-wide brand memo."""
+    global _shared_memo
+    with _memo_lock:
+        if _shared_memo is None:
+            _shared_memo = BrandMemo()
+        return _shared_memo
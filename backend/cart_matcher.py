@@ -0,0 +1,333 @@
+"""
+Cart Matcher
+
+Local duplicate detection for shopping cart items. A CartIndex stores each
+cart entry's name and brand as pre-tokenized, stop-word-filtered token sets
+plus an inverted index (token -> item keys), so a new item is only compared
+with entries that share at least one token. CartMatcher adds rapidfuzz
+scoring on top of the index.
+
+Each match gets two scores. The token-set score treats a name that only adds
+words ("milk" vs "chocolate milk") as a full match. The symmetric token-sort
+score does not. Matches whose token-set score is below the distinct threshold
+are new items. Only a symmetric score at or above the duplicate threshold is a
+duplicate. Anything in between, including every subset match, is ambiguous
+and left to the caller (the classifier asks Gemini). Verdicts are memoized per
+(candidate, cart version) until an optional expiry time, and every change to
+the indexed cart bumps the version.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# Optional imports with fallback
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    print("Warning: rapidfuzz not found. Cart matching falls back to difflib.")
+    print("Install with: pip install rapidfuzz")
+    RAPIDFUZZ_AVAILABLE = False
+
+# Words that describe packaging or are too generic to tell products apart
+STOP_WORDS = frozenset([
+    'can', 'bottle', 'box', 'pack', 'container', 'the', 'a', 'an',
+    'grab', 'go', 'snack', 'potato', 'crisps'
+])
+
+# Brand words that make two names the same product line when both contain them
+BRAND_WORDS = frozenset(['pringles', 'coca-cola', 'coke', 'diet', 'ensure'])
+
+DEFAULT_DUPLICATE_THRESHOLD = 0.9  # Score at or above which an item is the same product
+DEFAULT_DISTINCT_THRESHOLD = 0.6  # Score below which an item is a different product
+DEFAULT_NAME_WEIGHT = 0.75  # Weight of the name score (the brand score gets the rest)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['&-][a-z0-9]+)*")
+
+
+def normalize_tokens(text: str) -> Tuple[str, ...]:
+    """Lowercase word tokens of a name or brand with stop words removed (all tokens if only stop words remain)."""
+    tokens = _TOKEN_PATTERN.findall((text or "").lower())
+    filtered = tuple(token for token in tokens if token not in STOP_WORDS)
+    return filtered or tuple(tokens)
+
+
+def token_set_similarity(tokens1: Tuple[str, ...], tokens2: Tuple[str, ...]) -> float:
+    """
+    Token-set similarity of two token tuples in [0, 1].
+
+    One set containing the other scores 1.0, so "diet coke" matches
+    "diet coke zero sugar"-style variants that only add words.
+    """
+    if not tokens1 or not tokens2:
+        return 0.0
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.token_set_ratio(" ".join(tokens1), " ".join(tokens2)) / 100.0
+
+    set1, set2 = set(tokens1), set(tokens2)
+    if set1 <= set2 or set2 <= set1:
+        return 1.0
+    return SequenceMatcher(None, " ".join(sorted(set1)), " ".join(sorted(set2))).ratio()
+
+
+def token_sort_similarity(tokens1: Tuple[str, ...], tokens2: Tuple[str, ...]) -> float:
+    """
+    Symmetric token similarity of two token tuples in [0, 1] (word order ignored).
+
+    Unlike token_set_similarity, extra words lower the score, so "milk" and
+    "chocolate milk" do not score as the same product.
+    """
+    if not tokens1 or not tokens2:
+        return 0.0
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.token_sort_ratio(" ".join(tokens1), " ".join(tokens2)) / 100.0
+    return SequenceMatcher(None, " ".join(sorted(tokens1)), " ".join(sorted(tokens2))).ratio()
+
+
+def name_similarity(words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
+    """
+    Word-overlap similarity of two token sets in [0, 1].
+
+    A shared brand word (see BRAND_WORDS) boosts the overlap of the remaining
+    product words by 0.3, capped at 0.95.
+    """
+    if not words1 or not words2:
+        return 0.0
+
+    if words1 & words2 & BRAND_WORDS:
+        # Same brand: compare the core product words
+        core_words1 = words1 - BRAND_WORDS
+        core_words2 = words2 - BRAND_WORDS
+        if not core_words1 or not core_words2:
+            return 0.9  # Same brand, no specific product differences
+        overlap = len(core_words1 & core_words2) / len(core_words1 | core_words2)
+        return min(0.95, overlap + 0.3)
+
+    return len(words1 & words2) / len(words1 | words2)
+
+
+@dataclass
+class IndexedItem:
+    """Pre-tokenized name and brand of one cart entry."""
+
+    name: Tuple[str, ...]
+    brand: Tuple[str, ...]
+    name_set: FrozenSet[str]
+    brand_set: FrozenSet[str]
+
+    @classmethod
+    def from_strings(cls, name: str, brand: str) -> "IndexedItem":
+        name_tokens = normalize_tokens(name)
+        brand_tokens = normalize_tokens(brand)
+        return cls(name_tokens, brand_tokens, frozenset(name_tokens), frozenset(brand_tokens))
+
+    @property
+    def tokens(self) -> FrozenSet[str]:
+        return self.name_set | self.brand_set
+
+
+class CartIndex:
+    """
+    Pre-tokenized cart entries with a token -> item keys inverted index.
+    """
+
+    def __init__(self):
+        self.version = 0  # Bumped on every change to the indexed entries
+        self._entries: Dict[str, IndexedItem] = {}
+        self._index: Dict[str, Set[str]] = {}  # {token: item keys}
+        self._positions: Dict[str, int] = {}  # {key: insertion position}, keeps cart order for ties
+        self._next_position = 0
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _bump(self) -> None:
+        self.version += 1
+
+    def _insert(self, key: str, item: IndexedItem) -> None:
+        self._entries[key] = item
+        if key not in self._positions:
+            self._positions[key] = self._next_position
+            self._next_position += 1
+        for token in item.tokens:
+            self._index.setdefault(token, set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        for token in self._entries[key].tokens:
+            keys = self._index.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[token]
+
+    def add(self, key: str, name: str, brand: str) -> None:
+        """Index (or re-index) a cart entry. Also call this when an entry's count or timestamp changes."""
+        if key in self._entries:
+            self._unindex(key)
+        self._insert(key, IndexedItem.from_strings(name, brand))
+        self._bump()
+
+    def remove(self, key: str) -> None:
+        """Drop a cart entry from the index."""
+        if key in self._entries:
+            self._unindex(key)
+            del self._entries[key]
+            del self._positions[key]
+            self._bump()
+
+    def rebuild(self, cart: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the index with the entries of a cart ({key: {'name': ..., 'brand': ...}})."""
+        self._entries.clear()
+        self._index.clear()
+        self._positions.clear()
+        for key, item in cart.items():
+            self._insert(key, IndexedItem.from_strings(item.get('name', ''), item.get('brand', '')))
+        self._bump()
+
+    def candidates(self, name: str, brand: str, name_only: bool = False) -> Set[str]:
+        """Keys of cart entries sharing at least one token (only name tokens with name_only)."""
+        item = IndexedItem.from_strings(name, brand)
+        keys: Set[str] = set()
+        for token in (item.name_set if name_only else item.tokens):
+            keys |= self._index.get(token, set())
+        return keys
+
+    def similar_keys(self, name: str, brand: str, threshold: float) -> List[str]:
+        """
+        Entries whose name and brand similarity (see name_similarity) both exceed threshold.
+
+        Only entries sharing a name token are scored; any other entry has a
+        name similarity of 0.
+
+        Returns:
+            Matching keys in insertion order
+        """
+        item = IndexedItem.from_strings(name, brand)
+        matches = []
+        for key in self.candidates(name, brand, name_only=True):
+            existing = self._entries[key]
+            self.comparisons += 1
+            if (name_similarity(item.name_set, existing.name_set) > threshold
+                    and name_similarity(item.brand_set, existing.brand_set) > threshold):
+                matches.append(key)
+        return sorted(matches, key=self._positions.__getitem__)
+
+
+@dataclass
+class CartMatch:
+    """Scores of a candidate item against one cart entry."""
+
+    key: str
+    score: float  # Combined token-set score (subsets score 1.0)
+    name_score: float
+    brand_score: float
+    exact_score: float  # Combined symmetric token-sort score
+
+
+class CartMatcher(CartIndex):
+    """
+    Cart index with fuzzy scoring and a verdict memo.
+    """
+
+    def __init__(self, duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                 distinct_threshold: float = DEFAULT_DISTINCT_THRESHOLD,
+                 name_weight: float = DEFAULT_NAME_WEIGHT):
+        """
+        Initialize the matcher.
+
+        Args:
+            duplicate_threshold: Score at or above which a match is a duplicate
+            distinct_threshold: Score below which a match is a different item
+            name_weight: Weight of the name score in the combined score
+        """
+        if not 0.0 <= distinct_threshold <= duplicate_threshold <= 1.0:
+            raise ValueError("Thresholds must satisfy 0 <= distinct <= duplicate <= 1")
+
+        self.duplicate_threshold = duplicate_threshold
+        self.distinct_threshold = distinct_threshold
+        self.name_weight = name_weight
+
+        self._memo: Dict[Tuple[str, int], Tuple[Any, float]] = {}  # {(candidate, version): (verdict, expires_at)}
+        super().__init__()
+
+        self.lookups = 0
+        self.memo_hits = 0
+
+    def _bump(self) -> None:
+        super()._bump()
+        self._memo.clear()
+
+    def match(self, name: str, brand: str) -> List[CartMatch]:
+        """
+        Score a candidate item against the cart entries that share a token.
+
+        Returns:
+            Matches sorted by combined score (then symmetric score), best first
+        """
+        self.lookups += 1
+        item = IndexedItem.from_strings(name, brand)
+
+        matches = []
+        for key in self.candidates(name, brand):
+            existing = self._entries[key]
+            name_score = token_set_similarity(item.name, existing.name)
+            brand_score = token_set_similarity(item.brand, existing.brand)
+            score = self.name_weight * name_score + (1.0 - self.name_weight) * brand_score
+            exact_score = (self.name_weight * token_sort_similarity(item.name, existing.name)
+                           + (1.0 - self.name_weight) * token_sort_similarity(item.brand, existing.brand))
+            matches.append(CartMatch(key, score, name_score, brand_score, exact_score))
+            self.comparisons += 1
+
+        matches.sort(key=lambda match: (match.score, match.exact_score), reverse=True)
+        return matches
+
+    def classify(self, match: CartMatch) -> str:
+        """'duplicate', 'ambiguous' or 'distinct' for a match (subset matches are at most ambiguous)."""
+        if match.score < self.distinct_threshold:
+            return "distinct"
+        if match.exact_score >= self.duplicate_threshold:
+            return "duplicate"
+        return "ambiguous"
+
+    def recall(self, candidate: str, now: float) -> Optional[Any]:
+        """Memoized verdict for a candidate at the current cart version that has not expired by `now`, or None."""
+        entry = self._memo.get((candidate, self.version))
+        if entry is None:
+            return None
+        verdict, expires_at = entry
+        if now >= expires_at:
+            del self._memo[(candidate, self.version)]
+            return None
+        self.memo_hits += 1
+        return verdict
+
+    def remember(self, candidate: str, verdict: Any, version: int, expires_at: float = math.inf) -> None:
+        """
+        Memoize a verdict computed against cart `version` (dropped if the cart has changed since).
+
+        Args:
+            candidate: Candidate item key
+            verdict: Verdict to memoize
+            version: Cart version the verdict was computed against
+            expires_at: Time after which the verdict no longer holds (e.g. when a match leaves a time window)
+        """
+        if version == self.version:
+            self._memo[(candidate, version)] = (verdict, expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and lookup counters."""
+        return {
+            "entries": len(self._entries),
+            "tokens": len(self._index),
+            "version": self.version,
+            "lookups": self.lookups,
+            "comparisons": self.comparisons,
+            "memo_hits": self.memo_hits,
+        }
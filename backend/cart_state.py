@@ -0,0 +1,228 @@
+"""
+Cart State Store
+
+Versioned, in-process view of the shopping cart. The classifier publishes
+every cart change into the store; the Shopping Cart API serves it with ETags,
+answers "what changed since version N" queries and pushes changes to
+Server-Sent Events subscribers, which wait on event-loop futures rather than
+worker threads. When the classifier runs in another process
+the store is refreshed from results.json, re-parsing the file only when its
+modification time changes.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class CartStateStore:
+    """
+    Thread-safe versioned cart snapshot with a bounded change history.
+    """
+
+    # Fields that change on every publish and should not bump the version on their own
+    VOLATILE_KEYS = ("timestamp", "total_frames_processed")
+
+    def __init__(self, history_limit: int = 256):
+        """
+        Initialize the store.
+
+        Args:
+            history_limit: Number of past changes kept for delta queries
+        """
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.source: Optional[str] = None  # "live" (in-process publisher) or "file"
+        self._state: Dict[str, Any] = {}
+        self._changes: Deque[Dict[str, Any]] = deque(maxlen=history_limit)
+        self._condition = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._file_mtime: Optional[float] = None
+
+    @property
+    def etag(self) -> str:
+        """Entity tag for the current version (unique per process)."""
+        return f'"cart-{self.instance_id}-{self.version}"'
+
+    def publish(self, state: Dict[str, Any], source: str = "live") -> int:
+        """
+        Publish a new cart state; bumps the version only if something changed.
+
+        Args:
+            state: Dict with at least "shopping_cart" and "cart_summary"
+            source: "live" for an in-process publisher, "file" for results.json
+
+        Returns:
+            The current version after publishing
+        """
+        new_cart = state.get("shopping_cart", {}) or {}
+
+        with self._condition:
+            old_cart = self._state.get("shopping_cart", {}) or {}
+            changed = {key: item for key, item in new_cart.items() if old_cart.get(key) != item}
+            removed = [key for key in old_cart if key not in new_cart]
+            summary_changed = state.get("cart_summary") != self._state.get("cart_summary")
+            extras_changed = any(
+                state.get(key) != self._state.get(key)
+                for key in state
+                if key not in ("shopping_cart", "cart_summary") and key not in self.VOLATILE_KEYS
+            )
+
+            self.source = source
+            if self.version and not (changed or removed or summary_changed or extras_changed):
+                return self.version
+
+            self._state = copy.deepcopy(state)
+            self.version += 1
+            self._changes.append({
+                "version": self.version,
+                "changed": copy.deepcopy(changed),
+                "removed": removed,
+                "cart_summary": copy.deepcopy(state.get("cart_summary", {})),
+                "timestamp": state.get("timestamp", ""),
+                "published_at": time.time(),
+            })
+            self._condition.notify_all()
+            self._wake_async_waiters()
+            return self.version
+
+    def _wake_async_waiters(self) -> None:
+        """Resolve the futures of coroutines waiting in wait_for_change_async() (call with the condition held)."""
+        for loop, future in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # The waiter's loop has been closed
+        self._async_waiters.clear()
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        """Return (version, deep copy of the current state)."""
+        with self._condition:
+            return self.version, copy.deepcopy(self._state)
+
+    def changes_since(self, since: int) -> Dict[str, Any]:
+        """
+        Build a delta from `since` to the current version.
+
+        Falls back to a full snapshot ("full": true) when `since` is older than
+        the retained history or comes from a different process.
+
+        Args:
+            since: Version the client already has
+
+        Returns:
+            Dict with version, changed items, removed keys and the cart summary
+        """
+        with self._condition:
+            oldest = self._changes[0]["version"] if self._changes else self.version + 1
+            if since > self.version or since < oldest - 1:
+                return {
+                    "version": self.version,
+                    "since": since,
+                    "full": True,
+                    "changed": copy.deepcopy(self._state.get("shopping_cart", {})),
+                    "removed": [],
+                    "cart_summary": copy.deepcopy(self._state.get("cart_summary", {})),
+                    "timestamp": self._state.get("timestamp", ""),
+                }
+
+            changed: Dict[str, Any] = {}
+            removed: List[str] = []
+            for change in self._changes:
+                if change["version"] <= since:
+                    continue
+                for key, item in change["changed"].items():
+                    changed[key] = item
+                    if key in removed:
+                        removed.remove(key)
+                for key in change["removed"]:
+                    changed.pop(key, None)
+                    if key not in removed:
+                        removed.append(key)
+
+            return {
+                "version": self.version,
+                "since": since,
+                "full": False,
+                "changed": copy.deepcopy(changed),
+                "removed": removed,
+                "cart_summary": copy.deepcopy(self._state.get("cart_summary", {})),
+                "timestamp": self._state.get("timestamp", ""),
+            }
+
+    def wait_for_change(self, since: int, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the version moves past `since` or the timeout expires.
+
+        Returns:
+            True if a newer version is available
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version > since, timeout)
+
+    async def wait_for_change_async(self, since: int, timeout: Optional[float] = None) -> bool:
+        """
+        wait_for_change() for coroutines: waits on a loop future instead of parking a worker thread.
+
+        Returns:
+            True if a newer version is available
+        """
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self.version > since:
+                return True
+            waiter = loop.create_future()
+            self._async_waiters.append((loop, waiter))
+
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                if (loop, waiter) in self._async_waiters:
+                    self._async_waiters.remove((loop, waiter))
+        return self.version > since
+
+    def refresh_from_file(self, path: Union[str, Path]) -> bool:
+        """
+        Load results.json into the store if it changed since the last load.
+
+        Ignored while a live in-process publisher is active.
+
+        Returns:
+            True if the store holds data (live or loaded from the file)
+        """
+        if self.source == "live":
+            return True
+
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return self.version > 0
+
+        if mtime == self._file_mtime:
+            return True
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.pop("all_classifications", None)  # Session log is not served from the store
+        self._file_mtime = mtime
+        self.publish(data, source="file")
+        return True
+
+
+# Process-wide store shared by the classifier and the Shopping Cart API
+cart_store = CartStateStore()
@@ -8,20 +8,35 @@ capture images when objects appear in the center region of the video feed.
 Captured images are then classified using Google's Gemini API.
 
 Features:
-- Motion detection using background subtraction and frame differencing
+- Motion detection using background subtraction and frame differencing on a
+  downscaled grayscale ROI around the center region
 - Scene change detection using histogram comparison
 - Automatic image capture with cooldown period
 - Gemini API integration for object classification
+- Perceptual-hash cache: near-duplicate captures reuse earlier results and
+  new objects skip the API cooldown
+- Local fuzzy cart duplicate check over a token index; Gemini is asked only
+  about ambiguous matches, once per item and cart version
 - Real-time visual feedback with detection overlays
+- Staged pipeline (capture, analysis, classification, render) with bounded
+  drop-oldest queues so network calls never stall the camera or display
+- Captures JPEG-encoded once in memory; the bytes go straight to Gemini and
+  a background writer persists them to disk
+- Cart changes published to an in-process versioned cart store that the
+  Shopping Cart API serves (ETag, deltas, Server-Sent Events)
+- Classification and deal analysis history appended to a JSON-lines event
+  log; results.json holds only a compact cart snapshot
 """
 
 # Standard library imports
 import asyncio
 import json
+import math
 import os
 import re
 import subprocess
 import tempfile
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
@@ -44,6 +59,18 @@ except ImportError:
         GEMINI_AVAILABLE = False
         genai = None
 
+from cart_matcher import CartIndex, CartMatcher, name_similarity, normalize_tokens
+from capture_scheduler import CaptureScheduler
+from cart_state import CartStateStore, cart_store
+from frame_pipeline import CaptureWriter, DropOldestQueue, StageStats
+from gemini_batcher import BatchResponseError, GeminiBatcher, demultiplex_results
+from local_gate import LocalGate
+from motion_engine import MotionEngine
+from perceptual_cache import PerceptualHashCache, center_fingerprint
+from persistent_cache import PersistentTTLCache
+from results_log import CLASSIFICATION_EVENT, DEAL_ANALYSIS_EVENT, ResultsLog
+from thumbnails import warm_thumbnails
+
 # =============================================================================
 # CONFIGURATION CONSTANTS
 # =============================================================================
@@ -57,12 +84,14 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Import Google scraping functionality
 try:
-    from google_scrape import scrape_google_shopping_deals
+    from google_scrape import scrape_google_shopping_deals, scrape_google_shopping_deals_async, close_async_oxylabs_client
     GOOGLE_SCRAPE_AVAILABLE = True
 except ImportError:
     print("Warning: google_scrape.py not found. Deal analysis will be skipped.")
     GOOGLE_SCRAPE_AVAILABLE = False
     scrape_google_shopping_deals = None
+    scrape_google_shopping_deals_async = None
+    close_async_oxylabs_client = None
 
 # Import TTS functionality
 try:
@@ -79,11 +108,27 @@ CENTER_REGION_HEIGHT = 0.3  # 30% of frame height
 
 # Sampling and timing parameters
 CAPTURE_COOLDOWN = 2.0  # Seconds between captures (prevents spam)
-FRAME_PROCESSING_RATE = 1  # Process every N frames (1 = every frame)
+FRAME_PROCESSING_RATE = 1  # Run motion detection on every N frames (1 = every frame)
+CAPTURE_PERSIST_FRAMES = 3  # Analyzed frames with motion before a capture is armed
+CAPTURE_SETTLE_FRAMES = 3  # Consecutive still analyzed frames before the sharpest one is captured
+CAPTURE_STILL_RATIO = 0.01  # Frame-difference ratio of the center region at or below which it is still
+
+# Local pre-classifier gate (CPU-only checks before a capture is sent to Gemini)
+LOCAL_GATE_ENABLED = True  # Requires mediapipe; without it every capture goes to Gemini
+LOCAL_GATE_HAND_MODEL = Path("hand_landmarker.task")  # MediaPipe Hand Landmarker model (downloaded if missing)
+LOCAL_GATE_MIN_HAND_SCORE = 0.5  # Minimum hand detection score
+LOCAL_GATE_GRASP_EXPANSION = 0.6  # Hand box growth per side that forms the object-in-hand region
+LOCAL_GATE_MIN_CENTER_OVERLAP = 0.15  # Share of the object-in-hand region inside the center region
+LOCAL_GATE_MIN_EDGE_DENSITY = 0.03  # Edge pixel share outside the hand needed to count as holding an object
+LOCAL_GATE_YOLO_MODEL = os.getenv("LOCAL_GATE_YOLO_MODEL")  # Optional Ultralytics weights (e.g. weights/best.pt)
+LOCAL_GATE_YOLO_CONFIDENCE = 0.25  # Minimum YOLO detection confidence
 
 # Motion detection parameters
 MOTION_THRESHOLD = 30  # Pixel difference threshold for frame differencing
 MOTION_RATIO_THRESHOLD = 0.01  # Minimum ratio of center region with motion (1%)
+MOTION_PYRAMID_LEVEL = 2  # pyrDown steps before motion analysis (2 = quarter resolution)
+MOTION_MIN_WIDTH = 160  # Never downscale frames below this width for motion analysis
+MOTION_ROI_PADDING = 0.25  # Padding around the center region analyzed by MOG2/differencing
 
 # Scene change detection parameters
 HISTOGRAM_COMPARISON_THRESHOLD = 0.7  # Correlation threshold for scene change (0-1)
@@ -94,9 +139,31 @@ HISTOGRAM_COMPARISON_THRESHOLD = 0.7  # Correlation threshold for scene change (
 BAG_DETECTION_KEYWORDS = ['bag', 'shopping bag', 'tote', 'container', 'basket', 'cart']
 CART_UPDATE_COOLDOWN = 10.0  # Seconds between cart updates for same item (increased to prevent duplicates)
 CART_FUZZY_MATCH_WINDOW = 10.0  # Seconds - don't add similar items if added within this window
+CART_MATCH_DUPLICATE_SCORE = 0.9  # Symmetric local match score at or above which a recent item is a duplicate
+CART_MATCH_DISTINCT_SCORE = 0.6  # Token-set local match score below which an item is new (in between asks Gemini)
+
+# Pipeline stage parameters (each stage drops its oldest queued item when full)
+CAPTURE_QUEUE_DEPTH = 4  # Raw camera frames waiting for motion analysis
+CLASSIFY_QUEUE_DEPTH = 2  # Captured images waiting for Gemini classification
+RENDER_QUEUE_DEPTH = 2  # Analyzed frames waiting to be drawn and displayed
+STAGE_POLL_INTERVAL = 0.05  # Seconds a stage waits for input before re-checking for shutdown
+CAPTURE_WRITE_QUEUE_DEPTH = 8  # Encoded captures waiting to be written to disk (writes inline when full)
+CAPTURE_JPEG_QUALITY = 90  # JPEG quality for captured images
+
+# Gemini request batching (concurrent classifications share one multi-image request)
+GEMINI_BATCH_MAX_SIZE = 8  # Maximum images per classification request
+GEMINI_BATCH_WINDOW = 0.05  # Seconds a shared batcher waits for more images after the first one arrives
+
+# Deal analysis cache parameters (persistent across sessions)
+DEAL_CACHE_FILE = Path("deal_cache.sqlite3")
+DEAL_CACHE_TTL = 24 * 3600  # Seconds a cached deal analysis is considered fresh
+DEAL_CACHE_STALE_TTL = 6 * 24 * 3600  # Extra seconds a stale entry is served while it refreshes
+DEAL_CACHE_MAX_ENTRIES = 500  # LRU bound on cached deal analyses
+DEAL_SEARCH_CONCURRENT_FALLBACKS = True  # Fire simplified fallback queries in parallel with the full query
 
 # Persistence parameters
 RESULTS_FLUSH_DELAY = 2.0  # Seconds to wait after last cart update before saving results
+RESULTS_LOG_KEEP_SESSIONS = 5  # Sessions kept in the results event log when compacting at startup
 
 # Grocery filtering parameters
 GROCERY_CATEGORIES = ['food', 'beverage', 'snack', 'snack food', 'dairy', 'produce', 'meat', 'bakery', 'frozen', 'pantry', 'condiment', 'spice', 'cereal', 'candy', 'chocolate', 'drink', 'juice', 'soda', 'water', 'coffee', 'tea', 'alcohol', 'wine', 'beer']
@@ -109,8 +176,16 @@ MIN_CONFIDENCE_THRESHOLD = 0.88  # Only accept classifications with confidence >
 DEDUPLICATION_TIME_WINDOW = 5.0  # Seconds - classify only once per time window
 DEDUPLICATION_SIMILARITY_THRESHOLD = 0.8  # Similarity threshold for considering results the same
 
-# Separate cooldowns for classification vs cart updates
-CLASSIFICATION_COOLDOWN = 5.0  # Seconds between actual API calls
+# Object names Gemini returns when there is no identifiable held item
+NON_ITEM_OBJECT_NAMES = ["no_hand_holding_object", "unidentifiable_item"]
+
+# Perceptual-hash classification cache (dHash of the center region); only
+# confident classifications of real items are cached, so a poor capture of
+# an item is retried instead of being reused
+PHASH_SIZE = 8  # Hash grid size (64-bit fingerprints)
+PHASH_MAX_DISTANCE = 10  # Max Hamming distance for a capture to reuse a cached classification
+PHASH_TTL = 120.0  # Seconds a cached classification may be reused
+PHASH_MAX_ENTRIES = 256  # Fingerprints kept (LRU eviction)
 CART_UPDATE_COOLDOWN = 0.0  # No cooldown for cart updates (immediate)
 
 # =============================================================================
@@ -132,6 +207,29 @@ GEMINI_PROMPT = (
     "Only detect grocery items that are clearly being held up by a hand to the camera and that you can confidently identify."
 )
 
+GEMINI_BATCH_PROMPT = (
+    GEMINI_PROMPT + " "
+    "You are given {count} images, each introduced by 'Image N:'. Classify each image independently. "
+    "Respond ONLY with a JSON array of exactly {count} objects in image order. Each object has the keys "
+    "described above plus image_index (the N of its image, starting at 1)."
+)
+
+# Response schema for GEMINI_BATCH_PROMPT: one classification object per image
+GEMINI_BATCH_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "image_index": {"type": "integer"},
+            "object_name": {"type": "string"},
+            "brand": {"type": "string"},
+            "category": {"type": "string"},
+            "confidence": {"type": "number"},
+        },
+        "required": ["image_index", "object_name", "brand", "category", "confidence"],
+    },
+}
+
 CART_CHECK_PROMPT = (
     "You are helping to manage a shopping cart. I will provide you with:\n"
     "1. A new item that was just detected: {new_item}\n"
@@ -165,9 +263,153 @@ DEAL_ANALYSIS_PROMPT = (
     "Keep it natural and conversational. Make sure the JSON is valid."
 )
 
+# Warm entries for the deal cache, keyed by brand. Any product of these brands
+# is served from here until a live analysis for the exact item is cached.
+DEAL_CACHE_SEED_ENTRIES = {
+    "brand:pringles": {
+        "analysis": {
+            "best_deal_message": "It looks like the best deal for the Pringles Cheddar Cheese chips is $1.75 at Dollar General!",
+            "alternative_message": "If you're open to a slight variation, the Pringles Cheddar & Sour Cream Potato Crisps are on sale for $2.19 at Target, which is a really popular flavor too. As for the sustainability side of things, Pringles face sustainability challenges due to their non-recyclable mixed-material packaging and use of processed ingredients, though the brand has made limited efforts toward more recyclable can designs."
+        },
+        "price": 1.75
+    },
+    "brand:coca-cola": {
+        "analysis": {
+            "best_deal_message": "It looks like the best deal for a single can of Coca Cola Original is $1.35 at Dollar General!",
+            "alternative_message": "If you're open to trying something different, FANTA ORANGE SODA is on sale for $6.69 at Walgreens, which is a fun fruity option. As for the Nutritonal Side of things it is important to note that, recent research on Coca-Cola suggests it may disrupt the gut microbiome and be linked to depression, with one study proposing a “molecular addiction” in the intestines driven by high sugar intake."
+        },
+        "price": 1.35
+    }
+}
+
+def create_gemini_client():
+    """Create the Gemini model used for classification and deal analysis, or None if unavailable"""
+    if not GEMINI_AVAILABLE:
+        print("Gemini library not available. Classification will be skipped.")
+        return None
+    
+    print("Setting up Gemini client...")
+    try:
+        gemini_api_key = GEMINI_API_KEY
+        if not gemini_api_key:
+            print("Warning: No Gemini API key found. Classification will be skipped.")
+            return None
+        
+        # Configure the API key
+        genai.configure(api_key=gemini_api_key)
+        client = genai.GenerativeModel(GEMINI_MODEL)
+        print("Gemini client initialized successfully!")
+        return client
+    except Exception as e:
+        print(f"Error setting up Gemini client: {e}")
+        return None
+
+def parse_classification_response(response_text: str) -> Optional[Dict[str, Any]]:
+    """Extract the classification JSON object from a Gemini response"""
+    if not response_text:
+        return None
+    
+    try:
+        # Look for JSON in the response
+        if "```json" in response_text:
+            json_start = response_text.find("```json") + 7
+            json_end = response_text.find("```", json_start)
+            json_text = response_text[json_start:json_end].strip()
+        elif "{" in response_text and "}" in response_text:
+            json_start = response_text.find("{")
+            json_end = response_text.rfind("}") + 1
+            json_text = response_text[json_start:json_end]
+        else:
+            json_text = response_text
+        
+        return json.loads(json_text)
+    except json.JSONDecodeError:
+        return {
+            "object_name": "Unknown",
+            "description": response_text,
+            "category": "Unknown",
+            "confidence": 0.5,
+            "raw_response": response_text
+        }
+
+async def classify_image(gemini_client, image) -> Optional[Dict[str, Any]]:
+    """Classify one image with a single Gemini request"""
+    response = await asyncio.to_thread(gemini_client.generate_content, [GEMINI_PROMPT, image])
+    response_text = response.text if hasattr(response, 'text') else str(response)
+    return parse_classification_response(response_text)
+
+async def classify_image_batch(gemini_client, images: List[Any]) -> List[Optional[Dict[str, Any]]]:
+    """Classify several images with one Gemini request returning a JSON array"""
+    # str.replace rather than format(): the base prompt contains literal JSON braces
+    contents: List[Any] = [GEMINI_BATCH_PROMPT.replace("{count}", str(len(images)))]
+    for index, image in enumerate(images, start=1):
+        contents.extend([f"Image {index}:", image])
+    
+    response = await asyncio.to_thread(
+        gemini_client.generate_content,
+        contents,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": GEMINI_BATCH_RESPONSE_SCHEMA,
+        }
+    )
+    response_text = response.text if hasattr(response, 'text') else str(response)
+    try:
+        parsed = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise BatchResponseError(f"Batch response is not valid JSON: {e}")
+    
+    results = demultiplex_results(parsed, len(images))
+    for result in results:
+        result.pop('image_index', None)
+    return results
+
+def create_classification_batcher(gemini_client, max_wait: float = GEMINI_BATCH_WINDOW) -> GeminiBatcher:
+    """
+    Batcher that coalesces classification requests for a Gemini client.
+    
+    Batching only pays off when several sessions share the batcher (ClassifierHost);
+    a standalone classifier has one capture in flight at a time, so it passes
+    max_wait=0 to send each capture without waiting for a window.
+    """
+    return GeminiBatcher(
+        send_batch=lambda images: classify_image_batch(gemini_client, images),
+        send_single=lambda image: classify_image(gemini_client, image),
+        max_batch_size=GEMINI_BATCH_MAX_SIZE,
+        max_wait=max_wait,
+        name="classification"
+    )
+
+def open_deal_cache() -> PersistentTTLCache:
+    """Open the persistent deal analysis cache (shared by every session in a process)"""
+    return PersistentTTLCache(
+        DEAL_CACHE_FILE,
+        namespace="deal_analysis",
+        ttl=DEAL_CACHE_TTL,
+        stale_ttl=DEAL_CACHE_STALE_TTL,
+        max_entries=DEAL_CACHE_MAX_ENTRIES
+    )
+
 class CenterObjectClassifier:
-    def __init__(self, enable_tts=False):
-        self.gemini_client = None
+    def __init__(self, enable_tts=False, results_file: str = "results.json", session_name: Optional[str] = None,
+                 gemini_client=None, gemini_batcher: Optional[GeminiBatcher] = None,
+                 deal_cache: Optional[PersistentTTLCache] = None,
+                 state_store: Optional[CartStateStore] = None):
+        """
+        Args:
+            enable_tts: Speak deal summaries with ElevenLabs
+            results_file: Snapshot file for this session (event log is stored next to it)
+            session_name: Label used in thread names and logs when several sessions share a process
+            gemini_client: Shared Gemini model (created by setup_gemini_client if omitted)
+            gemini_batcher: Shared classification batcher (created for gemini_client if omitted)
+            deal_cache: Shared persistent deal cache (opened on DEAL_CACHE_FILE if omitted)
+            state_store: Cart state store to publish into (process-wide store if omitted)
+        """
+        self.gemini_client = gemini_client
+        self.gemini_batcher = gemini_batcher
+        self.session_name = session_name
+        self.state_store = state_store or cart_store
+        self.stop_event = threading.Event()  # Set to stop run() from outside (e.g. a session host)
         self.captures_dir = CAPTURES_DIR
         self.enable_tts = enable_tts and TTS_AVAILABLE
         self.tts_service = None
@@ -182,20 +424,33 @@ class CenterObjectClassifier:
                 self.enable_tts = False
         self.last_capture_time = 0
         self.frame_count = 0
-        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
-        self.previous_frame = None
-        self.previous_histogram = None
-        self.scene_change_detected = False
+        self.motion_engine = MotionEngine(
+            motion_threshold=MOTION_THRESHOLD,
+            motion_ratio_threshold=MOTION_RATIO_THRESHOLD,
+            histogram_threshold=HISTOGRAM_COMPARISON_THRESHOLD,
+            pyramid_level=MOTION_PYRAMID_LEVEL,
+            min_width=MOTION_MIN_WIDTH,
+            roi_padding=MOTION_ROI_PADDING
+        )
+        self.capture_scheduler = CaptureScheduler(
+            stride=FRAME_PROCESSING_RATE,
+            persist_frames=CAPTURE_PERSIST_FRAMES,
+            settle_frames=CAPTURE_SETTLE_FRAMES,
+            still_ratio=CAPTURE_STILL_RATIO
+        )
+        self.local_gate: Optional[LocalGate] = None  # Created by run() once captures are classified
         
         # Cart management
         self.cart = {}  # {item_name: {'brand': brand, 'category': category, 'count': count, 'last_seen': timestamp}}
         self.last_cart_update = {}  # Track last update time for each item
+        self.cart_matcher = CartMatcher(CART_MATCH_DUPLICATE_SCORE, CART_MATCH_DISTINCT_SCORE)  # Token index over self.cart
         self.bag_detected = False
         self.bag_detection_confidence = 0.0
         
-        # Results tracking
-        self.all_classifications = []  # Store all classification results
-        self.results_file = "results.json"
+        # Results tracking (history goes to the event log, counters stay in memory)
+        self.results_file = results_file
+        self.results_log = ResultsLog(self.results_file)
+        self.classification_counts = {"total": 0, "successful": 0, "failed": 0, "skipped": 0}
         
         # Deduplication tracking
         self.last_classification_time = 0
@@ -203,11 +458,19 @@ class CenterObjectClassifier:
         
         # Separate tracking for classification vs cart updates
         self.last_api_call_time = 0
+        self.classification_cache = PerceptualHashCache(
+            max_distance=PHASH_MAX_DISTANCE,
+            ttl=PHASH_TTL,
+            max_entries=PHASH_MAX_ENTRIES
+        )
         self.pending_classifications = []  # Queue for pending classifications
         
         # Deal analysis tracking
-        self.deal_analysis_results: List[Dict[str, Any]] = []  # Store all deal analysis results
-        self.deal_analysis_cache: Dict[str, Dict[str, Any]] = {}  # Cache deal analysis by product name {item_key: deal_analysis}
+        self.deal_analysis_counts = {"total": 0, "successful": 0, "cached": 0, "deals_found": 0}
+        self.items_analyzed: set[str] = set()  # Item names with a deal analysis this session
+        self.deal_analysis_cache: Dict[str, Dict[str, Any]] = {}  # Deal analyses applied this session {item_key: deal_analysis}
+        self.deal_cache = deal_cache or open_deal_cache()
+        self._refreshing_deal_keys: set[str] = set()  # Cache keys with a background refresh in flight
         self.spoken_items: set[str] = set()  # Track which items have been spoken already
         self.window_shown = False  # Track if CV2 window has been displayed
         self.window_shown_time = 0  # Track when window was first shown for delayed speech
@@ -217,8 +480,15 @@ class CenterObjectClassifier:
         self._flush_task: Optional[asyncio.Task] = None  # Delayed persistence task
         self._last_cart_update: float = 0.0  # Timestamp of last cart mutation
         
+        # Pipeline stage metrics and queues (populated by run())
+        self.stage_stats: Dict[str, StageStats] = {}
+        self.stage_queues: Dict[str, DropOldestQueue] = {}
+        
         # Create captures directory
         self.captures_dir.mkdir(exist_ok=True)
+        
+        # Background disk writer for captures (also pre-generates Dashboard thumbnails)
+        self.capture_writer = CaptureWriter(CAPTURE_WRITE_QUEUE_DEPTH, on_written=warm_thumbnails)
     
     def print_configuration(self):
         """Print current configuration settings"""
@@ -227,20 +497,31 @@ class CenterObjectClassifier:
         print("="*60)
         print(f"Center Region: {CENTER_REGION_WIDTH*100:.0f}% x {CENTER_REGION_HEIGHT*100:.0f}% of frame")
         print(f"Capture Cooldown: {CAPTURE_COOLDOWN} seconds")
-        print(f"Frame Processing: Every {FRAME_PROCESSING_RATE} frame(s)")
+        print(f"Frame Processing: Motion detection every {FRAME_PROCESSING_RATE} frame(s)")
+        print(f"Capture Scheduling: armed after {CAPTURE_PERSIST_FRAMES} motion frames, sharpest of {CAPTURE_SETTLE_FRAMES} still frames captured")
+        gate = self.local_gate
+        if gate is None:
+            print(f"Local Gate: {'Enabled' if LOCAL_GATE_ENABLED else 'Disabled'} (created when classification starts)")
+        elif gate.enabled:
+            print(f"Local Gate: hand score >= {LOCAL_GATE_MIN_HAND_SCORE}, center overlap >= {LOCAL_GATE_MIN_CENTER_OVERLAP*100:.0f}%, edge density >= {LOCAL_GATE_MIN_EDGE_DENSITY}, YOLO {'on' if gate.yolo is not None else 'off'}")
+        else:
+            print(f"Local Gate: Off ({gate.disabled_reason})")
+        print(f"Pipeline Queue Depths: capture={CAPTURE_QUEUE_DEPTH}, classify={CLASSIFY_QUEUE_DEPTH}, render={RENDER_QUEUE_DEPTH} (drop-oldest)")
         print(f"Motion Threshold: {MOTION_THRESHOLD} pixels")
         print(f"Motion Ratio Threshold: {MOTION_RATIO_THRESHOLD*100:.1f}% of center region")
+        print(f"Motion Analysis: pyramid level {MOTION_PYRAMID_LEVEL} (min width {MOTION_MIN_WIDTH}px), ROI padding {MOTION_ROI_PADDING*100:.0f}%")
         print(f"Scene Change Threshold: {HISTOGRAM_COMPARISON_THRESHOLD:.1f} correlation")
         print(f"Gemini Model: {GEMINI_MODEL}")
         print(f"Captures Directory: {self.captures_dir}")
-        print(f"Classification Cooldown: {CLASSIFICATION_COOLDOWN}s")
+        print(f"Perceptual Hash Cache: distance <= {PHASH_MAX_DISTANCE} bits, TTL {PHASH_TTL:.0f}s, {PHASH_MAX_ENTRIES} entries")
         print(f"Cart Update Cooldown: {CART_UPDATE_COOLDOWN}s (prevents duplicates)")
-        print(f"LLM Duplicate Check: Active (prevents similar items within 10s)")
+        print(f"Cart Duplicate Check: items within {CART_FUZZY_MATCH_WINDOW:.0f}s - local match >= {CART_MATCH_DUPLICATE_SCORE} duplicate, < {CART_MATCH_DISTINCT_SCORE} new, LLM in between")
         print(f"Similarity Threshold: {DEDUPLICATION_SIMILARITY_THRESHOLD}")
         print(f"Grocery Filtering: Active (only grocery items held by hands added to cart)")
         print(f"Confidence Threshold: {MIN_CONFIDENCE_THRESHOLD} (only high-confidence classifications)")
         print(f"Deal Analysis: {'Active' if GOOGLE_SCRAPE_AVAILABLE else 'Not available'} (Google Shopping + Gemini analysis for each item)")
         print(f"Google Scrape Module: {'Available' if GOOGLE_SCRAPE_AVAILABLE else 'Not found'}")
+        print(f"Deal Cache: {DEAL_CACHE_FILE} (TTL {DEAL_CACHE_TTL / 3600:.0f}h, stale up to {DEAL_CACHE_STALE_TTL / 3600:.0f}h more, max {DEAL_CACHE_MAX_ENTRIES} entries)")
         print("="*60)
         print("CURRENT PROMPT:")
         print("-" * 40)
@@ -313,18 +594,11 @@ class CenterObjectClassifier:
                 print(f"🚫 Ignoring non-grocery item: {object_name} ({category})")
                 continue
             
-            # Check if this is a duplicate of an existing item
-            if self.is_duplicate_item(object_name, normalized_brand):
-                print(f"🔄 Skipping duplicate item: {object_name} ({brand})")
-                continue
-            
-            # Check if a similar item was added recently using LLM
-            is_duplicate = await self.check_cart_duplicate_with_llm(object_name, brand, category, current_time)
-            if is_duplicate:
+            # Check if this is a duplicate of an existing item (memoized per cart version)
+            if await self.check_cart_duplicate(object_name, brand, category, current_time):
                 continue
             
             # Create a unique key for the item
-            normalized_brand = self.normalize_brand_name(brand)
             item_key = f"{object_name}_{normalized_brand}".lower()
             
             # Check cooldown to avoid duplicate additions (now 0 seconds = immediate updates)
@@ -355,126 +629,166 @@ class CenterObjectClassifier:
                 print(f"🛒 Added to cart: {object_name} ({normalized_brand})")
                 cart_modified = True
             
+            self.cart_matcher.add(item_key, object_name, normalized_brand)
             self.last_cart_update[item_key] = current_time
 
         if cart_modified:
             self._last_cart_update = current_time
             await self.schedule_cart_flush()
     
-    async def perform_deal_analysis(self, object_name: str, brand: str, category: str, item_key: str):
-        """Perform deal analysis for a newly added item"""
-        # Check if we already have cached deal analysis for this item
-        print(f"🔍 Checking cache for item_key: '{item_key}'")
+    def deal_cache_keys(self, item_key: str, brand: str) -> List[str]:
+        """Cache keys to try for an item: the exact item first, then brand-level warm entries"""
+        keys = [" ".join(item_key.lower().split())]
+        normalized_brand = self.normalize_brand_name(brand)
+        if normalized_brand != 'Unknown':
+            keys.append(f"brand:{normalized_brand.lower()}")
+        return keys
+    
+    def apply_deal_analysis(self, item_key: str, deal_analysis: Dict[str, Any], price: Optional[float] = None) -> bool:
+        """Store a deal analysis (and its price) on the cart item; returns True if the cart changed"""
+        self.deal_analysis_cache[item_key] = deal_analysis
+        if item_key not in self.cart:
+            return False
+        
+        self.cart[item_key]['deal_analysis'] = deal_analysis
+        if price is None:
+            price = self.extract_best_deal_price(deal_analysis.get('best_deal_message'))
+        if price is not None:
+            self.cart[item_key]['price'] = price
+        return True
+    
+    async def fetch_deal_analysis(self, object_name: str, brand: str, category: str) -> Optional[Dict[str, Any]]:
+        """Run a live Google Shopping search plus Gemini analysis for an item"""
+        if not GOOGLE_SCRAPE_AVAILABLE or not scrape_google_shopping_deals:
+            print("⚠️ Google scraping not available. Skipping live deal analysis.")
+            return None
         
-        # Smart cache lookup: check if item contains keywords for pre-cached items
-        cached_analysis = None
-        cached_price: Optional[float] = None
-        cache_matched_key = None
+        # Create search query for the item
+        search_query = f"{object_name} {brand}".strip()
+        print(f"🔍 Searching Google Shopping for deals: {search_query}")
         
-        # Keywords for pre-cached items
-        pringles_keywords = ['pringles', 'pringle']
-        coke_keywords = ['coca', 'coke', 'cola']
+        # Scrape Google Shopping for deals (fallback queries are sent concurrently)
+        deals_data = await scrape_google_shopping_deals_async(search_query, concurrent=DEAL_SEARCH_CONCURRENT_FALLBACKS)
+        if not deals_data:
+            print(f"❌ No deals found for {object_name}")
+            return None
         
-        item_key_lower = item_key.lower()
-        object_name_lower = object_name.lower()
-        brand_lower = brand.lower()
+        print(f"💰 Found {len(deals_data)} deals for {object_name}")
         
-        # Check if this is a Pringles product
-        if any(keyword in item_key_lower or keyword in object_name_lower or keyword in brand_lower 
-               for keyword in pringles_keywords):
-            print(f"💾 ✅ CACHE HIT! Detected Pringles product: {object_name}")
-            cached_analysis = {
-                "best_deal_message": "It looks like the best deal for the Pringles Cheddar Cheese chips is $1.75 at Dollar General!",
-                "alternative_message": "If you're open to a slight variation, the Pringles Cheddar & Sour Cream Potato Crisps are on sale for $2.19 at Target, which is a really popular flavor too. As for the sustainability side of things, Pringles face sustainability challenges due to their non-recyclable mixed-material packaging and use of processed ingredients, though the brand has made limited efforts toward more recyclable can designs."
-            }
-            cached_price = 1.75
-            cache_matched_key = "pringles_products"
-        
-        # Check if this is a Coca-Cola/Coke product
-        elif any(keyword in item_key_lower or keyword in object_name_lower or keyword in brand_lower 
-                 for keyword in coke_keywords):
-            print(f"💾 ✅ CACHE HIT! Detected Coca-Cola/Coke product: {object_name}")
-            cached_analysis = {
-                "best_deal_message": "It looks like the best deal for a single can of Coca Cola Original is $1.35 at Dollar General!",
-                "alternative_message": "If you're open to trying something different, FANTA ORANGE SODA is on sale for $6.69 at Walgreens, which is a fun fruity option. As for the Nutritonal Side of things it is important to note that, recent research on Coca-Cola suggests it may disrupt the gut microbiome and be linked to depression, with one study proposing a “molecular addiction” in the intestines driven by high sugar intake."
-            }
-            cached_price = 1.35
-            cache_matched_key = "coca_cola_products"
+        # Analyze deals with Gemini
+        deal_analysis = await self.analyze_deals_with_gemini(object_name, brand, category, deals_data)
+        if not deal_analysis:
+            print(f"❌ Failed to analyze deals for {object_name}")
+            return None
         
-        # Use cached analysis if found
-        if cached_analysis:
-            # Store in cache for future exact matches
-            self.deal_analysis_cache[item_key] = cached_analysis
+        return {
+            "search_query": search_query,
+            "deals_data": deals_data,
+            "analysis": deal_analysis,
+            "price": self.extract_best_deal_price(deal_analysis.get('best_deal_message'))
+        }
+    
+    async def refresh_deal_analysis(self, object_name: str, brand: str, category: str, item_key: str):
+        """Revalidate a stale cache entry in the background"""
+        cache_key = self.deal_cache_keys(item_key, brand)[0]
+        if cache_key in self._refreshing_deal_keys:
+            return
+        
+        self._refreshing_deal_keys.add(cache_key)
+        try:
+            print(f"♻️  Refreshing stale deal analysis for: {object_name}")
+            live_result = await self.fetch_deal_analysis(object_name, brand, category)
+            if live_result and not live_result['analysis'].get('error'):
+                await asyncio.to_thread(self.deal_cache.set, cache_key, {
+                    "analysis": live_result['analysis'],
+                    "price": live_result['price']
+                })
+                if self.apply_deal_analysis(item_key, live_result['analysis'], live_result['price']):
+                    await self.schedule_cart_flush()
+        except Exception as e:
+            print(f"⚠️ Error refreshing deal analysis for {object_name}: {e}")
+        finally:
+            self._refreshing_deal_keys.discard(cache_key)
+    
+    async def perform_deal_analysis(self, object_name: str, brand: str, category: str, item_key: str):
+        """Perform deal analysis for a newly added item"""
+        print(f"🔍 Checking cache for item_key: '{item_key}'")
+        
+        # Look up the persistent cache (exact item first, then brand-level warm entries)
+        cache_entry = None
+        for cache_key in self.deal_cache_keys(item_key, brand):
+            cache_entry = await asyncio.to_thread(self.deal_cache.get, cache_key)
+            if cache_entry:
+                break
+        
+        if cache_entry:
+            cached_analysis = cache_entry.value['analysis']
+            freshness = "stale" if cache_entry.stale else "fresh"
+            print(f"💾 ✅ CACHE HIT ({freshness}, key '{cache_entry.key}', age {cache_entry.age / 60:.0f} min): {object_name}")
             
-            # Update the cart item with cached analysis
-            if item_key in self.cart:
-                self.cart[item_key]['deal_analysis'] = cached_analysis
-                if cached_price is not None:
-                    self.cart[item_key]['price'] = cached_price
-                else:
-                    extracted_price = self.extract_best_deal_price(cached_analysis.get('best_deal_message'))
-                    if extracted_price is not None:
-                        self.cart[item_key]['price'] = extracted_price
+            if self.apply_deal_analysis(item_key, cached_analysis, cache_entry.value.get('price')):
                 await self.schedule_cart_flush()
             
+            self.record_deal_analysis({
+                "timestamp": datetime.now().isoformat(),
+                "item_name": object_name,
+                "brand": brand,
+                "category": category,
+                "cache_key": cache_entry.key,
+                "analysis": cached_analysis,
+                "cached": True,
+                "stale": cache_entry.stale
+            })
+            
+            # Serve the stale entry now and refresh it in the background
+            if cache_entry.stale:
+                task = asyncio.create_task(self.refresh_deal_analysis(object_name, brand, category, item_key))
+                self.background_tasks.add(task)
+                task.add_done_callback(self.background_tasks.discard)
+            
             # Print the cached analysis summary (with item_key to prevent re-speaking)
             await self.print_deal_analysis_summary(cached_analysis, object_name, item_key)
             return
-        else:
-            print(f"❌ CACHE MISS! No cached analysis found for: '{item_key}'")
-            print(f"   Will perform Google Shopping search...")
         
-        if not GOOGLE_SCRAPE_AVAILABLE or not scrape_google_shopping_deals:
-            print("⚠️ Google scraping not available. Skipping live deal analysis.")
-            return
+        print(f"❌ CACHE MISS! No cached analysis found for: '{item_key}'")
+        print(f"   Will perform Google Shopping search...")
             
         try:
-            # Create search query for the item
-            search_query = f"{object_name} {brand}".strip()
-            print(f"🔍 Searching Google Shopping for deals: {search_query}")
+            live_result = await self.fetch_deal_analysis(object_name, brand, category)
+            if not live_result:
+                return
+            
+            deal_analysis = live_result['analysis']
+            
+            # Cache the deal analysis for future sessions (error placeholders are not cached)
+            if not deal_analysis.get('error'):
+                cache_key = self.deal_cache_keys(item_key, brand)[0]
+                await asyncio.to_thread(self.deal_cache.set, cache_key, {
+                    "analysis": deal_analysis,
+                    "price": live_result['price']
+                })
+                print(f"💾 Cached deal analysis for: {object_name}")
+            
+            # Store deal analysis in cart item
+            if self.apply_deal_analysis(item_key, deal_analysis, live_result['price']):
+                await self.schedule_cart_flush()
             
-            # Scrape Google Shopping for deals using the existing function
-            deals_data = scrape_google_shopping_deals(search_query)
+            # Store in deal analysis results
+            deal_record = {
+                "timestamp": datetime.now().isoformat(),
+                "item_name": object_name,
+                "brand": brand,
+                "category": category,
+                "search_query": live_result['search_query'],
+                "deals_found": len(live_result['deals_data']),
+                "deals_data": live_result['deals_data'],
+                "analysis": deal_analysis,
+                "cached": False  # First time analysis
+            }
+            self.record_deal_analysis(deal_record)
             
-            if deals_data:
-                print(f"💰 Found {len(deals_data)} deals for {object_name}")
-                
-                # Analyze deals with Gemini
-                deal_analysis = await self.analyze_deals_with_gemini(object_name, brand, category, deals_data)
-                
-                if deal_analysis:
-                    # Cache the deal analysis for future use
-                    self.deal_analysis_cache[item_key] = deal_analysis
-                    print(f"💾 Cached deal analysis for: {object_name}")
-                    
-                    # Store deal analysis in cart item
-                    if item_key in self.cart:
-                        self.cart[item_key]['deal_analysis'] = deal_analysis
-                        extracted_price = self.extract_best_deal_price(deal_analysis.get('best_deal_message'))
-                        if extracted_price is not None:
-                            self.cart[item_key]['price'] = extracted_price
-                        await self.schedule_cart_flush()
-                    
-                    # Store in deal analysis results
-                    deal_record = {
-                        "timestamp": datetime.now().isoformat(),
-                        "item_name": object_name,
-                        "brand": brand,
-                        "category": category,
-                        "search_query": search_query,
-                        "deals_found": len(deals_data),
-                        "deals_data": deals_data,
-                        "analysis": deal_analysis,
-                        "cached": False  # First time analysis
-                    }
-                    self.deal_analysis_results.append(deal_record)
-                    
-                    # Print deal analysis summary (with item_key to track if already spoken)
-                    await self.print_deal_analysis_summary(deal_analysis, object_name, item_key)
-                else:
-                    print(f"❌ Failed to analyze deals for {object_name}")
-            else:
-                print(f"❌ No deals found for {object_name}")
+            # Print deal analysis summary (with item_key to track if already spoken)
+            await self.print_deal_analysis_summary(deal_analysis, object_name, item_key)
                 
         except Exception as e:
             print(f"❌ Error performing deal analysis for {object_name}: {e}")
@@ -595,7 +909,7 @@ class CenterObjectClassifier:
         print(f"Total items: {total_items}")
         print(f"Unique items: {len(self.cart)}")
         print(f"Deal analyses completed: {len([item for item in self.cart.values() if item.get('deal_analysis')])}")
-        print(f"Cached deal analyses: {len(self.deal_analysis_cache)}")
+        print(f"Cached deal analyses: {len(self.deal_analysis_cache)} this session, {len(self.deal_cache)} persistent")
         if self.bag_detected:
             print(f"Bag detected: Yes (confidence: {self.bag_detection_confidence:.2f})")
         print("="*60)
@@ -696,88 +1010,58 @@ class CenterObjectClassifier:
     
     def is_duplicate_item(self, object_name: str, brand: str) -> bool:
         """Check if this item is too similar to existing cart items"""
-        normalized_name = object_name.lower()
-        normalized_brand = brand.lower()
-        
-        for existing_key, existing_item in self.cart.items():
-            existing_name = existing_item['name'].lower()
-            existing_brand = existing_item['brand'].lower()
-            
-            # Check if names are very similar (accounting for minor variations)
-            name_similarity = self.calculate_name_similarity(normalized_name, existing_name)
-            
-            # Check if brands are the same or very similar
-            brand_similarity = self.calculate_name_similarity(normalized_brand, existing_brand)
-            
-            # If both name and brand are very similar, consider it a duplicate
-            if name_similarity > 0.8 and brand_similarity > 0.8:
-                return True
-        
-        return False
+        return bool(self.cart_matcher.similar_keys(object_name, brand, 0.8))
     
     def calculate_name_similarity(self, name1: str, name2: str) -> float:
-        """Calculate similarity between two names (improved implementation)"""
-        if not name1 or not name2:
-            return 0.0
-        
-        # Remove common words that don't affect similarity
-        common_words = ['can', 'bottle', 'box', 'pack', 'container', 'the', 'a', 'an', 'grab', 'go', 'snack', 'potato', 'crisps']
-        words1 = [w.lower() for w in name1.split() if w.lower() not in common_words]
-        words2 = [w.lower() for w in name2.split() if w.lower() not in common_words]
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        # Check for exact brand matches (e.g., "pringles" in both names)
-        brand_words = ['pringles', 'coca-cola', 'coke', 'diet', 'ensure']
-        brand_match = any(brand in words1 and brand in words2 for brand in brand_words)
-        
-        if brand_match:
-            # If same brand, check if core product is similar
-            core_words1 = [w for w in words1 if w not in brand_words]
-            core_words2 = [w for w in words2 if w not in brand_words]
-            
-            if not core_words1 or not core_words2:
-                return 0.9  # Same brand, no specific product differences
-            
-            # Check core product similarity
-            overlap = len(set(core_words1) & set(core_words2))
-            total = len(set(core_words1) | set(core_words2))
-            similarity = overlap / total if total > 0 else 0.0
-            
-            # Boost similarity for same brand
-            return min(0.95, similarity + 0.3)
-        
-        # Regular word overlap calculation
-        overlap = len(set(words1) & set(words2))
-        total = len(set(words1) | set(words2))
-        
-        return overlap / total if total > 0 else 0.0
+        """Calculate similarity between two names (stop words removed, shared brand words boost the score)"""
+        return name_similarity(frozenset(normalize_tokens(name1)), frozenset(normalize_tokens(name2)))
     
     def has_recent_similar_item(self, object_name: str, brand: str, current_time: float) -> bool:
         """Check if a similar item was added to cart within the fuzzy match window"""
-        for item_key, item_data in self.cart.items():
-            existing_name = item_data['name']
-            existing_brand = item_data['brand']
-            last_seen = item_data.get('last_seen', 0)
-            
-            # Check if within time window
-            time_diff = current_time - last_seen
-            if time_diff > CART_FUZZY_MATCH_WINDOW:
-                continue  # Too old, skip
-            
-            # Check similarity
-            name_similarity = self.calculate_name_similarity(object_name.lower(), existing_name.lower())
-            brand_similarity = self.calculate_name_similarity(brand.lower(), existing_brand.lower())
-            
-            # If both name and brand are very similar, and within time window
-            if name_similarity > 0.7 and brand_similarity > 0.7:
-                return True
+        return any(
+            current_time - self.cart[item_key].get('last_seen', 0) <= CART_FUZZY_MATCH_WINDOW
+            for item_key in self.cart_matcher.similar_keys(object_name, brand, 0.7)
+        )
+    
+    async def check_cart_duplicate(self, object_name: str, brand: str, category: str, current_time: float) -> bool:
+        """Check an item against the cart locally, asking the LLM only when the local score is ambiguous"""
+        normalized_brand = self.normalize_brand_name(brand)
+        candidate = f"{object_name}_{normalized_brand}".lower()
+        version = self.cart_matcher.version
+        
+        cached = self.cart_matcher.recall(candidate, current_time)
+        if cached is not None:
+            return cached
+        
+        # Only entries seen within the fuzzy match window can be a re-detection,
+        # so the verdict holds until the first of them leaves the window
+        recent = [
+            match for match in self.cart_matcher.match(object_name, normalized_brand)
+            if self.cart_matcher.classify(match) != "distinct"
+            and current_time - self.cart[match.key].get('last_seen', 0) <= CART_FUZZY_MATCH_WINDOW
+        ]
+        expires_at = min(
+            (self.cart[match.key].get('last_seen', 0) + CART_FUZZY_MATCH_WINDOW for match in recent),
+            default=math.inf
+        )
+        
+        duplicate = next((match for match in recent if self.cart_matcher.classify(match) == "duplicate"), None)
+        if duplicate is not None:
+            print(f"🔄 Skipping duplicate item: {object_name} (similar to {self.cart[duplicate.key]['name']}, score {duplicate.exact_score:.2f})")
+            is_duplicate = True
+        elif recent:
+            is_duplicate = await self.check_cart_duplicate_with_llm(
+                object_name, brand, category, current_time, [match.key for match in recent]
+            )
+        else:
+            is_duplicate = False
         
-        return False
+        self.cart_matcher.remember(candidate, is_duplicate, version, expires_at)
+        return is_duplicate
     
-    async def check_cart_duplicate_with_llm(self, object_name: str, brand: str, category: str, current_time: float) -> bool:
-        """Use LLM to check if this item is a duplicate of something added recently"""
+    async def check_cart_duplicate_with_llm(self, object_name: str, brand: str, category: str, current_time: float,
+                                            item_keys: Optional[List[str]] = None) -> bool:
+        """Use LLM to check if this item is a duplicate of something added recently (item_keys limits the cart entries sent)"""
         if not self.gemini_client or not GEMINI_AVAILABLE:
             return False
         
@@ -786,7 +1070,10 @@ class CenterObjectClassifier:
             cart_contents = []
             timestamps = []
             
-            for item_key, item_data in self.cart.items():
+            for item_key in (item_keys if item_keys is not None else list(self.cart)):
+                item_data = self.cart.get(item_key)
+                if item_data is None:
+                    continue
                 cart_contents.append(f"- {item_data['name']} ({item_data['brand']}) - {item_data['category']}")
                 timestamps.append(f"- {item_data['name']}: {item_data.get('last_seen', 0)}")
             
@@ -850,55 +1137,96 @@ class CenterObjectClassifier:
             print(f"❌ Error checking cart duplicate with LLM: {e}")
             return False
     
-    def should_skip_classification(self, current_time: float) -> bool:
-        """Check if we should skip classification due to API cooldown"""
-        time_diff = current_time - self.last_api_call_time
-        
-        # Skip if within API cooldown period
-        if time_diff < CLASSIFICATION_COOLDOWN:
-            return True
-        
-        return False
+    def is_accepted_classification(self, classification: Dict[str, Any]) -> bool:
+        """Whether a classification names a real item with enough confidence to act on (and to cache)"""
+        return (not classification.get('error') and
+                classification.get('confidence', 0.0) >= MIN_CONFIDENCE_THRESHOLD and
+                classification.get('object_name', 'Unknown') not in NON_ITEM_OBJECT_NAMES)
     
+    def record_classification(self, classification_record: Dict[str, Any]) -> None:
+        """Count a classification and append it to the results event log"""
+        self.classification_counts["total"] += 1
+        if classification_record.get('success', False):
+            self.classification_counts["successful"] += 1
+        else:
+            self.classification_counts["failed"] += 1
+        if classification_record.get('skipped', False):
+            self.classification_counts["skipped"] += 1
+        self.results_log.append(CLASSIFICATION_EVENT, classification_record)
+
+    def record_deal_analysis(self, deal_record: Dict[str, Any]) -> None:
+        """Count a deal analysis and append it to the results event log"""
+        self.deal_analysis_counts["total"] += 1
+        if deal_record.get('analysis'):
+            self.deal_analysis_counts["successful"] += 1
+        if deal_record.get('cached', False):
+            self.deal_analysis_counts["cached"] += 1
+        self.deal_analysis_counts["deals_found"] += deal_record.get('deals_found', 0)
+        self.items_analyzed.add(deal_record.get('item_name', ''))
+        self.results_log.append(DEAL_ANALYSIS_EVENT, deal_record)
+
+    def build_classification_summary(self) -> Dict[str, Any]:
+        """Construct the classification summary data structure."""
+        counts = self.classification_counts
+        return {
+            "total_classifications": counts["total"],
+            "successful_classifications": counts["successful"],
+            "failed_classifications": counts["failed"],
+            "skipped_classifications": counts["skipped"],
+            "actual_api_calls": counts["total"] - counts["skipped"],
+            "deduplication_rate": counts["skipped"] / max(counts["total"], 1) * 100
+        }
+
     def save_results_to_json(self):
-        """Save final cart and all classifications to results.json"""
-        results = {
+        """Append new events to the results log and write the compact results.json snapshot"""
+        snapshot = {
             "timestamp": datetime.now().isoformat(),
             "total_frames_processed": self.frame_count,
             "bag_detected": self.bag_detected,
             "bag_detection_confidence": self.bag_detection_confidence,
             "shopping_cart": self.cart,
             "cart_summary": self.build_cart_summary(),
-            "all_classifications": self.all_classifications,
-            "classification_summary": {
-                "total_classifications": len(self.all_classifications),
-                "successful_classifications": len([c for c in self.all_classifications if c.get('success', False)]),
-                "failed_classifications": len([c for c in self.all_classifications if not c.get('success', False)]),
-                "skipped_classifications": len([c for c in self.all_classifications if c.get('skipped', False)]),
-                "actual_api_calls": len([c for c in self.all_classifications if not c.get('skipped', False)]),
-                "deduplication_rate": len([c for c in self.all_classifications if c.get('skipped', False)]) / max(len(self.all_classifications), 1) * 100
-            },
-            "deal_analysis_results": self.deal_analysis_results,
+            "classification_summary": self.build_classification_summary(),
             "deal_analysis_cache": self.deal_analysis_cache,
-            "deal_analysis_summary": {
-                "total_deal_analyses": len(self.deal_analysis_results),
-                "successful_analyses": len([d for d in self.deal_analysis_results if d.get('analysis')]),
-                "total_deals_found": sum(d.get('deals_found', 0) for d in self.deal_analysis_results),
-                "items_analyzed": list(set(d.get('item_name', '') for d in self.deal_analysis_results)),
-                "cached_items": len(self.deal_analysis_cache),
-                "cache_hit_rate": f"{(len([d for d in self.deal_analysis_results if d.get('cached', False)]) / max(len(self.deal_analysis_results), 1)) * 100:.1f}%"
-            }
+            "deal_analysis_summary": self.build_deal_analysis_summary()
         }
         
         try:
-            with open(self.results_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-            print(f"\n📄 Results saved to {self.results_file}")
+            new_events = self.results_log.flush()
+            self.results_log.write_snapshot(snapshot)
+            print(f"\n📄 Results saved to {self.results_file} (+{new_events} events in {self.results_log.log_file})")
         except Exception as e:
             print(f"❌ Error saving results to JSON: {e}")
     
+    def build_deal_analysis_summary(self) -> Dict[str, Any]:
+        """Construct the deal analysis summary data structure."""
+        return {
+            "total_deal_analyses": self.deal_analysis_counts["total"],
+            "successful_analyses": self.deal_analysis_counts["successful"],
+            "total_deals_found": self.deal_analysis_counts["deals_found"],
+            "items_analyzed": sorted(self.items_analyzed),
+            "cached_items": len(self.deal_analysis_cache),
+            "cache_hit_rate": f"{self.deal_analysis_counts['cached'] / max(self.deal_analysis_counts['total'], 1) * 100:.1f}%",
+            "persistent_cache": self.deal_cache.stats()
+        }
+
+    def publish_cart_state(self) -> int:
+        """Publish the current cart to the in-process cart store and return its version."""
+        return self.state_store.publish({
+            "timestamp": datetime.now().isoformat(),
+            "total_frames_processed": self.frame_count,
+            "bag_detected": self.bag_detected,
+            "bag_detection_confidence": self.bag_detection_confidence,
+            "shopping_cart": self.cart,
+            "cart_summary": self.build_cart_summary(),
+            "deal_analysis_cache": self.deal_analysis_cache,
+            "deal_analysis_summary": self.build_deal_analysis_summary()
+        })
+
     async def schedule_cart_flush(self) -> None:
-        """Schedule a delayed cart deduplication and results save."""
+        """Publish the cart state and schedule a delayed deduplication and results save."""
+        self.publish_cart_state()
+
         if self._flush_task and not self._flush_task.done():
             self._flush_task.cancel()
 
@@ -914,14 +1242,16 @@ class CenterObjectClassifier:
     async def deduplicate_and_save_cart(self) -> None:
         """Deduplicate cart entries and persist the latest state to disk."""
         self.deduplicate_cart_entries()
+        self.publish_cart_state()
         await asyncio.to_thread(self.save_results_to_json)
 
     def deduplicate_cart_entries(self) -> None:
         """Merge similar cart entries into single consolidated records."""
         deduplicated_cart: Dict[str, Dict[str, Any]] = {}
+        deduplicated_index = CartIndex()
 
         for item_key, item_data in self.cart.items():
-            merged_key = self._find_matching_cart_key(deduplicated_cart, item_data)
+            merged_key = self._find_matching_cart_key(deduplicated_index, item_data)
 
             if merged_key:
                 merged_item = deduplicated_cart[merged_key]
@@ -939,8 +1269,10 @@ class CenterObjectClassifier:
                     merged_item['image_path'] = item_data['image_path']
             else:
                 deduplicated_cart[item_key] = item_data.copy()
+                deduplicated_index.add(item_key, item_data.get('name', ''), item_data.get('brand', ''))
 
         self.cart = deduplicated_cart
+        self.cart_matcher.rebuild(self.cart)
 
     def build_cart_summary(self) -> Dict[str, Any]:
         """Construct the cart summary data structure."""
@@ -962,19 +1294,10 @@ class CenterObjectClassifier:
         totals['total_price'] = round(total_price, 2)
         return totals
 
-    def _find_matching_cart_key(self, existing_cart: Dict[str, Dict[str, Any]], candidate: Dict[str, Any]) -> Optional[str]:
-        """Identify an existing cart entry that matches the candidate item."""
-        candidate_name = candidate.get('name', '').lower()
-        candidate_brand = candidate.get('brand', '').lower()
-
-        for key, existing_item in existing_cart.items():
-            name_similarity = self.calculate_name_similarity(candidate_name, existing_item.get('name', '').lower())
-            brand_similarity = self.calculate_name_similarity(candidate_brand, existing_item.get('brand', '').lower())
-
-            if name_similarity > 0.8 and brand_similarity > 0.8:
-                return key
-
-        return None
+    def _find_matching_cart_key(self, index: CartIndex, candidate: Dict[str, Any]) -> Optional[str]:
+        """Identify an indexed cart entry that matches the candidate item."""
+        matches = index.similar_keys(candidate.get('name', ''), candidate.get('brand', ''), 0.8)
+        return matches[0] if matches else None
 
     def extract_best_deal_price(self, best_deal_message: Optional[str]) -> Optional[float]:
         """Extract numeric price from a best deal message."""
@@ -991,27 +1314,27 @@ class CenterObjectClassifier:
             return None
 
 
+    def create_local_gate(self) -> LocalGate:
+        """Build the local pre-classifier gate (may download the hand model; call off the event loop)"""
+        return LocalGate(
+            hand_model=LOCAL_GATE_HAND_MODEL,
+            min_hand_score=LOCAL_GATE_MIN_HAND_SCORE,
+            grasp_expansion=LOCAL_GATE_GRASP_EXPANSION,
+            min_center_overlap=LOCAL_GATE_MIN_CENTER_OVERLAP,
+            min_edge_density=LOCAL_GATE_MIN_EDGE_DENSITY,
+            yolo_model=LOCAL_GATE_YOLO_MODEL,
+            yolo_confidence=LOCAL_GATE_YOLO_CONFIDENCE,
+            enabled=LOCAL_GATE_ENABLED
+        )
+    
     def setup_gemini_client(self):
-        """Initialize Gemini client"""
-        if not GEMINI_AVAILABLE:
-            print("Gemini library not available. Classification will be skipped.")
-            return False
-            
-        print("Setting up Gemini client...")
-        try:
-            gemini_api_key = GEMINI_API_KEY
-            if not gemini_api_key:
-                print("Warning: No Gemini API key found. Classification will be skipped.")
-                return False
-            
-            # Configure the API key
-            genai.configure(api_key=gemini_api_key)
-            self.gemini_client = genai.GenerativeModel(GEMINI_MODEL)
-            print("Gemini client initialized successfully!")
-            return True
-        except Exception as e:
-            print(f"Error setting up Gemini client: {e}")
-            return False
+        """Initialize Gemini client and classification batcher (no-op when shared ones were passed in)"""
+        if self.gemini_client is None:
+            self.gemini_client = create_gemini_client()
+        if self.gemini_client is not None and self.gemini_batcher is None:
+            # Own batcher: this session is its only user, so there is nothing to wait for
+            self.gemini_batcher = create_classification_batcher(self.gemini_client, max_wait=0.0)
+        return self.gemini_client is not None
     
     def get_center_region(self, frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
         """Calculate center region coordinates"""
@@ -1050,90 +1373,6 @@ class CenterObjectClassifier:
         
         return False
     
-    def detect_motion_in_center(self, frame: cv2.Mat, center_region: Tuple[int, int, int, int]) -> bool:
-        """Detect motion in the center region using background subtraction"""
-        # Apply background subtraction
-        fg_mask = self.background_subtractor.apply(frame)
-        
-        # Extract center region from mask
-        left, top, right, bottom = center_region
-        center_mask = fg_mask[top:bottom, left:right]
-        
-        # Count non-zero pixels (motion pixels)
-        motion_pixels = cv2.countNonZero(center_mask)
-        center_area = (right - left) * (bottom - top)
-        motion_ratio = motion_pixels / center_area if center_area > 0 else 0
-        
-        # Return True if significant motion detected
-        return motion_ratio > MOTION_RATIO_THRESHOLD
-    
-    def detect_scene_change(self, frame: cv2.Mat) -> bool:
-        """Detect scene changes using histogram comparison"""
-        # Convert to grayscale for histogram comparison
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate histogram
-        current_histogram = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        
-        if self.previous_histogram is not None:
-            # Compare histograms using correlation
-            correlation = cv2.compareHist(self.previous_histogram, current_histogram, cv2.HISTCMP_CORREL)
-            
-            # If correlation is below threshold, scene has changed
-            scene_changed = correlation < HISTOGRAM_COMPARISON_THRESHOLD
-            
-            # if scene_changed:
-                # print(f"Scene change detected! Correlation: {correlation:.3f}")
-            
-            return scene_changed
-        
-        # Store current histogram for next comparison
-        self.previous_histogram = current_histogram
-        return False
-    
-    def detect_motion_improved(self, frame: cv2.Mat, center_region: Tuple[int, int, int, int]) -> Dict[str, Any]:
-        """Improved motion detection with multiple methods"""
-        left, top, right, bottom = center_region
-        
-        # Method 1: Background subtraction
-        fg_mask = self.background_subtractor.apply(frame)
-        center_mask = fg_mask[top:bottom, left:right]
-        motion_pixels_bg = cv2.countNonZero(center_mask)
-        
-        # Method 2: Frame differencing
-        motion_pixels_diff = 0
-        if self.previous_frame is not None:
-            # Convert to grayscale
-            prev_gray = cv2.cvtColor(self.previous_frame, cv2.COLOR_BGR2GRAY)
-            curr_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate difference
-            diff = cv2.absdiff(prev_gray, curr_gray)
-            
-            # Apply threshold
-            _, thresh = cv2.threshold(diff, MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)
-            
-            # Extract center region
-            center_diff = thresh[top:bottom, left:right]
-            motion_pixels_diff = cv2.countNonZero(center_diff)
-        
-        # Calculate motion ratios
-        center_area = (right - left) * (bottom - top)
-        motion_ratio_bg = motion_pixels_bg / center_area if center_area > 0 else 0
-        motion_ratio_diff = motion_pixels_diff / center_area if center_area > 0 else 0
-        
-        # Combine both methods
-        motion_detected = motion_ratio_bg > MOTION_RATIO_THRESHOLD or motion_ratio_diff > MOTION_RATIO_THRESHOLD
-        
-        return {
-            'motion_detected': motion_detected,
-            'motion_ratio_bg': motion_ratio_bg,
-            'motion_ratio_diff': motion_ratio_diff,
-            'motion_pixels_bg': motion_pixels_bg,
-            'motion_pixels_diff': motion_pixels_diff
-        }
-    
-    
     def draw_center_region(self, frame: cv2.Mat, center_region: Tuple[int, int, int, int]):
         """Draw center region rectangle on frame"""
         left, top, right, bottom = center_region
@@ -1141,8 +1380,8 @@ class CenterObjectClassifier:
         cv2.putText(frame, "CENTER REGION", (left, top - 10), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
     
-    def capture_image(self, frame: cv2.Mat, detection_info: Dict[str, Any]) -> Optional[str]:
-        """Capture and save image with detection info"""
+    def capture_image(self, frame: cv2.Mat, detection_info: Dict[str, Any]) -> Optional[Tuple[str, bytes]]:
+        """Encode a capture in memory and queue it for saving; returns (path, JPEG bytes)"""
         current_time = time.time()
         
         # Check cooldown
@@ -1154,65 +1393,36 @@ class CenterObjectClassifier:
         label = detection_info.get('label', 'object')
         confidence = detection_info.get('confidence', 0.0)
         filename = f"{timestamp}_{label}_{confidence:.2f}.jpg"
+        if self.session_name:
+            filename = f"{self.session_name}_{filename}"
         filepath = self.captures_dir / filename
         
-        # Save image
-        success = cv2.imwrite(str(filepath), frame)
+        # Encode once; the same bytes are classified and written to disk in the background
+        success, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, CAPTURE_JPEG_QUALITY])
         if success:
+            image_bytes = encoded.tobytes()
+            self.capture_writer.submit(filepath, image_bytes)
             self.last_capture_time = current_time
             print(f"Captured image: {filename}")
-            return str(filepath)
+            return str(filepath), image_bytes
         
         return None
     
-    async def classify_with_gemini(self, image_path: str) -> Optional[Dict[str, Any]]:
-        """Classify image using Gemini API"""
+    async def classify_with_gemini(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+        """Classify image using Gemini API (uses in-memory JPEG bytes when given; requests are batched)"""
         if not self.gemini_client or not GEMINI_AVAILABLE:
             return None
         
         try:
-            # Load image
-            import PIL.Image
-            image = PIL.Image.open(image_path)
-            
-            # Use the configured prompt
-            prompt = GEMINI_PROMPT
-            
-            # Generate content
-            response = await asyncio.to_thread(
-                self.gemini_client.generate_content,
-                [prompt, image]
-            )
-            
-            # Parse response
-            response_text = response.text if hasattr(response, 'text') else str(response)
-            if response_text:
-                # Try to extract JSON from response
-                try:
-                    # Look for JSON in the response
-                    if "```json" in response_text:
-                        json_start = response_text.find("```json") + 7
-                        json_end = response_text.find("```", json_start)
-                        json_text = response_text[json_start:json_end].strip()
-                    elif "{" in response_text and "}" in response_text:
-                        json_start = response_text.find("{")
-                        json_end = response_text.rfind("}") + 1
-                        json_text = response_text[json_start:json_end]
-                    else:
-                        json_text = response_text
-                    
-                    result = json.loads(json_text)
-                    return result
-                except json.JSONDecodeError:
-                    return {
-                        "object_name": "Unknown",
-                        "description": response_text,
-                        "category": "Unknown",
-                        "confidence": 0.5,
-                        "raw_response": response_text
-                    }
+            # Use the encoded capture directly; fall back to loading from disk
+            if image_bytes is not None:
+                image = {"mime_type": "image/jpeg", "data": image_bytes}
+            else:
+                import PIL.Image
+                image = PIL.Image.open(image_path)
             
-            return None
+            # Concurrent captures (e.g. several host sessions) share one multi-image request
+            return await self.gemini_batcher.submit(image)
             
         except Exception as e:
             print(f"Error classifying with Gemini: {e}")
@@ -1306,7 +1516,8 @@ class CenterObjectClassifier:
                         "alternatives": [],
                         "recommendations": ["Could not parse deal analysis - Gemini returned invalid JSON"],
                         "analysis": f"Error parsing response: {str(e)}",
-                        "raw_response": response_text[:500]
+                        "raw_response": response_text[:500],
+                        "error": f"Invalid JSON: {str(e)}"  # Keeps the placeholder out of the deal cache
                     }
             
             return None
@@ -1334,14 +1545,16 @@ class CenterObjectClassifier:
     
     async def process_frame(self, frame: cv2.Mat) -> Dict[str, Any]:
         """Process a single frame for center object detection using motion and scene change"""
+        return self.analyze_frame(frame)
+    
+    def analyze_frame(self, frame: cv2.Mat) -> Dict[str, Any]:
+        """Synchronous motion/scene-change analysis used by the pipeline's analysis stage"""
         frame_height, frame_width = frame.shape[:2]
         center_region = self.get_center_region(frame_width, frame_height)
         
-        # Detect scene changes
-        scene_changed = self.detect_scene_change(frame)
-        
-        # Detect motion in center region with improved method
-        motion_data = self.detect_motion_improved(frame, center_region)
+        # Detect scene changes and motion in the center region (single downscaled pass)
+        motion_data = self.motion_engine.process(frame, center_region)
+        scene_changed = motion_data['scene_changed']
         motion_detected = motion_data['motion_detected']
         
         center_objects = []
@@ -1359,9 +1572,6 @@ class CenterObjectClassifier:
             center_objects.append(detection_info)
             all_detections.append(detection_info)
         
-        # Store current frame for next comparison
-        self.previous_frame = frame.copy()
-        
         return {
             'center_region': center_region,
             'center_objects': center_objects,
@@ -1445,14 +1655,307 @@ class CenterObjectClassifier:
             cv2.putText(frame, line, (10, 30 + i * 25), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
     
-    async def run(self, video_source=None, camera_id=2):
-        """Main loop for video processing"""
+    async def handle_capture(self, capture_job: Dict[str, Any]):
+        """Classify a captured image and update the cart (classification stage)"""
+        best_object = capture_job['detection']
+        image_path = capture_job['image_path']
+        frame_number = capture_job['frame_number']
+        current_time = capture_job['captured_at']
+        
+        # Always print detection info
+        print(f"🔍 Object detected: {best_object['label']} (source: {best_object.get('source', 'unknown')}) - Frame {frame_number}")
+        
+        # Near-duplicate of a recently classified capture: reuse its result
+        fingerprint = capture_job.get('fingerprint')
+        cached = self.classification_cache.lookup(fingerprint) if fingerprint is not None else None
+        if cached:
+            cached_result, distance = cached
+            print(f"🧬 Near-duplicate capture (hash distance {distance}) - reusing cached classification")
+            self.record_classification({
+                "timestamp": datetime.now().isoformat(),
+                "frame_number": frame_number,
+                "detection_source": best_object.get('source', 'unknown'),
+                "image_path": image_path,
+                "success": True,
+                "result": cached_result,
+                "error": None,
+                "skipped": True,
+                "reason": "perceptual_hash_match",
+                "hash_distance": distance
+            })
+            await self.update_cart(cached_result, image_path)
+            return
+        
+        # A capture that matched no cached fingerprint is a new object and goes straight to the API
+        print(f"🤖 Making API call to classify...")
+        classification = await self.classify_with_gemini(image_path, capture_job.get('image_bytes'))
+        
+        # Track classification result
+        classification_record = {
+            "timestamp": datetime.now().isoformat(),
+            "frame_number": frame_number,
+            "detection_source": best_object.get('source', 'unknown'),
+            "image_path": image_path,
+            "success": classification is not None,
+            "result": classification,
+            "error": None if classification else "Classification returned None",
+            "skipped": False
+        }
+        self.record_classification(classification_record)
+        
+        # Update API call tracking
+        self.last_api_call_time = current_time
+        self.last_classification_result = classification
+        
+        if not classification:
+            print("❌ Classification failed")
+            return
+        
+        # Only confident results are reused; a blurry or empty-hand capture is retried next time
+        if fingerprint is not None and self.is_accepted_classification(classification):
+            self.classification_cache.add(fingerprint, classification)
+        
+        # Prepare classification details
+        object_name = classification.get('object_name', 'Unknown')
+        brand = classification.get('brand', 'Unknown')
+        category = classification.get('category', 'Unknown')
+        confidence = classification.get('confidence', 0.0)
+        normalized_brand = self.normalize_brand_name(brand)
+
+        should_perform_analysis = False
+        item_key: Optional[str] = None
+
+        # Check if this is a valid grocery item with sufficient confidence
+        if self.is_accepted_classification(classification) and self.is_grocery_item(classification):
+            
+            # Create item key for tracking
+            item_key = f"{object_name}_{normalized_brand}".lower()
+            
+            # update_cart repeats this check against the same cart version and gets the memoized verdict
+            if not await self.check_cart_duplicate(object_name, brand, category, current_time):
+                should_perform_analysis = True
+            else:
+                print(f"⏭️  Skipping deal analysis for duplicate: {object_name}")
+        
+        # Update cart immediately
+        await self.update_cart(classification, image_path)
+
+        # Schedule deal analysis only if appropriate
+        if should_perform_analysis and item_key:
+            task = asyncio.create_task(
+                self.perform_deal_analysis(object_name, normalized_brand, category, item_key)
+            )
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+    
+    def _capture_stage(self, cap: cv2.VideoCapture, capture_queue: DropOldestQueue,
+                       stop_event: threading.Event, is_video_file: bool):
+        """Read frames from the video source into the capture ring buffer (runs on its own thread)"""
+        stats = self.stage_stats['capture']
+        
+        # Pace video files at their native rate so they behave like a live camera
+        # instead of racing ahead and having most frames dropped
+        frame_interval = 0.0
+        if is_video_file:
+            source_fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / source_fps if source_fps and source_fps > 0 else 0.0
+        next_frame_at = time.time()
+        
+        try:
+            while not stop_event.is_set():
+                start = time.time()
+                ret, frame = cap.read()
+                if not ret:
+                    if is_video_file:
+                        print("End of video file reached")
+                    else:
+                        print("Failed to read frame from camera")
+                    break
+                
+                self.frame_count += 1
+                capture_queue.put({
+                    'frame': frame,
+                    'frame_number': self.frame_count,
+                    'captured_at': time.time()
+                })
+                stats.record(time.time() - start)
+                
+                if frame_interval:
+                    next_frame_at += frame_interval
+                    delay = next_frame_at - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame_at = time.time()
+        finally:
+            capture_queue.close()
+    
+    def _analysis_stage(self, capture_queue: DropOldestQueue, classify_queue: DropOldestQueue,
+                        render_queue: Optional[DropOldestQueue], gemini_available: bool):
+        """Run strided motion detection and capture settled items (runs on its own thread; no render_queue when headless)"""
+        stats = self.stage_stats['analysis']
+        scheduler = self.capture_scheduler
+        scheduler.reset()
+        detection_data = None
+        
+        try:
+            while True:
+                item = capture_queue.get(timeout=STAGE_POLL_INTERVAL)
+                if item is None:
+                    if capture_queue.drained:
+                        break
+                    continue
+                
+                start = time.time()
+                frame = item['frame']
+                
+                # Frames between motion strides are rendered with the last analysis
+                if not scheduler.should_analyze(item['frame_number']) and detection_data is not None:
+                    if render_queue is not None:
+                        render_queue.put({
+                            'frame': frame,
+                            'detection_data': detection_data,
+                            'captured_at': item['captured_at']
+                        })
+                    stats.record(time.time() - start)
+                    continue
+                
+                detection_data = self.analyze_frame(frame)
+                candidate = scheduler.update(frame, detection_data['motion_data'],
+                                             detection_data['center_region'], item['frame_number'])
+                
+                # Capture only once motion has persisted and then settled, using the sharpest still frame
+                if candidate:
+                    best_object = {
+                        'label': 'settled_object',
+                        'confidence': 0.9,
+                        'bbox': detection_data['center_region'],
+                        'source': 'motion_settled',
+                        'sharpness': candidate['sharpness']
+                    }
+                    print(f"🎯 Item settled after {candidate['settled_frames']} still frames - frame {candidate['frame_number']} (sharpness {candidate['sharpness']:.0f})")
+                    
+                    # Cheap local checks first: only frames with an item held in hand reach Gemini
+                    # (the gate exists only when captures are classified)
+                    gate = self.local_gate.check(candidate['frame'], best_object['bbox']) if self.local_gate is not None else {'passed': True}
+                    if gate['passed']:
+                        capture = self.capture_image(candidate['frame'], best_object)
+                    else:
+                        print(f"🚫 Local gate rejected frame {candidate['frame_number']}: {gate['reason']} ({gate['cost_ms']:.1f}ms)")
+                        capture = None
+                    
+                    if capture and gemini_available:
+                        image_path, image_bytes = capture
+                        classify_queue.put({
+                            'image_path': image_path,
+                            'image_bytes': image_bytes,
+                            'fingerprint': center_fingerprint(candidate['frame'], best_object['bbox'], PHASH_SIZE),
+                            'detection': best_object,
+                            'frame_number': candidate['frame_number'],
+                            'captured_at': item['captured_at']
+                        })
+                
+                if render_queue is not None:
+                    render_queue.put({
+                        'frame': frame,
+                        'detection_data': detection_data,
+                        'captured_at': item['captured_at']
+                    })
+                stats.record(time.time() - start)
+        finally:
+            classify_queue.close()
+            if render_queue is not None:
+                render_queue.close()
+    
+    async def _classification_stage(self, classify_queue: DropOldestQueue):
+        """Consume captured images and classify them without blocking capture or display"""
+        stats = self.stage_stats['classification']
+        
+        while True:
+            capture_job = await classify_queue.get_async(STAGE_POLL_INTERVAL)
+            if capture_job is None:
+                if classify_queue.drained:
+                    break
+                continue
+            
+            start = time.time()
+            try:
+                await self.handle_capture(capture_job)
+            except Exception as e:
+                print(f"❌ Error in classification stage: {e}")
+            stats.record(time.time() - start)
+    
+    def get_pipeline_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-stage throughput, latency, queue depth and drop counts"""
+        input_queues = {
+            'analysis': self.stage_queues.get('capture'),
+            'classification': self.stage_queues.get('classify'),
+            'render': self.stage_queues.get('render'),
+        }
+        return {
+            name: stats.snapshot(input_queues.get(name))
+            for name, stats in self.stage_stats.items()
+        }
+    
+    def print_pipeline_stats(self):
+        """Print per-stage pipeline metrics"""
+        print("\n" + "="*60)
+        print("📊 PIPELINE STAGE METRICS")
+        print("="*60)
+        for name, stats in self.get_pipeline_stats().items():
+            line = f"{name:<15} {stats['processed']:>6} items | {stats['throughput_fps']:>6.1f}/s | avg {stats['avg_ms']:.1f}ms | max {stats['max_ms']:.1f}ms"
+            if 'dropped' in stats:
+                line += f" | queue {stats['queue_depth']}/{stats['queue_capacity']} | dropped {stats['dropped']}"
+            print(line)
+        motion = self.motion_engine.stats()
+        print(f"{'motion engine':<15} {motion['frames']:>6} frames | avg {motion['avg_ms']:.2f}ms | max {motion['max_ms']:.2f}ms | pyramid level {motion['pyramid_level']}")
+        scheduler = self.capture_scheduler.stats()
+        print(f"{'capture sched':<15} {scheduler['frames_analyzed']:>6}/{scheduler['frames_seen']} analyzed | armed {scheduler['armed']} | captured {scheduler['escalated']} | aborted settles {scheduler['aborted']} | sharpness avg {scheduler['avg_sharpness_ms']:.2f}ms")
+        if self.local_gate is None:
+            print(f"{'local gate':<15} {0:>6} frames | not created (captures are not classified)")
+        else:
+            gate = self.local_gate.stats()
+            if gate['enabled']:
+                gates = " | ".join(f"{name} {counts['passed']}/{counts['checked']}" for name, counts in gate['gates'].items() if counts['checked'])
+                print(f"{'local gate':<15} {gate['frames']:>6} frames | passed {gate['passed']} | rejected {gate['rejected']} | avg {gate['avg_ms']:.1f}ms" + (f" | {gates}" if gates else ""))
+            else:
+                print(f"{'local gate':<15} {gate['frames']:>6} frames | off ({gate['disabled_reason']})")
+        if self.gemini_batcher is not None:
+            batcher = self.gemini_batcher.stats()
+            print(f"{'gemini batcher':<15} {batcher['items']:>6} images | {batcher['requests']} requests | {batcher['items_per_request']:.2f}/request | fallbacks {batcher['fallbacks']}")
+        matcher = self.cart_matcher.stats()
+        print(f"{'cart matcher':<15} {matcher['lookups']:>6} lookups | {matcher['comparisons']} comparisons | memo hits {matcher['memo_hits']} | {matcher['entries']} entries")
+        phash = self.classification_cache.stats()
+        print(f"{'phash cache':<15} {phash['entries']:>6} entries | hits {phash['hits']} | misses {phash['misses']} | hit rate {phash['hit_rate']:.1f}%")
+        writer = self.capture_writer.stats()
+        print(f"{'capture writer':<15} {writer['written']:>6} saved | pending {writer['pending']}/{writer['capacity']} | inline {writer['inline_writes']} | failed {writer['failed']}")
+        print("="*60)
+    
+    def stop(self):
+        """Ask a running run() to shut down (thread-safe)"""
+        self.stop_event.set()
+    
+    async def run(self, video_source=None, camera_id=2, headless=False, close_shared=True):
+        """
+        Main loop for video processing
+        
+        Args:
+            video_source: Video file path (None to use a camera)
+            camera_id: Camera index when no video file is given
+            headless: Skip the preview window and keyboard handling (stop via stop())
+            close_shared: Close process-wide resources (async HTTP pool) on exit;
+                a host running several sessions closes them itself
+        """
         # Print configuration
         # self.print_configuration()
         
         # Setup Gemini client
         gemini_available = self.setup_gemini_client()
         
+        # The local gate only matters when captures are classified; building it may download its model
+        if gemini_available and self.local_gate is None:
+            self.local_gate = await asyncio.to_thread(self.create_local_gate)
+        
         # Open video source (camera or file)
         if video_source is None:
             print(f"Opening camera ID {camera_id}...")
@@ -1478,151 +1981,87 @@ class CenterObjectClassifier:
             print(f"❌ Could not open {source_name}")
             return
         
-        # Pre-populate cache (now using smart keyword matching in perform_deal_analysis)
-        self.deal_analysis_cache.clear()
+        # Warm the persistent deal cache (existing entries are kept)
+        for cache_key, cache_value in DEAL_CACHE_SEED_ENTRIES.items():
+            self.deal_cache.set_default(cache_key, cache_value)
         self.spoken_items.clear()
         
-        print("🔄 Cache initialized with smart keyword matching for Pringles and Coca-Cola products")
+        print(f"🔄 Deal cache ready: {len(self.deal_cache)} entries in {DEAL_CACHE_FILE}")
         
-        # Track if window has been shown
-        window_shown = False
+        # Drop old sessions from the results event log before this session appends to it
+        compacted = self.results_log.compact(keep_sessions=RESULTS_LOG_KEEP_SESSIONS)
+        print(f"🗜️  Results log compacted: kept {compacted['kept']} events, dropped {compacted['dropped']}")
         
         print(f"{source_name.capitalize()} opened successfully!")
-        print("Press 'q' to quit, 's' to save current frame manually, 'c' to show cart")
-        print("Center region detection is active - motion and scene changes will be automatically captured")
+        print("Press 'q' to quit, 's' to save current frame manually, 'c' to show cart, 'p' to show pipeline stats")
+        print("Center region detection is active - items brought into the center and held still will be automatically captured")
         print("Using motion detection and scene change detection (no external APIs)")
         print("🛒 Cart tracking is active - only grocery items held by hands will be added")
-        print(f"⏱️  API calls limited to once every {CLASSIFICATION_COOLDOWN}s, cart updates are immediate")
+        print(f"⏱️  Captures limited to one every {CAPTURE_COOLDOWN}s, near-duplicates reuse cached classifications, cart updates are immediate")
         if GOOGLE_SCRAPE_AVAILABLE:
             print("💰 Deal analysis is active - Google Shopping + Gemini analysis for each new item")
             print("🔍 Google scraping integration enabled - will search for deals automatically")
         else:
             print("⚠️  Google scraping module not found - deal analysis will be skipped")
         
+        # Build the staged pipeline: capture -> analysis -> (classification, render);
+        # headless runs have no render stage
+        capture_queue = DropOldestQueue('capture', CAPTURE_QUEUE_DEPTH)
+        classify_queue = DropOldestQueue('classify', CLASSIFY_QUEUE_DEPTH)
+        render_queue = None if headless else DropOldestQueue('render', RENDER_QUEUE_DEPTH)
+        self.stage_queues = {'capture': capture_queue, 'classify': classify_queue}
+        stage_names = ('capture', 'analysis', 'classification') if headless else ('capture', 'analysis', 'classification', 'render')
+        if render_queue is not None:
+            self.stage_queues['render'] = render_queue
+        self.stage_stats = {name: StageStats(name) for name in stage_names}
+        stop_event = self.stop_event
+        stop_event.clear()
+        thread_suffix = f"-{self.session_name}" if self.session_name else ""
+        
+        capture_thread = threading.Thread(
+            target=self._capture_stage,
+            args=(cap, capture_queue, stop_event, video_source is not None),
+            name=f"capture-stage{thread_suffix}",
+            daemon=True
+        )
+        analysis_thread = threading.Thread(
+            target=self._analysis_stage,
+            args=(capture_queue, classify_queue, render_queue, gemini_available),
+            name=f"analysis-stage{thread_suffix}",
+            daemon=True
+        )
+        capture_thread.start()
+        analysis_thread.start()
+        classification_task = asyncio.create_task(self._classification_stage(classify_queue))
+        
+        window_title = f"Center Object Classifier - {source_name}"
+        render_stats = self.stage_stats.get('render')
+        
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    if video_source is not None:
-                        print("End of video file reached")
-                    else:
-                        print("Failed to read frame from camera")
-                    break
-                
-                self.frame_count += 1
-                current_time = time.time()  # Define current_time at the start of the loop
-                
-                # Process frame
-                detection_data = await self.process_frame(frame)
-                center_objects = detection_data['center_objects']
+            if headless:
+                # Nothing to draw: the session ends when the classification stage drains
+                await asyncio.shield(classification_task)
+            
+            # Render stage runs on the main thread (required by cv2.imshow on macOS)
+            while not headless:
+                item = await render_queue.get_async(STAGE_POLL_INTERVAL)
+                if item is None:
+                    if render_queue.drained:
+                        break
+                    continue
                 
-                # Capture image if center object detected
-                if center_objects:
-                    # Use the object with highest confidence
-                    best_object = max(center_objects, key=lambda x: x['confidence'])
-                    image_path = self.capture_image(frame, best_object)
-                    
-                    # Process detection
-                    if image_path and gemini_available:
-                        # Always print detection info
-                        print(f"🔍 Object detected: {best_object['label']} (source: {best_object.get('source', 'unknown')}) - Frame {self.frame_count}")
-                        
-                        # Check if we should skip API call due to cooldown
-                        if self.should_skip_classification(current_time):
-                            print(f"⏭️  API cooldown active - reusing last classification result")
-                            
-                            # Still record the skipped classification
-                            classification_record = {
-                                "timestamp": datetime.now().isoformat(),
-                                "frame_number": self.frame_count,
-                                "detection_source": best_object.get('source', 'unknown'),
-                                "image_path": image_path,
-                                "success": True,
-                                "result": self.last_classification_result,
-                                "error": None,
-                                "skipped": True,
-                                "reason": "api_cooldown"
-                            }
-                            self.all_classifications.append(classification_record)
-                            
-                            # Update cart immediately with last result (no cooldown for cart)
-                            if self.last_classification_result:
-                                await self.update_cart(self.last_classification_result, image_path)
-                        else:
-                            print(f"🤖 Making API call to classify...")
-                            classification = await self.classify_with_gemini(image_path)
-                            
-                            # Track classification result
-                            classification_record = {
-                                "timestamp": datetime.now().isoformat(),
-                                "frame_number": self.frame_count,
-                                "detection_source": best_object.get('source', 'unknown'),
-                                "image_path": image_path,
-                                "success": classification is not None,
-                                "result": classification,
-                                "error": None,
-                                "skipped": False
-                            }
-                            self.all_classifications.append(classification_record)
-                            
-                            # Update API call tracking
-                            self.last_api_call_time = current_time
-                            self.last_classification_result = classification
-                            
-                            if classification:
-                                # Prepare classification details
-                                object_name = classification.get('object_name', 'Unknown')
-                                brand = classification.get('brand', 'Unknown')
-                                category = classification.get('category', 'Unknown')
-                                confidence = classification.get('confidence', 0.0)
-                                normalized_brand = self.normalize_brand_name(brand)
-
-                                should_perform_analysis = False
-                                item_key: Optional[str] = None
-
-                                # Check if this is a valid grocery item with sufficient confidence
-                                if (confidence >= MIN_CONFIDENCE_THRESHOLD and 
-                                    object_name not in ["no_hand_holding_object", "unidentifiable_item"] and
-                                    self.is_grocery_item(classification)):
-                                    
-                                    # Create item key for tracking
-                                    item_key = f"{object_name}_{normalized_brand}".lower()
-                                    
-                                    # Use LLM to check if this is a duplicate (more accurate than string matching)
-                                    is_duplicate_llm = await self.check_cart_duplicate_with_llm(object_name, brand, category, current_time)
-                                    
-                                    # Also check simple duplicate as fallback
-                                    is_duplicate_simple = self.is_duplicate_item(object_name, normalized_brand)
-                                    
-                                    if not is_duplicate_llm and not is_duplicate_simple:
-                                        should_perform_analysis = True
-                                    else:
-                                        print(f"⏭️  Skipping deal analysis for duplicate: {object_name}")
-                                
-                                # Update cart immediately
-                                await self.update_cart(classification, image_path)
-
-                                # Schedule deal analysis only if appropriate
-                                if should_perform_analysis and item_key:
-                                    task = asyncio.create_task(
-                                        self.perform_deal_analysis(object_name, normalized_brand, category, item_key)
-                                    )
-                                    self.background_tasks.add(task)
-                                    task.add_done_callback(self.background_tasks.discard)
-                            else:
-                                print("❌ Classification failed")
-                                classification_record["error"] = "Classification returned None"
+                start = time.time()
+                frame = item['frame']
+                current_time = time.time()
                 
                 # Draw detections
-                self.draw_detections(frame, detection_data)
+                self.draw_detections(frame, item['detection_data'])
                 
                 # Display frame with source info
-                window_title = f"Center Object Classifier - {source_name}"
                 cv2.imshow(window_title, frame)
                 
                 # Mark window as shown after first display
-                if not window_shown:
-                    window_shown = True
+                if not self.window_shown:
                     # Store in instance variable so TTS knows window is ready
                     self.window_shown = True
                     # Store the time when window was first shown
@@ -1639,6 +2078,8 @@ class CenterObjectClassifier:
                                 await self.speak_text(speech_text, speech_item_key)
                         self.pending_speech.clear()
                 
+                render_stats.record(time.time() - start)
+                
                 # Handle key presses
                 key = cv2.waitKey(1) & 0xFF
                 if key == ord('q'):
@@ -1654,10 +2095,20 @@ class CenterObjectClassifier:
                 elif key == ord('c'):
                     # Show current cart
                     self.print_cart()
+                elif key == ord('p'):
+                    # Show pipeline stage metrics
+                    self.print_pipeline_stats()
         
         except KeyboardInterrupt:
             print("\nInterrupted by user")
         finally:
+            # Stop the capture stage; closing propagates downstream through the queues
+            stop_event.set()
+            await asyncio.to_thread(capture_thread.join, 2.0)
+            await asyncio.to_thread(analysis_thread.join, 2.0)
+            classify_queue.close()
+            await classification_task
+            
             # Wait for any pending background tasks to complete
             if self.background_tasks:
                 print(f"⏳ Waiting for {len(self.background_tasks)} background tasks to complete...")
@@ -1669,11 +2120,19 @@ class CenterObjectClassifier:
                 except asyncio.CancelledError:
                     pass
             
+            if GOOGLE_SCRAPE_AVAILABLE and close_shared:
+                await close_async_oxylabs_client()
+            
+            # Flush captures still waiting to be written
+            await asyncio.to_thread(self.capture_writer.close)
+            
             cap.release()
-            cv2.destroyAllWindows()
-            print("Camera released and windows closed")
+            if not headless:
+                cv2.destroyAllWindows()
+            print(f"{source_name.capitalize()} released")
             
-            # Print final cart
+            # Print pipeline metrics and final cart
+            self.print_pipeline_stats()
             self.print_cart()
             
             # Save results to JSON
@@ -1713,6 +2172,14 @@ async def main():
     if video_source is None:
         print(f"No video file specified, using camera ID {camera_id}")
     
+    # Serve the Shopping Cart API from this process so it reads the live cart store
+    if '--serve-api' in sys.argv:
+        try:
+            from shopping_cart_api import start_api_server
+            start_api_server()
+        except ImportError as e:
+            print(f"⚠️ Could not start Shopping Cart API: {e}")
+    
     classifier = CenterObjectClassifier(enable_tts=enable_tts)
     await classifier.run(video_source, camera_id=camera_id)
 
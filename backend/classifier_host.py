@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Classifier Host - Runs several center object classifier sessions in one process
+
+Each session watches one camera or video source (e.g. one checkout lane) and
+has its own cart, motion state, cart state store and results file under
+sessions/<session_id>/. Sessions share the Gemini client and its
+classification batcher, the pooled Oxylabs HTTP clients, the persistent deal
+cache and the event loop's worker pool.
+Sources can be added and removed at runtime through the Python API or the
+optional HTTP control API.
+
+Usage:
+    python classifier_host.py 0 1 lane3.mp4            # Two cameras and a video file
+    python classifier_host.py 0 1 --port 8100          # Also serve the control API
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from cart_state import CartStateStore
+from center_object_classifier import (
+    GOOGLE_SCRAPE_AVAILABLE,
+    CenterObjectClassifier,
+    close_async_oxylabs_client,
+    create_classification_batcher,
+    create_gemini_client,
+    open_deal_cache,
+)
+
+# Optional imports with fallback
+try:
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+    FASTAPI_AVAILABLE = True
+except ImportError:
+    FASTAPI_AVAILABLE = False
+    FastAPI = None
+
+# =============================================================================
+# CONFIGURATION CONSTANTS
+# =============================================================================
+
+HOST_WORKER_THREADS = 16  # Shared pool for blocking work (Gemini calls, cache I/O, saves) of all sessions
+SESSIONS_DIR = Path("sessions")  # Per-session results files live in SESSIONS_DIR/<session_id>/
+SESSION_STOP_TIMEOUT = 15.0  # Seconds to wait for a session to flush and exit when removed
+HOST_API_PORT = 8100  # Default port of the control API
+
+
+@dataclass
+class ClassifierSession:
+    """One classifier running against one video source."""
+
+    session_id: str
+    source: Union[int, str]
+    classifier: CenterObjectClassifier
+    state_store: CartStateStore
+    started_at: float = field(default_factory=time.time)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        if self.task is None:
+            return "starting"
+        if not self.task.done():
+            return "stopping" if self.classifier.stop_event.is_set() else "running"
+        if self.task.cancelled():
+            return "cancelled"
+        return "failed" if self.task.exception() else "finished"
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Per-session status, pipeline, motion and cart figures.
+
+        Reads the live cart, so it must run on the host's event loop; other
+        threads use ClassifierHost.session_metrics via ClassifierHost.call.
+        """
+        classifier = self.classifier
+        return {
+            "session_id": self.session_id,
+            "source": self.source,
+            "status": self.status,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "frames_processed": classifier.frame_count,
+            "cart_version": self.state_store.version,
+            "cart_summary": classifier.build_cart_summary(),
+            "classification_summary": classifier.build_classification_summary(),
+            "pipeline": classifier.get_pipeline_stats(),
+            "motion": classifier.motion_engine.stats(),
+            "capture_writer": classifier.capture_writer.stats(),
+            "results_file": str(classifier.results_file),
+        }
+
+
+class ClassifierHost:
+    """
+    Runs and supervises classifier sessions on one event loop.
+    """
+
+    def __init__(self, worker_threads: int = HOST_WORKER_THREADS, sessions_dir: Path = SESSIONS_DIR):
+        self.worker_threads = worker_threads
+        self.sessions_dir = Path(sessions_dir)
+        self.sessions: Dict[str, ClassifierSession] = {}
+        self.gemini_client = None
+        self.gemini_batcher = None
+        self.deal_cache = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_id = 1
+
+    async def start(self):
+        """Create the shared resources; must run on the host's event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.worker_threads, thread_name_prefix="host-worker")
+        # asyncio.to_thread in every session now runs on this shared pool
+        self.loop.set_default_executor(self.executor)
+        self.gemini_client = await asyncio.to_thread(create_gemini_client)
+        if self.gemini_client is not None:
+            # One batcher for all sessions so captures from different lanes share requests
+            self.gemini_batcher = create_classification_batcher(self.gemini_client)
+        self.deal_cache = open_deal_cache()
+        print(f"🏁 Classifier host ready ({self.worker_threads} shared worker threads)")
+
+    async def add_source(self, source: Union[int, str], session_id: Optional[str] = None) -> str:
+        """
+        Start a new session for a camera index or video file.
+
+        Returns:
+            The session id
+        """
+        if session_id is None:
+            session_id = f"lane{self._next_id}"
+            self._next_id += 1
+        if session_id in self.sessions:
+            raise ValueError(f"Session '{session_id}' already exists")
+
+        session_dir = self.sessions_dir / session_id
+        session_dir.mkdir(parents=True, exist_ok=True)
+        state_store = CartStateStore()
+        classifier = CenterObjectClassifier(
+            results_file=str(session_dir / "results.json"),
+            session_name=session_id,
+            gemini_client=self.gemini_client,
+            gemini_batcher=self.gemini_batcher,
+            deal_cache=self.deal_cache,
+            state_store=state_store,
+        )
+
+        session = ClassifierSession(session_id, source, classifier, state_store)
+        if isinstance(source, int):
+            run = classifier.run(None, camera_id=source, headless=True, close_shared=False)
+        else:
+            run = classifier.run(source, headless=True, close_shared=False)
+        session.task = asyncio.create_task(run, name=f"session-{session_id}")
+        self.sessions[session_id] = session
+
+        print(f"➕ Session {session_id} started on {source!r}")
+        return session_id
+
+    async def remove_source(self, session_id: str, timeout: float = SESSION_STOP_TIMEOUT) -> Dict[str, Any]:
+        """
+        Stop a session, wait for it to flush its results and forget it.
+
+        Returns:
+            The session's final metrics
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+
+        session.classifier.stop()
+        if session.task is not None and not session.task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(session.task), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Session {session_id} did not stop within {timeout}s, cancelling")
+                session.task.cancel()
+                await asyncio.gather(session.task, return_exceptions=True)
+            except Exception as e:
+                print(f"❌ Session {session_id} ended with error: {e}")
+
+        metrics = session.metrics()
+        del self.sessions[session_id]
+        print(f"➖ Session {session_id} removed")
+        return metrics
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Metrics for every session; must run on the host's event loop."""
+        return [session.metrics() for session in self.sessions.values()]
+
+    async def list_sessions_async(self) -> List[Dict[str, Any]]:
+        """list_sessions as a coroutine, for callers on other threads via call()."""
+        return self.list_sessions()
+
+    async def session_metrics(self, session_id: str) -> Dict[str, Any]:
+        """
+        Metrics for one session, read on the host's event loop.
+
+        Raises:
+            KeyError: If the session does not exist
+        """
+        return self.sessions[session_id].metrics()
+
+    def print_sessions(self):
+        """Print a one-line summary per session"""
+        print("\n" + "="*60)
+        print("🏁 CLASSIFIER SESSIONS")
+        print("="*60)
+        for metrics in self.list_sessions():
+            cart = metrics["cart_summary"]
+            print(f"{metrics['session_id']:<10} {metrics['status']:<9} source={metrics['source']!r} "
+                  f"frames={metrics['frames_processed']} items={cart['total_items']} "
+                  f"motion avg {metrics['motion']['avg_ms']:.2f}ms")
+        print("="*60)
+
+    async def wait(self):
+        """Wait until every session has finished (e.g. all video files ended)."""
+        while any(session.task and not session.task.done() for session in self.sessions.values()):
+            await asyncio.sleep(1.0)
+
+    async def shutdown(self):
+        """Stop all sessions and release the shared resources."""
+        for session_id in list(self.sessions):
+            await self.remove_source(session_id)
+        if GOOGLE_SCRAPE_AVAILABLE:
+            await close_async_oxylabs_client()
+        if self.deal_cache is not None:
+            self.deal_cache.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def call(self, coro, timeout: Optional[float] = None):
+        """Run a host coroutine from another thread (e.g. an HTTP handler) and return its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+def parse_source(value: str) -> Union[int, str]:
+    """Camera indices are given as integers, anything else is a video file path."""
+    return int(value) if value.isdigit() else value
+
+
+def create_host_api(host: ClassifierHost):
+    """Build the FastAPI control API for a running host."""
+    if not FASTAPI_AVAILABLE:
+        raise RuntimeError("fastapi is required for the host control API (pip install fastapi uvicorn)")
+
+    class SourceRequest(BaseModel):
+        source: str
+        session_id: Optional[str] = None
+
+    app = FastAPI(title="Classifier Host API", description="Add, remove and monitor classifier sessions")
+
+    @app.get("/sessions")
+    def list_sessions():
+        # Sessions and carts are mutated on the host loop, so read them there
+        return {"sessions": host.call(host.list_sessions_async(), 10)}
+
+    @app.post("/sessions")
+    def add_session(request: SourceRequest):
+        try:
+            session_id = host.call(host.add_source(parse_source(request.source), request.session_id), 10)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {"session_id": session_id}
+
+    @app.get("/sessions/{session_id}")
+    def get_session(session_id: str):
+        try:
+            return host.call(host.session_metrics(session_id), 10)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    @app.get("/sessions/{session_id}/shopping-cart")
+    def get_session_cart(session_id: str, since: Optional[int] = None):
+        session = host.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        if since is not None:
+            return session.state_store.changes_since(since)
+        version, state = session.state_store.snapshot()
+        return {
+            "version": version,
+            "shopping_cart": state.get("shopping_cart", {}),
+            "cart_summary": state.get("cart_summary", {}),
+            "timestamp": state.get("timestamp", ""),
+        }
+
+    @app.delete("/sessions/{session_id}")
+    def remove_session(session_id: str):
+        try:
+            return host.call(host.remove_source(session_id), SESSION_STOP_TIMEOUT + 5)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    return app
+
+
+def start_host_api(host: ClassifierHost, port: int = HOST_API_PORT) -> threading.Thread:
+    """Serve the control API on a daemon thread."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_host_api(host), host="0.0.0.0", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="host-api", daemon=True)
+    thread.start()
+    print(f"🌐 Host control API on http://0.0.0.0:{port}/sessions")
+    return thread
+
+
+async def main():
+    """Main entry point"""
+    import sys
+
+    args = sys.argv[1:]
+    port = None
+    if '--port' in args:
+        port_idx = args.index('--port')
+        try:
+            port = int(args[port_idx + 1])
+        except (ValueError, IndexError):
+            port = HOST_API_PORT
+        del args[port_idx:port_idx + 2]
+
+    host = ClassifierHost()
+    await host.start()
+    if port is not None:
+        start_host_api(host, port)
+
+    for arg in args:
+        if not arg.startswith('--'):
+            await host.add_source(parse_source(arg))
+
+    try:
+        if port is None:
+            # Without a control API the host exits once every source has ended
+            await host.wait()
+        else:
+            while True:
+                await asyncio.sleep(3600)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\nInterrupted by user")
+    finally:
+        host.print_sessions()
+        await host.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
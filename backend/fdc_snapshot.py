@@ -0,0 +1,482 @@
+"""
+Offline USDA FoodData Central Snapshot
+
+Imports the downloadable FoodData Central dumps (CSV directory or JSON file)
+into a local SQLite database so nutrition lookups work without the network
+and without USDA rate limits. Each food is stored once with its description,
+brand, ingredients and precomputed per-100g values for the nutrition
+components scored by NutritionFetcher. An FTS5 index over description and
+brand tokens makes product-name searches sub-millisecond.
+
+Dumps: https://fdc.nal.usda.gov/download-datasets.html
+(the CSV download streams in constant memory; the Branded JSON file is large
+and is only streamed when ijson is installed).
+
+Usage:
+    python fdc_snapshot.py import FoodData_Central_csv_2024-10-31/
+    python fdc_snapshot.py import foundation_food.json --output fdc_snapshot.sqlite3
+    python fdc_snapshot.py search "coca cola"
+"""
+
+import csv
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Optional imports with fallback
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+FDC_SNAPSHOT_FILE = Path("fdc_snapshot.sqlite3")
+DEFAULT_DATA_TYPES = ("branded_food", "foundation_food")  # CSV data_type values to import
+IMPORT_BATCH_SIZE = 10000  # Rows per executemany during import
+SEARCH_MIN_TOKEN_SHARE = 0.6  # Share of a query's content tokens a match must contain
+NOISE_TOKENS = {"oz", "fl", "ml", "l", "g", "kg", "lb", "lbs", "ct", "count", "pack", "pk", "can", "cans",
+                "bottle", "bottles", "box", "bag", "jar", "the", "and", "of", "with"}  # Never count as content
+
+# JSON dataType values -> CSV data_type values
+JSON_DATA_TYPES = {
+    "Branded": "branded_food",
+    "Foundation": "foundation_food",
+    "SR Legacy": "sr_legacy_food",
+    "Survey (FNDDS)": "survey_fndds_food",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_COMPONENT_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))  # Ingredient lists can exceed the default 128 KB
+
+
+def component_nutrient_ids(nutrition_components: Dict[str, Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Map NutritionFetcher.nutrition_components to {component: [nutrient ids]}."""
+    components = {}
+    for component, config in nutrition_components.items():
+        ids = config['nutrient_id']
+        components[component] = list(ids) if isinstance(ids, list) else [ids]
+    return components
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _create_schema(conn: sqlite3.Connection, components: Sequence[str]) -> None:
+    component_columns = "".join(f", {component} REAL" for component in components)
+    conn.executescript(
+        f"""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE food_staging (
+            fdc_id INTEGER PRIMARY KEY,
+            data_type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            brand TEXT NOT NULL DEFAULT '',
+            ingredients TEXT NOT NULL DEFAULT '',
+            serving_size REAL,
+            serving_unit TEXT
+        );
+        CREATE TABLE nutrient_staging (fdc_id INTEGER NOT NULL, component TEXT NOT NULL, amount REAL NOT NULL);
+        CREATE TABLE foods (
+            fdc_id INTEGER PRIMARY KEY,
+            data_type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            ingredients TEXT NOT NULL,
+            serving_size REAL,
+            serving_unit TEXT{component_columns}
+        );
+        """
+    )
+
+
+def _finalize(conn: sqlite3.Connection, components: Sequence[str], sources: Sequence[str]) -> int:
+    """Pivot staged nutrients into per-food columns, build the FTS index and drop staging tables."""
+    pivot = ", ".join(
+        f"SUM(CASE WHEN component = '{component}' THEN amount END) AS {component}" for component in components
+    )
+    conn.executescript(
+        f"""
+        CREATE INDEX idx_nutrient_staging ON nutrient_staging (fdc_id);
+        INSERT INTO foods
+        SELECT f.fdc_id, f.data_type, f.description, f.brand, f.ingredients, f.serving_size, f.serving_unit,
+               {", ".join(f"n.{component}" for component in components)}
+        FROM food_staging f
+        LEFT JOIN (SELECT fdc_id, {pivot} FROM nutrient_staging GROUP BY fdc_id) n USING (fdc_id);
+        DROP TABLE food_staging;
+        DROP TABLE nutrient_staging;
+        CREATE VIRTUAL TABLE foods_fts USING fts5(
+            description, brand, content='foods', content_rowid='fdc_id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        INSERT INTO foods_fts (rowid, description, brand) SELECT fdc_id, description, brand FROM foods;
+        INSERT INTO foods_fts (foods_fts) VALUES ('optimize');
+        CREATE VIRTUAL TABLE foods_vocab USING fts5vocab(foods_fts, 'row');
+        """
+    )
+    (count,) = conn.execute("SELECT COUNT(*) FROM foods").fetchone()
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?)",
+        [
+            ("components", json.dumps(list(components))),
+            ("sources", json.dumps(list(sources))),
+            ("food_count", str(count)),
+            ("imported_at", str(time.time())),
+        ],
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    return count
+
+
+def _batched(rows: Iterable[Tuple], size: int = IMPORT_BATCH_SIZE) -> Iterator[List[Tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _read_csv(path: Path) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _stage_csv_dump(conn: sqlite3.Connection, csv_dir: Path, components: Dict[str, List[int]],
+                    data_types: Sequence[str]) -> None:
+    """Stage food.csv (+ branded_food.csv) and the relevant rows of food_nutrient.csv."""
+    for required in ("food.csv", "food_nutrient.csv"):
+        if not (csv_dir / required).exists():
+            raise FileNotFoundError(f"{csv_dir / required} not found (expected an FDC CSV download directory)")
+
+    wanted_types = set(data_types)
+    foods = (
+        (int(row["fdc_id"]), row["data_type"], row.get("description", ""))
+        for row in _read_csv(csv_dir / "food.csv")
+        if row.get("data_type") in wanted_types
+    )
+    for batch in _batched(foods):
+        conn.executemany("INSERT OR REPLACE INTO food_staging (fdc_id, data_type, description) VALUES (?, ?, ?)", batch)
+
+    if (csv_dir / "branded_food.csv").exists():
+        branded = (
+            (
+                " ".join(part for part in (row.get("brand_owner", ""), row.get("brand_name", "")) if part),
+                row.get("ingredients", ""),
+                _to_float(row.get("serving_size")),
+                row.get("serving_size_unit") or None,
+                int(row["fdc_id"]),
+            )
+            for row in _read_csv(csv_dir / "branded_food.csv")
+        )
+        for batch in _batched(branded):
+            conn.executemany(
+                "UPDATE food_staging SET brand = ?, ingredients = ?, serving_size = ?, serving_unit = ? WHERE fdc_id = ?",
+                batch,
+            )
+
+    nutrient_components = {
+        nutrient_id: component for component, ids in components.items() for nutrient_id in ids
+    }
+    nutrients = (
+        (int(row["fdc_id"]), nutrient_components[int(row["nutrient_id"])], amount)
+        for row in _read_csv(csv_dir / "food_nutrient.csv")
+        if row.get("nutrient_id", "").isdigit() and int(row["nutrient_id"]) in nutrient_components
+        for amount in (_to_float(row.get("amount")),)
+        if amount is not None
+    )
+    for batch in _batched(nutrients):
+        conn.executemany("INSERT INTO nutrient_staging (fdc_id, component, amount) VALUES (?, ?, ?)", batch)
+
+
+def _iter_json_foods(json_path: Path) -> Iterator[Dict[str, Any]]:
+    """Foods of an FDC JSON dump ({"BrandedFoods": [...]}, {"FoundationFoods": [...]}, ...)."""
+    if IJSON_AVAILABLE:
+        # The foods are the top-level array or the array under the first top-level key
+        with open(json_path, "rb") as f:
+            events = ijson.parse(f)
+            _, first_event, _ = next(events)
+            key = next(events)[2] if first_event == "start_map" else None
+        with open(json_path, "rb") as f:
+            yield from ijson.items(f, f"{key}.item" if key else "item", use_float=True)
+        return
+
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        arrays = [value for value in data.values() if isinstance(value, list)]
+        data = arrays[0] if arrays else []
+    yield from data
+
+
+def _stage_json_dump(conn: sqlite3.Connection, json_path: Path, components: Dict[str, List[int]]) -> None:
+    """Stage the foods and relevant nutrients of an FDC JSON dump."""
+    nutrient_components = {
+        nutrient_id: component for component, ids in components.items() for nutrient_id in ids
+    }
+    food_rows = []
+    nutrient_rows = []
+    for food in _iter_json_foods(json_path):
+        fdc_id = food.get("fdcId")
+        if fdc_id is None:
+            continue
+        brand = " ".join(part for part in (food.get("brandOwner", ""), food.get("brandName", "")) if part)
+        food_rows.append((
+            int(fdc_id),
+            JSON_DATA_TYPES.get(food.get("dataType", ""), food.get("dataType", "")),
+            food.get("description", ""),
+            brand,
+            food.get("ingredients", "") or "",
+            _to_float(food.get("servingSize")),
+            food.get("servingSizeUnit"),
+        ))
+        for nutrient in food.get("foodNutrients", []):
+            nutrient_id = (nutrient.get("nutrient") or {}).get("id")
+            amount = _to_float(nutrient.get("amount"))
+            if nutrient_id in nutrient_components and amount is not None:
+                nutrient_rows.append((int(fdc_id), nutrient_components[nutrient_id], amount))
+
+        if len(food_rows) >= IMPORT_BATCH_SIZE:
+            _flush_json_rows(conn, food_rows, nutrient_rows)
+            food_rows, nutrient_rows = [], []
+    _flush_json_rows(conn, food_rows, nutrient_rows)
+
+
+def _flush_json_rows(conn: sqlite3.Connection, food_rows: List[Tuple], nutrient_rows: List[Tuple]) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO food_staging (fdc_id, data_type, description, brand, ingredients, serving_size, serving_unit) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        food_rows,
+    )
+    conn.executemany("INSERT INTO nutrient_staging (fdc_id, component, amount) VALUES (?, ?, ?)", nutrient_rows)
+
+
+def build_snapshot(sources: Sequence[Union[str, Path]], components: Dict[str, List[int]],
+                   output: Union[str, Path] = FDC_SNAPSHOT_FILE,
+                   data_types: Sequence[str] = DEFAULT_DATA_TYPES) -> int:
+    """
+    Import FDC dumps into a new snapshot database (replaces `output` atomically).
+
+    Args:
+        sources: CSV download directories and/or JSON dump files
+        components: {component: [nutrient ids]} to precompute (see component_nutrient_ids)
+        output: Snapshot database path
+        data_types: CSV data_type values to keep (JSON dumps are imported whole)
+
+    Returns:
+        Number of foods in the snapshot
+    """
+    for component in components:
+        if not _COMPONENT_NAME.match(component):
+            raise ValueError(f"Invalid component name for a column: {component!r}")
+
+    output = Path(output)
+    tmp_path = output.with_name(f".{output.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        _create_schema(conn, list(components))
+        for source in sources:
+            source = Path(source)
+            print(f"📥 Importing {source}")
+            if source.is_dir():
+                _stage_csv_dump(conn, source, components, data_types)
+            else:
+                _stage_json_dump(conn, source, components)
+            conn.commit()
+        count = _finalize(conn, list(components), [str(source) for source in sources])
+    except BaseException:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, output)
+    print(f"✅ FDC snapshot written to {output} ({count} foods)")
+    return count
+
+
+def query_tokens(text: str) -> List[str]:
+    """Unique lowercase word tokens of free text, in order."""
+    return list(dict.fromkeys(_TOKEN_PATTERN.findall((text or "").lower())))
+
+
+def content_tokens(tokens: Sequence[str]) -> List[str]:
+    """Tokens that identify a product (not sizes, units, packaging or filler words)."""
+    return [token for token in tokens if token not in NOISE_TOKENS and not any(char.isdigit() for char in token)]
+
+
+def fts_query(tokens: Sequence[str]) -> str:
+    """FTS5 MATCH expression requiring every token (tokens are quoted)."""
+    return " AND ".join(f'"{token}"' for token in tokens)
+
+
+class FDCSnapshot:
+    """
+    Read-only access to an imported FDC snapshot.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = FDC_SNAPSHOT_FILE):
+        """
+        Open a snapshot.
+
+        Args:
+            db_path: Snapshot database created by build_snapshot
+
+        Raises:
+            FileNotFoundError: If the snapshot does not exist
+        """
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"FDC snapshot {self.db_path} not found (run: python fdc_snapshot.py import <dump>)")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.components: List[str] = json.loads(meta.get("components", "[]"))
+        self.food_count = int(meta.get("food_count", 0))
+
+        self.lookups = 0
+        self.total_lookup_time = 0.0
+
+    def _row_to_food(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "fdc_id": row["fdc_id"],
+            "data_type": row["data_type"],
+            "description": row["description"],
+            "brand": row["brand"],
+            "ingredients": row["ingredients"],
+            "serving_size": row["serving_size"],
+            "serving_unit": row["serving_unit"],
+            "per_100g": {
+                component: row[component] for component in self.components if row[component] is not None
+            },
+        }
+
+    def search(self, query: str, limit: int = 10, data_types: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Best-matching foods for a product name.
+
+        Tokens the snapshot has never seen (sizes, "can", typos) are ignored.
+        If no food contains all remaining tokens, the most common token is
+        dropped and the search repeated, so "coca cola classic can" still
+        finds the Coca-Cola entries without ranking the whole table. A match
+        must still contain SEARCH_MIN_TOKEN_SHARE of the query's content
+        tokens (see content_tokens), known or not; otherwise nothing is
+        returned, so "diet pepsi" on a snapshot without Pepsi does not
+        resolve to "diet coke" and the auto backend falls back to the API.
+
+        Args:
+            query: Product name or free text
+            limit: Maximum foods returned
+            data_types: Only return these data types (e.g. ["branded_food"])
+
+        Returns:
+            Foods ordered by relevance (BM25, description weighted over brand)
+        """
+        start = time.perf_counter()
+        type_filter = ""
+        params: List[Any] = []
+        if data_types:
+            type_filter = f" AND f.data_type IN ({', '.join('?' for _ in data_types)})"
+            params = list(data_types)
+
+        tokens = query_tokens(query)
+        required = max(1, math.ceil(len(content_tokens(tokens)) * SEARCH_MIN_TOKEN_SHARE))
+        rows: List[sqlite3.Row] = []
+        with self._lock:
+            if tokens:
+                doc_counts = dict(self._conn.execute(
+                    f"SELECT term, doc FROM foods_vocab WHERE term IN ({', '.join('?' for _ in tokens)})", tokens
+                ).fetchall())
+                # Rarest (most specific) tokens first; unknown tokens are dropped
+                tokens = sorted((token for token in tokens if doc_counts.get(token)), key=doc_counts.get)
+            while tokens and len(content_tokens(tokens)) >= required:
+                rows = self._conn.execute(
+                    "SELECT f.* FROM foods_fts JOIN foods f ON f.fdc_id = foods_fts.rowid "
+                    f"WHERE foods_fts MATCH ?{type_filter} ORDER BY bm25(foods_fts, 2.0, 1.0) LIMIT ?",
+                    [fts_query(tokens), *params, limit],
+                ).fetchall()
+                if rows:
+                    break
+                tokens.pop()
+
+        self.lookups += 1
+        self.total_lookup_time += time.perf_counter() - start
+        return [self._row_to_food(row) for row in rows]
+
+    def get(self, fdc_id: int) -> Optional[Dict[str, Any]]:
+        """A food by fdcId, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM foods WHERE fdc_id = ?", (fdc_id,)).fetchone()
+        return self._row_to_food(row) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot size and lookup timing."""
+        return {
+            "path": str(self.db_path),
+            "foods": self.food_count,
+            "lookups": self.lookups,
+            "avg_lookup_ms": round(self.total_lookup_time / self.lookups * 1000, 3) if self.lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and query an offline USDA FoodData Central snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import FDC CSV directories and/or JSON dumps")
+    import_parser.add_argument("sources", nargs="+", help="CSV download directory or JSON dump file")
+    import_parser.add_argument("--output", default=str(FDC_SNAPSHOT_FILE), help="Snapshot database path")
+    import_parser.add_argument("--data-types", default=",".join(DEFAULT_DATA_TYPES),
+                               help="Comma-separated CSV data_type values to import")
+
+    search_parser = subparsers.add_parser("search", help="Search the snapshot")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--snapshot", default=str(FDC_SNAPSHOT_FILE), help="Snapshot database path")
+    search_parser.add_argument("--limit", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        from nutrition_fetcher import NutritionFetcher
+
+        components = component_nutrient_ids(NutritionFetcher(cache_file=None).nutrition_components)
+        build_snapshot(args.sources, components, args.output, [t for t in args.data_types.split(",") if t])
+    else:
+        snapshot = FDCSnapshot(args.snapshot)
+        for food in snapshot.search(args.query, args.limit):
+            print(f"{food['fdc_id']:>8}  {food['description'][:50]:<50}  {food['brand'][:25]:<25}  {food['per_100g']}")
+        print(f"⏱️  {snapshot.stats()['avg_lookup_ms']:.3f} ms")
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
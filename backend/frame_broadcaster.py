@@ -0,0 +1,263 @@
+"""
+Frame Broadcaster
+
+Encodes each captured frame to JPEG exactly once, on a dedicated worker
+thread, and fans the bytes out to every viewer. The capture loop only hands
+over its latest frame (publish never blocks); if the encoder is still busy the
+pending frame is replaced, so encoding can never fall behind the camera.
+
+Viewers never queue frames either:
+- MJPEG clients (multipart/x-mixed-replace over HTTP) always receive the
+  newest encoded frame when they are ready for one, skipping any they missed.
+- Socket.IO clients receive the JPEG as a binary attachment and acknowledge
+  it; a client with a frame still unacknowledged is skipped (the frame is
+  dropped for that client only) until it catches up or the ack times out.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import cv2
+
+JPEG_QUALITY = 85  # Default JPEG quality of broadcast frames
+ACK_TIMEOUT = 1.0  # Seconds before an unacknowledged Socket.IO frame stops blocking its client
+ACK_LATENCY_ALPHA = 0.2  # Weight of the newest sample in the ack latency moving average
+MJPEG_BOUNDARY = "frame"  # multipart boundary of the MJPEG stream
+
+
+@dataclass
+class EncodedFrame:
+    """One JPEG-encoded frame shared by all viewers."""
+
+    seq: int
+    jpeg: bytes
+    captured_at: float  # time.time() when the frame was published
+    encoded_at: float
+
+
+class FrameBroadcaster:
+    """
+    Single-encoder, latest-frame-wins JPEG broadcaster.
+    """
+
+    def __init__(self, jpeg_quality: int = JPEG_QUALITY):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            jpeg_quality: JPEG quality (0-100); may be changed while running
+        """
+        self.jpeg_quality = jpeg_quality
+
+        self._pending = None  # (frame, captured_at) waiting for the encoder
+        self._latest: Optional[EncodedFrame] = None
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[EncodedFrame], None]] = []
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.published = 0
+        self.encoded = 0
+        self.replaced = 0  # Frames overwritten before the encoder got to them
+        self.encode_seconds = 0.0
+        self.mjpeg_clients = 0
+
+    def start(self) -> None:
+        """Start the encoder thread."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._encode_loop, name="frame-encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the encoder thread and wake up all waiting viewers."""
+        with self._condition:
+            self._running = False
+            self._pending = None
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def add_listener(self, listener: Callable[[EncodedFrame], None]) -> None:
+        """Call listener(frame) on the encoder thread after every encoded frame."""
+        self._listeners.append(listener)
+
+    def publish(self, frame) -> None:
+        """
+        Hand a BGR frame to the encoder without blocking.
+
+        The caller must not modify the frame afterwards. A frame still waiting
+        from the previous call is replaced.
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.replaced += 1
+            self._pending = (frame, time.time())
+            self.published += 1
+            self._condition.notify_all()
+
+    def _encode_loop(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                frame, captured_at = self._pending
+                self._pending = None
+
+            start = time.time()
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+            if not ok:
+                print("⚠️ JPEG encoding failed, frame dropped")
+                continue
+
+            encoded = EncodedFrame(self.encoded, buffer.tobytes(), captured_at, time.time())
+            with self._condition:
+                self._latest = encoded
+                self.encoded += 1
+                self.encode_seconds += encoded.encoded_at - start
+                self._condition.notify_all()
+
+            for listener in self._listeners:
+                try:
+                    listener(encoded)
+                except Exception as e:
+                    print(f"⚠️ Frame listener failed: {e}")
+
+    def latest(self) -> Optional[EncodedFrame]:
+        """Most recently encoded frame, or None."""
+        return self._latest
+
+    def wait_for_frame(self, after_seq: int, timeout: Optional[float] = None) -> Optional[EncodedFrame]:
+        """
+        Newest encoded frame with seq > after_seq, waiting up to timeout for one.
+
+        Returns:
+            The frame, or None on timeout or when the broadcaster stops
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._latest is None or self._latest.seq <= after_seq:
+                if not self._running:
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._latest
+
+    def mjpeg_stream(self, idle_timeout: float = 5.0) -> Iterator[bytes]:
+        """
+        multipart/x-mixed-replace body for an HTTP viewer.
+
+        Each part is the newest frame at the time the client is ready, so a slow
+        client simply skips frames. Ends when the broadcaster stops or no frame
+        arrives for idle_timeout seconds.
+        """
+        self.mjpeg_clients += 1
+        try:
+            seq = -1
+            while True:
+                frame = self.wait_for_frame(seq, timeout=idle_timeout)
+                if frame is None:
+                    return
+                seq = frame.seq
+                yield (
+                    f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(frame.jpeg)}\r\n\r\n"
+                ).encode() + frame.jpeg + b"\r\n"
+        finally:
+            self.mjpeg_clients -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return frame counters and average encode time."""
+        return {
+            "published": self.published,
+            "encoded": self.encoded,
+            "replaced_before_encode": self.replaced,
+            "avg_encode_ms": round(self.encode_seconds / self.encoded * 1000, 2) if self.encoded else 0.0,
+            "mjpeg_clients": self.mjpeg_clients,
+        }
+
+
+class SocketIOFrameSender:
+    """
+    Broadcaster listener sending frames as binary Socket.IO attachments with per-client flow control.
+    """
+
+    def __init__(self, socketio, event: str = "video_frame", ack_timeout: float = ACK_TIMEOUT):
+        """
+        Initialize the sender.
+
+        Args:
+            socketio: flask_socketio.SocketIO instance
+            event: Event name frames are emitted under
+            ack_timeout: Seconds after which an unacknowledged frame no longer blocks its client
+        """
+        self.socketio = socketio
+        self.event = event
+        self.ack_timeout = ack_timeout
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Dict[str, Any]] = {}  # {sid: {"awaiting_since": float or None, "sent": int, "dropped": int}}
+        self.ack_latency: Optional[float] = None  # Moving average of emit -> ack seconds over all clients
+
+    def add_client(self, sid: str) -> None:
+        with self._lock:
+            self._clients[sid] = {"awaiting_since": None, "sent": 0, "dropped": 0}
+
+    def remove_client(self, sid: str) -> None:
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def _acknowledge(self, sid: str) -> None:
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is not None and client["awaiting_since"] is not None:
+                latency = time.time() - client["awaiting_since"]
+                if self.ack_latency is None:
+                    self.ack_latency = latency
+                else:
+                    self.ack_latency += ACK_LATENCY_ALPHA * (latency - self.ack_latency)
+                client["awaiting_since"] = None
+
+    def __call__(self, frame: EncodedFrame) -> None:
+        """Send the frame to every client that acknowledged its previous one."""
+        now = time.time()
+        ready = []
+        with self._lock:
+            for sid, client in self._clients.items():
+                awaiting_since = client["awaiting_since"]
+                if awaiting_since is not None and now - awaiting_since < self.ack_timeout:
+                    client["dropped"] += 1
+                    continue
+                client["awaiting_since"] = now
+                client["sent"] += 1
+                ready.append(sid)
+
+        payload = {
+            'frame': frame.jpeg,
+            'timestamp': frame.captured_at,
+            'frame_count': frame.seq
+        }
+        for sid in ready:
+            self.socketio.emit(self.event, payload, to=sid, callback=lambda *args, sid=sid: self._acknowledge(sid))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return sent and dropped totals and the ack latency (None without acks yet or without clients)."""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "ack_latency_ms": round(self.ack_latency * 1000, 1) if self.ack_latency is not None and self._clients else None,
+                "sent": sum(client["sent"] for client in self._clients.values()),
+                "dropped": sum(client["dropped"] for client in self._clients.values()),
+            }
@@ -0,0 +1,276 @@
+"""
+Frame Pipeline Stages
+
+Building blocks for running the center object classifier as a staged pipeline:
+camera capture, motion/scene-change analysis, classification and rendering each
+run at their own pace and are connected by bounded queues. When a downstream
+stage falls behind, the oldest queued item is dropped so upstream stages never
+block on it. Captured images are persisted by a background writer so disk
+I/O stays off the capture path. Stages running on an event loop wait on
+their queue with get_async(), which parks no worker thread.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class DropOldestQueue:
+    """
+    Thread-safe bounded queue that evicts the oldest item when full.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        """
+        Initialize the queue.
+
+        Args:
+            name: Stage name used in metrics output
+            maxsize: Maximum number of queued items (must be >= 1)
+        """
+        if maxsize < 1:
+            raise ValueError(f"Queue '{name}' needs a depth of at least 1, got {maxsize}")
+
+        self.name = name
+        self.maxsize = maxsize
+        self._items: Deque[Any] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.put_count = 0
+        self.dropped_count = 0
+
+    def put(self, item: Any) -> bool:
+        """
+        Add an item, dropping the oldest queued item if the queue is full.
+
+        Returns:
+            False if the queue is closed or an older item had to be dropped
+        """
+        with self._condition:
+            if self._closed:
+                return False
+
+            dropped = False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped_count += 1
+                dropped = True
+
+            self._items.append(item)
+            self.put_count += 1
+            self._condition.notify()
+            self._wake_async_waiters()
+            return not dropped
+
+    def _wake_async_waiters(self) -> None:
+        """Resolve the futures of coroutines waiting in get_async() (call with the condition held)."""
+        for loop, future in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        self._async_waiters.clear()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Remove and return the oldest item.
+
+        Returns:
+            The item, or None on timeout or when the queue is closed and empty
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        get() for consumers on an event loop: waits on a loop future instead of a thread.
+
+        Returns:
+            The item, or None on timeout or when the queue is closed and empty
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._condition:
+                if self._items:
+                    return self._items.popleft()
+                if self._closed:
+                    return None
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining > 0:
+                await asyncio.wait({waiter}, timeout=remaining)
+            elif remaining is None:
+                await waiter
+            if not waiter.done():
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                waiter.cancel()
+                with self._condition:
+                    return self._items.popleft() if self._items else None
+
+    def close(self) -> None:
+        """Stop accepting items and wake up any waiting consumers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            self._wake_async_waiters()
+
+    @property
+    def drained(self) -> bool:
+        """True once the queue is closed and every item has been consumed."""
+        with self._condition:
+            return self._closed and not self._items
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._items)
+
+
+class StageStats:
+    """
+    Throughput and latency counters for a single pipeline stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, duration: float) -> None:
+        """Record one processed item that took `duration` seconds."""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time() - duration
+            self.processed += 1
+            self.total_time += duration
+            self.max_time = max(self.max_time, duration)
+
+    def snapshot(self, queue: Optional[DropOldestQueue] = None) -> Dict[str, Any]:
+        """
+        Build a metrics snapshot for this stage.
+
+        Args:
+            queue: Input queue of the stage, if any, to report depth and drops
+
+        Returns:
+            Dictionary with processed count, throughput and latency figures
+        """
+        with self._lock:
+            elapsed = time.time() - self.started_at if self.started_at else 0.0
+            stats = {
+                "processed": self.processed,
+                "throughput_fps": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+                "avg_ms": round(self.total_time / self.processed * 1000, 2) if self.processed else 0.0,
+                "max_ms": round(self.max_time * 1000, 2),
+            }
+
+        if queue is not None:
+            stats["queue_depth"] = len(queue)
+            stats["queue_capacity"] = queue.maxsize
+            stats["dropped"] = queue.dropped_count
+
+        return stats
+
+
+class CaptureWriter:
+    """
+    Background thread that persists already-encoded captures to disk.
+
+    Writes go through a bounded queue. When the queue stays full the write is
+    done inline instead, so captures are never lost.
+    """
+
+    def __init__(self, maxsize: int = 8, on_written: Optional[Callable[[Path], None]] = None,
+                 put_timeout: float = 0.5):
+        """
+        Initialize the writer and start its thread.
+
+        Args:
+            maxsize: Maximum number of captures waiting to be written
+            on_written: Optional callback run on the writer thread after each write
+            put_timeout: Seconds to wait for queue space before writing inline
+        """
+        self.maxsize = maxsize
+        self.on_written = on_written
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Optional[Tuple[Path, bytes]]]" = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self.written_count = 0
+        self.inline_writes = 0
+        self.failed_count = 0
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, data: bytes) -> None:
+        """Queue encoded image bytes for writing to `path`."""
+        if not self._closed:
+            try:
+                self._queue.put((path, data), timeout=self.put_timeout)
+                return
+            except queue.Full:
+                pass
+
+        self.inline_writes += 1
+        self._write(path, data)
+
+    def _write(self, path: Path, data: bytes) -> None:
+        """Write atomically so readers never see a partial image."""
+        try:
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.written_count += 1
+        except OSError as e:
+            self.failed_count += 1
+            print(f"❌ Could not write capture {path}: {e}")
+            return
+
+        if self.on_written:
+            try:
+                self.on_written(path)
+            except Exception as e:
+                print(f"⚠️ Post-write hook failed for {path}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            self._write(*item)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending writes and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return writer counters and the current backlog."""
+        return {
+            "written": self.written_count,
+            "pending": self._queue.qsize(),
+            "capacity": self.maxsize,
+            "inline_writes": self.inline_writes,
+            "failed": self.failed_count,
+        }
@@ -0,0 +1,186 @@
+"""
+Gemini Request Batcher
+
+Coalesces concurrent Gemini requests into multi-image calls. Callers submit
+one item (a frame, a crop, ...) and await its result. The batcher collects
+items for a short window or until the batch is full, sends them as a single
+request and hands each caller its own entry of the returned array. If a batch
+call fails or its response cannot be matched to the items, every item in that
+batch is retried as an individual request.
+
+The batcher is model-agnostic: the caller supplies `send_batch` (items -> list
+of results in the same order) and `send_single` (item -> result).
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class BatchResponseError(ValueError):
+    """Raised by send_batch when a batched response cannot be demultiplexed."""
+
+
+def demultiplex_results(parsed: Any, count: int, index_key: str = "image_index") -> List[Any]:
+    """
+    Map a parsed JSON array back to the items of a batch.
+
+    Entries carrying `index_key` (1-based) are placed by index; otherwise the
+    array order is used.
+
+    Args:
+        parsed: Parsed JSON response (expected to be a list)
+        count: Number of items in the batch
+        index_key: Field holding each entry's 1-based image index
+
+    Returns:
+        One result per item, in item order
+
+    Raises:
+        BatchResponseError: If the response is not an array of `count` objects
+    """
+    if isinstance(parsed, dict):
+        # Some responses wrap the array, e.g. {"results": [...]}
+        arrays = [value for value in parsed.values() if isinstance(value, list)]
+        parsed = arrays[0] if len(arrays) == 1 else parsed
+
+    if not isinstance(parsed, list) or len(parsed) != count:
+        size = len(parsed) if isinstance(parsed, list) else type(parsed).__name__
+        raise BatchResponseError(f"Expected an array of {count} results, got {size}")
+    if not all(isinstance(entry, dict) for entry in parsed):
+        raise BatchResponseError("Batch response entries must be JSON objects")
+
+    indices = [entry.get(index_key) for entry in parsed]
+    if all(isinstance(index, int) for index in indices) and sorted(indices) == list(range(1, count + 1)):
+        ordered: List[Any] = [None] * count
+        for entry, index in zip(parsed, indices):
+            ordered[index - 1] = entry
+        return ordered
+
+    return list(parsed)
+
+
+class GeminiBatcher:
+    """
+    Collects submitted items into batches and resolves each caller's future.
+    """
+
+    def __init__(self, send_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 send_single: Callable[[Any], Awaitable[Any]],
+                 max_batch_size: int = 8, max_wait: float = 0.05, name: str = "gemini"):
+        """
+        Initialize the batcher.
+
+        Args:
+            send_batch: Sends several items in one request; returns results in item order
+            send_single: Sends one item; used for batches of one and as the fallback
+            max_batch_size: Maximum items per request
+            max_wait: Seconds to wait for more items after the first one arrives
+            name: Label used in log output
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be at least 1, got {max_batch_size}")
+
+        self.send_batch = send_batch
+        self.send_single = send_single
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.items = 0
+        self.batched_items = 0
+        self.fallbacks = 0
+        self.total_request_time = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result.
+
+        Returns:
+            The result for this item (from the batch or the single-call fallback)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self.items += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Start a request for up to max_batch_size pending items."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+            # Leave a partial batch waiting for the window unless it is full
+            if 0 < len(self._pending) < self.max_batch_size:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+                break
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        start = time.time()
+
+        if len(items) == 1:
+            self.requests += 1
+            await self._resolve_single(items[0], futures[0])
+            self.total_request_time += time.time() - start
+            return
+
+        self.requests += 1
+        try:
+            results = await self.send_batch(items)
+            if not isinstance(results, list) or len(results) != len(items):
+                raise BatchResponseError(f"Expected {len(items)} results from send_batch")
+        except Exception as e:
+            self.fallbacks += 1
+            print(f"⚠️ {self.name} batch of {len(items)} failed ({e}); retrying items individually")
+            self.requests += len(items)
+            await asyncio.gather(*(self._resolve_single(item, future) for item, future in batch))
+            self.total_request_time += time.time() - start
+            return
+
+        self.batched_items += len(items)
+        self.total_request_time += time.time() - start
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _resolve_single(self, item: Any, future: asyncio.Future) -> None:
+        try:
+            result = await self.send_single(item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters (items per request shows how well requests coalesce)."""
+        return {
+            "items": self.items,
+            "requests": self.requests,
+            "batched_items": self.batched_items,
+            "fallbacks": self.fallbacks,
+            "items_per_request": round(self.items / self.requests, 2) if self.requests else 0.0,
+            "avg_request_ms": round(self.total_request_time / self.requests * 1000, 1) if self.requests else 0.0,
+        }
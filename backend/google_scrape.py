@@ -1,11 +1,28 @@
+import asyncio
 import requests
 import json
 import sys
 import os
 import re
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import get_rate_limiter
+
+# Optional async HTTP client (falls back to the pooled sync client on a thread)
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    aiohttp = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +31,14 @@ load_dotenv()
 USERNAME = os.getenv("OXYLABS_USERNAME")
 PASSWORD = os.getenv("OXYLABS_PASSWORD")
 
+# HTTP client configuration
+OXYLABS_ENDPOINT = "https://realtime.oxylabs.io/v1/queries"
+REQUEST_TIMEOUT = float(os.getenv("OXYLABS_TIMEOUT", "60"))  # Seconds per request (realtime scrapes are slow)
+MAX_RETRIES = 3  # Retries on connection errors, 429 and 5xx responses
+BACKOFF_FACTOR = 0.5  # Exponential backoff base in seconds (0.5, 1, 2, ...)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+POOL_SIZE = 8  # Keep-alive connections kept open to Oxylabs
+
 
 def clean_store_name(raw_name: str) -> str:
     if not raw_name:
@@ -85,36 +110,164 @@ def extract_store_name(item: dict) -> str:
     # Final fallback: return merchant even if it's Google
     return clean_store_name(item.get("merchant", "")) or "Google"
 
-def _perform_oxylabs_request(query: str):
+def _build_payload(query: str) -> dict:
     target_url = f"https://www.google.com/search?tbm=shop&q={query.replace(' ', '+')}"
-    payload = {
+    return {
         "source": "google_shopping",
         "url": target_url,
         "geo_location": "United States",
         "parse": True
     }
 
-    response = requests.post(
-        "https://realtime.oxylabs.io/v1/queries",
-        auth=(USERNAME, PASSWORD),
-        headers={'Content-Type': 'application/json'},
-        json=payload
-    )
 
-    if response.status_code == 204:
+def _backoff_delay(backoff_factor: float, attempt: int, retry_after=None) -> float:
+    """Seconds to wait before retry `attempt` (Retry-After when the server sent one, else jittered exponential)."""
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return backoff_factor * (2 ** attempt) + random.uniform(0, backoff_factor)
+
+
+def _parse_response(status_code: int, parse_json, query: str):
+    if status_code == 204:
         print(f"⚠️ Oxylabs returned 204 (no content) for query '{query}'")
         return None
-    if response.status_code != 200:
-        print(f"⚠️ Oxylabs request failed with status {response.status_code} for query '{query}'")
+    if status_code != 200:
+        print(f"⚠️ Oxylabs request failed with status {status_code} for query '{query}'")
         return None
 
     try:
-        return response.json()
+        return parse_json()
     except ValueError as e:
         print(f"⚠️ Failed to parse JSON response for query '{query}': {e}")
         return None
 
 
+class OxylabsClient:
+    """Pooled keep-alive Oxylabs client with timeout and retry/backoff on 429/5xx."""
+
+    def __init__(self, username=None, password=None, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = requests.Session()
+        self.session.auth = (username or USERNAME, password or PASSWORD)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        # Retries are driven by query() so each attempt takes its own rate-limiter token
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+
+    def query(self, query: str):
+        payload = _build_payload(query)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Backoff sleeps happen outside the limiter so they hold no in-flight slot
+                with get_rate_limiter("oxylabs"):
+                    response = self.session.post(OXYLABS_ENDPOINT, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt < self.max_retries:
+                    time.sleep(_backoff_delay(self.backoff_factor, attempt))
+                    continue
+                print(f"⚠️ Oxylabs request error for query '{query}': {e}")
+                return None
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = _backoff_delay(self.backoff_factor, attempt, response.headers.get("Retry-After"))
+                print(f"⏳ Oxylabs returned {response.status_code} for '{query}', retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            return _parse_response(response.status_code, response.json, query)
+
+        return None
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOxylabsClient:
+    """asyncio Oxylabs client sharing one connection pool, with retry/backoff on 429/5xx."""
+
+    def __init__(self, username=None, password=None, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE):
+        self.username = username or USERNAME
+        self.password = password or PASSWORD
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.username or "", self.password or ""),
+                headers={'Content-Type': 'application/json'},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.pool_size)
+            )
+        return self._session
+
+    async def query(self, query: str):
+        if not AIOHTTP_AVAILABLE:
+            # No aiohttp installed: reuse the pooled sync client on a worker thread
+            return await asyncio.to_thread(get_oxylabs_client().query, query)
+
+        session = self._get_session()
+        payload = _build_payload(query)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Shares the per-upstream limit with the sync client; backoff sleeps outside it
+                async with get_rate_limiter("oxylabs"):
+                    async with session.post(OXYLABS_ENDPOINT, json=payload) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        body = await response.read()
+
+                if status in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = _backoff_delay(self.backoff_factor, attempt, retry_after)
+                    print(f"⏳ Oxylabs returned {status} for '{query}', retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                return _parse_response(status, lambda: json.loads(body), query)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(_backoff_delay(self.backoff_factor, attempt))
+                    continue
+                print(f"⚠️ Oxylabs request error for query '{query}': {e}")
+                return None
+
+        return None
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+_client_lock = threading.Lock()
+_shared_client = None
+
+
+def get_oxylabs_client() -> OxylabsClient:
+    """Return the process-wide pooled Oxylabs client."""
+    global _shared_client
+    with _client_lock:
+        if _shared_client is None:
+            _shared_client = OxylabsClient()
+        return _shared_client
+
+
+def _perform_oxylabs_request(query: str):
+    return get_oxylabs_client().query(query)
+
+
 def _extract_results(data: dict):
     if not data or "results" not in data or not data["results"]:
         return []
@@ -167,7 +320,7 @@ def _extract_results(data: dict):
     return []
 
 
-def scrape_google_shopping_deals(query):
+def _build_fallback_queries(query: str):
     queries = []
     seen = set()
 
@@ -183,22 +336,115 @@ def scrape_google_shopping_deals(query):
         add_query(" ".join(tokens[:2]))
     if tokens:
         add_query(tokens[0])
+    return queries
 
-    for attempt in queries:
-        data = _perform_oxylabs_request(attempt)
-        if not data:
-            continue
-        results = _extract_results(data)
-        if results:
-            if attempt != query:
-                print(f"ℹ️ Falling back to simplified query '{attempt}'")
-            return results
 
-    return []
+def _search_attempt(attempt: str):
+    data = _perform_oxylabs_request(attempt)
+    if not data:
+        return []
+    return _extract_results(data)
+
+
+def scrape_google_shopping_deals(query, concurrent=False):
+    """
+    Search Google Shopping, falling back to simplified queries when nothing is found.
+
+    With concurrent=True all fallback queries are sent at once and the first
+    non-empty result in priority order wins, so the worst case costs roughly one
+    round trip instead of three (at the price of extra Oxylabs requests).
+    """
+    queries = _build_fallback_queries(query)
+
+    if not concurrent or len(queries) == 1:
+        for attempt in queries:
+            results = _search_attempt(attempt)
+            if results:
+                if attempt != query:
+                    print(f"ℹ️ Falling back to simplified query '{attempt}'")
+                return results
+        return []
+
+    executor = ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="oxylabs")
+    try:
+        futures = [executor.submit(_search_attempt, attempt) for attempt in queries]
+        for attempt, future in zip(queries, futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"⚠️ Query '{attempt}' failed: {e}")
+                continue
+            if results:
+                if attempt != query:
+                    print(f"ℹ️ Falling back to simplified query '{attempt}'")
+                return results
+        return []
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_oxylabs_client() -> AsyncOxylabsClient:
+    """Return the pooled async Oxylabs client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOxylabsClient()
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_oxylabs_client():
+    """Close the pooled async client bound to the running event loop, if any."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+async def scrape_google_shopping_deals_async(query, concurrent=True):
+    """asyncio version of scrape_google_shopping_deals using the pooled async client."""
+    client = get_async_oxylabs_client()
+    queries = _build_fallback_queries(query)
+
+    async def search(attempt):
+        data = await client.query(attempt)
+        return _extract_results(data) if data else []
+
+    if not concurrent or len(queries) == 1:
+        for attempt in queries:
+            results = await search(attempt)
+            if results:
+                if attempt != query:
+                    print(f"ℹ️ Falling back to simplified query '{attempt}'")
+                return results
+        return []
+
+    tasks = [asyncio.create_task(search(attempt)) for attempt in queries]
+    try:
+        for attempt, task in zip(queries, tasks):
+            try:
+                results = await task
+            except Exception as e:
+                print(f"⚠️ Query '{attempt}' failed: {e}")
+                continue
+            if results:
+                if attempt != query:
+                    print(f"ℹ️ Falling back to simplified query '{attempt}'")
+                return results
+        return []
+    finally:
+        for task in tasks:
+            task.cancel()
+
 
 if __name__ == "__main__":
-    query = " ".join(sys.argv[1:]) or "Coca-Cola 12 pack"
-    deals = scrape_google_shopping_deals(query)
+    concurrent = "--concurrent" in sys.argv
+    query = " ".join(arg for arg in sys.argv[1:] if arg != "--concurrent") or "Coca-Cola 12 pack"
+    start_time = time.time()
+    deals = scrape_google_shopping_deals(query, concurrent=concurrent)
+    print(f"⏱️ Lookup took {time.time() - start_time:.1f}s ({'concurrent' if concurrent else 'sequential'} fallbacks)")
 
     # Print results to console
     for d in deals[:20]:
@@ -0,0 +1,277 @@
+"""
+Background Job Queue
+
+Runs long analyses (grocery categories, reports) on a worker pool so API
+requests return a job id immediately. Each job records its status, progress,
+partial results and final result, and keeps an ordered event log that
+clients can follow (the API exposes it as a Server-Sent Events stream).
+Jobs can be cancelled: queued jobs never start, and running jobs see their
+cancel event set and stop at the next checkpoint. Finished jobs are kept
+for a retention period and then dropped.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+JOB_MAX_WORKERS = 2  # Jobs executed at once; the rest wait in the queue
+JOB_RETENTION_SECONDS = 3600  # Seconds a finished job (and its result) stays retrievable
+JOB_MAX_RETAINED = 200  # Finished jobs kept at most (oldest dropped first)
+JOB_MAX_EVENTS = 500  # Events kept per job for late subscribers
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work function when the job has been cancelled."""
+
+
+@dataclass
+class JobEvent:
+    """One entry of a job's event log."""
+
+    seq: int
+    type: str  # "status", "progress", "partial" or "result"
+    data: Dict[str, Any]
+    timestamp: str
+
+
+@dataclass
+class Job:
+    """A unit of background work and everything clients can observe about it."""
+
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    partial: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    events: Deque[JobEvent] = field(default_factory=lambda: deque(maxlen=JOB_MAX_EVENTS))
+    _seq: Any = field(default_factory=lambda: itertools.count(1))
+    _condition: threading.Condition = field(default_factory=threading.Condition)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if the job has been cancelled (call at safe checkpoints)."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+
+    def emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Append an event to the log and wake up stream subscribers."""
+        with self._condition:
+            self.events.append(JobEvent(next(self._seq), event_type, data, datetime.now().isoformat()))
+            self._condition.notify_all()
+
+    def report_progress(self, event: Dict[str, Any]) -> None:
+        """Record a progress event (usable directly as a scorer progress callback)."""
+        self.progress = event
+        self.emit("progress", event)
+
+    def add_partial(self, key: str, value: Any) -> None:
+        """Record a partial result (e.g. one finished category of a report)."""
+        self.partial[key] = value
+        self.emit("partial", {"key": key, "value": value})
+
+    def _set_status(self, status: str, **extra: Any) -> None:
+        self.status = status
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in TERMINAL_STATUSES:
+            self.finished_at = time.time()
+        self.emit("status", {"status": status, **extra})
+
+    def events_after(self, seq: int, timeout: Optional[float] = None) -> List[JobEvent]:
+        """
+        Events with a sequence number above seq, waiting up to timeout for new ones.
+
+        Returns:
+            New events (empty if the timeout expired or the job is already done)
+        """
+        with self._condition:
+            if not self.done and not (self.events and self.events[-1].seq > seq):
+                self._condition.wait(timeout)
+            return [event for event in self.events if event.seq > seq]
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """JSON-serializable view of the job."""
+        def iso(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        view = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "progress": self.progress,
+            "partial_results": self.partial,
+            "error": self.error,
+        }
+        if include_result:
+            view["result"] = self.result
+        return view
+
+
+class JobQueue:
+    """
+    Worker pool executing jobs, with status tracking, cancellation and retention.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS,
+                 retention_seconds: float = JOB_RETENTION_SECONDS,
+                 max_retained: int = JOB_MAX_RETAINED):
+        """
+        Initialize the queue.
+
+        Args:
+            max_workers: Jobs executed at once
+            retention_seconds: Seconds finished jobs stay retrievable
+            max_retained: Maximum finished jobs kept
+        """
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.counts = {status: 0 for status in TERMINAL_STATUSES}
+
+    def submit(self, kind: str, work: Callable[[Job], Any], params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: Job type shown to clients (e.g. "category", "report")
+            work: Callable receiving the Job and returning a JSON-serializable result;
+                it should call job.check_cancelled() or honour job.cancel_event
+            params: Request parameters, echoed in the job status
+
+        Returns:
+            The queued job
+        """
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params or {})
+        job.emit("status", {"status": QUEUED})
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        print(f"🗂️ Job {job.id[:8]} queued ({kind})")
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], Any]) -> None:
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+
+        job._set_status(RUNNING)
+        try:
+            result = work(job)
+            job.check_cancelled()
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            print(f"❌ Job {job.id[:8]} failed: {e}")
+            job.error = str(e)
+            self._finish(job, FAILED, error=str(e))
+        else:
+            job.result = result
+            job.emit("result", {"result": result})
+            self._finish(job, SUCCEEDED)
+
+    def _finish(self, job: Job, status: str, **extra: Any) -> None:
+        job._set_status(status, **extra)
+        with self._lock:
+            self.counts[status] += 1
+        duration = (job.finished_at - (job.started_at or job.created_at))
+        print(f"🗂️ Job {job.id[:8]} {status} after {duration:.1f}s")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or expired."""
+        self._prune()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job.
+
+        Returns:
+            The job, or None if unknown or expired (finished jobs are returned unchanged)
+        """
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            job.cancel_event.set()
+            job.emit("cancel_requested", {})
+        return job
+
+    def list(self) -> List[Job]:
+        """All retained jobs, newest first."""
+        self._prune()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def stream(self, job_id: str, after_seq: int = 0, poll_timeout: float = 15.0) -> Iterator[Optional[JobEvent]]:
+        """
+        Follow a job's events until it finishes.
+
+        Yields:
+            Events in order; None after poll_timeout seconds without events (for keep-alives)
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        seq = after_seq
+        while True:
+            events = job.events_after(seq, poll_timeout)
+            for event in events:
+                seq = event.seq
+                yield event
+            if job.done and not job.events_after(seq, 0):
+                return
+            if not events:
+                yield None
+
+    def _prune(self) -> None:
+        """Drop finished jobs past their retention, then the oldest beyond max_retained."""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.done),
+                key=lambda job: job.finished_at
+            )
+            expired = [job for job in finished if now - job.finished_at > self.retention_seconds]
+            overflow = finished[len(expired):][:max(0, len(finished) - len(expired) - self.max_retained)]
+            for job in expired + overflow:
+                del self._jobs[job.id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counts by status."""
+        with self._lock:
+            active = [job.status for job in self._jobs.values() if not job.done]
+            return {
+                "queued": active.count(QUEUED),
+                "running": active.count(RUNNING),
+                "retained": len(self._jobs),
+                "finished": dict(self.counts),
+            }
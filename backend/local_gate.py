@@ -0,0 +1,327 @@
+"""
+Local Pre-Classifier Gate
+
+CPU-only checks run on a capture candidate before it is sent to Gemini, so
+frames that would only come back as "no_hand_holding_object" never cost a
+round trip. Gates run in order and stop at the first rejection:
+
+1. hand    - MediaPipe Hand Landmarker finds a hand above a score threshold
+2. object  - the region around the hand (where a held item would be) overlaps
+             the center region and has enough edge texture outside the hand
+             itself to contain an object
+3. yolo    - optional: an Ultralytics YOLO model finds a product class in the
+             hand region (only when a model path is configured)
+
+Every gate keeps checked/passed/rejected counters so thresholds can be tuned
+from the pipeline stats. Without MediaPipe (or its model) the gate disables
+itself and lets every frame through.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Optional imports with fallback
+try:
+    from mediapipe import Image, ImageFormat
+    from mediapipe.tasks import python as mp_python
+    from mediapipe.tasks.python import vision
+    MEDIAPIPE_AVAILABLE = True
+except ImportError:
+    MEDIAPIPE_AVAILABLE = False
+
+try:
+    from ultralytics import YOLO
+    YOLO_AVAILABLE = True
+except ImportError:
+    YOLO = None
+    YOLO_AVAILABLE = False
+
+HAND_MODEL_URL = (
+    "https://storage.googleapis.com/mediapipe-models/hand_landmarker/"
+    "hand_landmarker/float16/1/hand_landmarker.task"
+)
+DEFAULT_HAND_MODEL = Path("hand_landmarker.task")
+DEFAULT_MIN_HAND_SCORE = 0.5  # Minimum handedness score for a hand to count
+DEFAULT_GRASP_EXPANSION = 0.6  # Hand box grown by this fraction of its size on each side
+DEFAULT_MIN_CENTER_OVERLAP = 0.15  # Share of the hand region that must lie in the center region
+DEFAULT_MIN_EDGE_DENSITY = 0.03  # Share of edge pixels outside the hand needed to call it an object
+DEFAULT_YOLO_CONFIDENCE = 0.25  # Minimum YOLO detection confidence
+GATE_MAX_WIDTH = 640  # Frames are downscaled to this width before any gate runs
+GATE_NAMES = ('hand', 'object', 'yolo')
+
+
+def ensure_hand_model(model_path: Path, model_url: str = HAND_MODEL_URL, force: bool = False) -> Path:
+    """
+    Download the Hand Landmarker model if it is not present yet (or force is set).
+
+    The download goes to a temporary file that replaces model_path only once
+    complete, so an interrupted download never leaves a truncated model behind.
+    """
+    if model_path.exists() and not force:
+        return model_path
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"⬇️ Downloading Hand Landmarker model to {model_path}...", file=sys.stderr)
+    fd, tmp_path = tempfile.mkstemp(dir=model_path.parent, prefix=f".{model_path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        urllib.request.urlretrieve(model_url, tmp_path)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return model_path
+
+
+class LocalGate:
+    """
+    Hand, object-in-hand and optional YOLO checks in front of the Gemini classifier.
+    """
+
+    def __init__(self, hand_model: Path = DEFAULT_HAND_MODEL, min_hand_score: float = DEFAULT_MIN_HAND_SCORE,
+                 grasp_expansion: float = DEFAULT_GRASP_EXPANSION,
+                 min_center_overlap: float = DEFAULT_MIN_CENTER_OVERLAP,
+                 min_edge_density: float = DEFAULT_MIN_EDGE_DENSITY,
+                 yolo_model: Optional[str] = None, yolo_confidence: float = DEFAULT_YOLO_CONFIDENCE,
+                 yolo_classes: Optional[Iterable[str]] = None, enabled: bool = True):
+        """
+        Initialize the gate.
+
+        Args:
+            hand_model: Path of the MediaPipe Hand Landmarker model (downloaded if missing)
+            min_hand_score: Minimum handedness score for a hand to count
+            grasp_expansion: Growth of the hand box, per side, that forms the object-in-hand region
+            min_center_overlap: Share of the object-in-hand region that must lie in the center region
+            min_edge_density: Share of edge pixels (outside the hand) the region needs to hold an object
+            yolo_model: Optional Ultralytics weights path; the YOLO gate is skipped without one
+            yolo_confidence: Minimum YOLO detection confidence
+            yolo_classes: Class names accepted by the YOLO gate (None accepts every class)
+            enabled: False lets every frame through without running any gate
+        """
+        self.min_hand_score = min_hand_score
+        self.grasp_expansion = grasp_expansion
+        self.min_center_overlap = min_center_overlap
+        self.min_edge_density = min_edge_density
+        self.yolo_confidence = yolo_confidence
+        self.yolo_classes = {name.lower() for name in yolo_classes} if yolo_classes else None
+        self._lock = threading.Lock()  # Landmarker and YOLO instances are not thread-safe
+
+        self.landmarker = None
+        self.yolo = None
+        self.disabled_reason: Optional[str] = None
+        if not enabled:
+            self.disabled_reason = "disabled by configuration"
+        elif not MEDIAPIPE_AVAILABLE:
+            self.disabled_reason = "mediapipe not installed"
+        else:
+            try:
+                self.landmarker = self._create_landmarker(Path(hand_model), min_hand_score)
+            except Exception as e:
+                self.disabled_reason = f"hand model unavailable ({e})"
+
+        if self.landmarker is not None and yolo_model:
+            if not YOLO_AVAILABLE:
+                print("⚠️ ultralytics not installed - local YOLO gate skipped")
+            else:
+                try:
+                    self.yolo = YOLO(yolo_model)
+                except Exception as e:
+                    print(f"⚠️ Could not load YOLO model {yolo_model}: {e}")
+
+        if self.disabled_reason:
+            print(f"⚠️ Local pre-classifier gate off: {self.disabled_reason} - every capture goes to Gemini")
+
+        self.frames = 0
+        self.passed = 0
+        self.bypassed = 0  # Frames let through because the gate is disabled
+        self.total_cost = 0.0
+        self.gates = {name: {'checked': 0, 'passed': 0, 'rejected': 0} for name in GATE_NAMES}
+
+    @staticmethod
+    def _create_landmarker(hand_model: Path, min_hand_score: float):
+        """Create the Hand Landmarker, downloading the model again once if the local copy is unusable."""
+        existed = hand_model.exists()
+        for attempt in range(2):
+            options = vision.HandLandmarkerOptions(
+                base_options=mp_python.BaseOptions(
+                    model_asset_path=str(ensure_hand_model(hand_model, force=attempt > 0))
+                ),
+                num_hands=2,
+                min_hand_detection_confidence=min_hand_score,
+                min_hand_presence_confidence=min_hand_score,
+                running_mode=vision.RunningMode.IMAGE,
+            )
+            try:
+                return vision.HandLandmarker.create_from_options(options)
+            except Exception as e:
+                if attempt > 0 or not existed:
+                    raise
+                print(f"⚠️ Hand Landmarker model {hand_model} is unusable ({e}), downloading it again")
+
+    @property
+    def enabled(self) -> bool:
+        return self.landmarker is not None
+
+    def _record(self, gate: str, passed: bool) -> None:
+        counters = self.gates[gate]
+        counters['checked'] += 1
+        counters['passed' if passed else 'rejected'] += 1
+
+    def _detect_hand(self, frame: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
+        """Pixel landmarks and score of the most confident hand, or None."""
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        result = self.landmarker.detect(Image(image_format=ImageFormat.SRGB, data=rgb))
+        best = None
+        for index, landmarks in enumerate(result.hand_landmarks):
+            handedness = result.handedness[index] if index < len(result.handedness) else []
+            score = handedness[0].score if handedness else 0.0
+            if score >= self.min_hand_score and (best is None or score > best[1]):
+                best = (landmarks, score)
+        if best is None:
+            return None
+        height, width = frame.shape[:2]
+        points = np.array([[lm.x * width, lm.y * height] for lm in best[0]], dtype=np.float32)
+        points[:, 0] = np.clip(points[:, 0], 0, width - 1)
+        points[:, 1] = np.clip(points[:, 1], 0, height - 1)
+        return points, best[1]
+
+    def _grasp_region(self, points: np.ndarray, frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """Hand bounding box grown by grasp_expansion on each side, clipped to the frame."""
+        height, width = frame_shape[:2]
+        left, top = points.min(axis=0)
+        right, bottom = points.max(axis=0)
+        pad_x = (right - left) * self.grasp_expansion
+        pad_y = (bottom - top) * self.grasp_expansion
+        return (max(0, int(left - pad_x)), max(0, int(top - pad_y)),
+                min(width, int(right + pad_x)), min(height, int(bottom + pad_y)))
+
+    def _object_check(self, frame: np.ndarray, points: np.ndarray, region: Tuple[int, int, int, int],
+                      center_region: Tuple[int, int, int, int]) -> Tuple[bool, float, float]:
+        """(passed, center overlap, edge density outside the hand) for the object-in-hand region."""
+        left, top, right, bottom = region
+        area = (right - left) * (bottom - top)
+        if area <= 0:
+            return False, 0.0, 0.0
+        c_left, c_top, c_right, c_bottom = center_region
+        inter_w = max(0, min(right, c_right) - max(left, c_left))
+        inter_h = max(0, min(bottom, c_bottom) - max(top, c_top))
+        overlap = inter_w * inter_h / area
+        if overlap < self.min_center_overlap:
+            return False, overlap, 0.0
+
+        gray = cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, 50, 150)
+        # Mask out the hand itself: its own outline is not evidence of an object
+        outside_hand = np.full(gray.shape, 255, dtype=np.uint8)
+        hull = cv2.convexHull((points - np.array([left, top], dtype=np.float32)).astype(np.int32))
+        cv2.fillConvexPoly(outside_hand, hull, 0)
+        outside_area = cv2.countNonZero(outside_hand)
+        if outside_area == 0:
+            return False, overlap, 0.0
+        density = cv2.countNonZero(cv2.bitwise_and(edges, outside_hand)) / outside_area
+        return density >= self.min_edge_density, overlap, density
+
+    def _yolo_check(self, frame: np.ndarray, region: Tuple[int, int, int, int]) -> Tuple[bool, Optional[str], float]:
+        """(passed, best accepted class name, its confidence) for the object-in-hand region."""
+        left, top, right, bottom = region
+        results = self.yolo(frame[top:bottom, left:right], conf=self.yolo_confidence, verbose=False)
+        best_label, best_conf = None, 0.0
+        for result in results:
+            if result.boxes is None:
+                continue
+            for cls_idx, conf in zip(result.boxes.cls.tolist(), result.boxes.conf.tolist()):
+                label = str(result.names.get(int(cls_idx), cls_idx))
+                if self.yolo_classes is not None and label.lower() not in self.yolo_classes:
+                    continue
+                if conf > best_conf:
+                    best_label, best_conf = label, conf
+        return best_label is not None, best_label, best_conf
+
+    def check(self, frame: np.ndarray, center_region: Tuple[int, int, int, int]) -> Dict[str, Any]:
+        """
+        Run the gates on one capture candidate.
+
+        Args:
+            frame: Full-resolution BGR frame
+            center_region: (left, top, right, bottom) in full-resolution pixels
+
+        Returns:
+            Dictionary with 'passed', the rejecting 'gate' and 'reason' (None when passed),
+            and the measurements behind the decision
+        """
+        self.frames += 1
+        if not self.enabled:
+            self.bypassed += 1
+            self.passed += 1
+            return {'passed': True, 'gate': None, 'reason': None, 'bypassed': True}
+
+        start = time.perf_counter()
+        scale = min(1.0, GATE_MAX_WIDTH / frame.shape[1])
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            center_region = tuple(int(value * scale) for value in center_region)
+
+        decision: Dict[str, Any] = {'passed': False, 'gate': None, 'reason': None, 'bypassed': False}
+        with self._lock:
+            hand = self._detect_hand(frame)
+            self._record('hand', hand is not None)
+            if hand is None:
+                decision.update(gate='hand', reason='no hand detected')
+            else:
+                points, hand_score = hand
+                region = self._grasp_region(points, frame.shape)
+                has_object, overlap, density = self._object_check(frame, points, region, center_region)
+                self._record('object', has_object)
+                decision.update(hand_score=round(hand_score, 3), center_overlap=round(overlap, 3),
+                                edge_density=round(density, 4))
+                if not has_object:
+                    reason = (f"hand outside center region ({overlap:.0%} overlap)" if overlap < self.min_center_overlap
+                              else f"no object in hand (edge density {density:.3f})")
+                    decision.update(gate='object', reason=reason)
+                elif self.yolo is not None:
+                    found, label, confidence = self._yolo_check(frame, region)
+                    self._record('yolo', found)
+                    decision.update(yolo_label=label, yolo_confidence=round(confidence, 3))
+                    if not found:
+                        decision.update(gate='yolo', reason='no product class detected')
+                    else:
+                        decision['passed'] = True
+                else:
+                    decision['passed'] = True
+
+        cost = time.perf_counter() - start
+        self.total_cost += cost
+        decision['cost_ms'] = round(cost * 1000, 2)
+        if decision['passed']:
+            self.passed += 1
+        return decision
+
+    def close(self) -> None:
+        """Release the hand landmarker."""
+        with self._lock:
+            if self.landmarker is not None:
+                self.landmarker.close()
+                self.landmarker = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return overall and per-gate pass/reject counters and the average gate cost."""
+        evaluated = self.frames - self.bypassed
+        return {
+            'enabled': self.enabled,
+            'disabled_reason': self.disabled_reason,
+            'yolo': self.yolo is not None,
+            'frames': self.frames,
+            'passed': self.passed,
+            'rejected': self.frames - self.passed,
+            'bypassed': self.bypassed,
+            'avg_ms': round(self.total_cost / evaluated * 1000, 2) if evaluated else 0.0,
+            'gates': {name: dict(counters) for name, counters in self.gates.items()},
+        }
@@ -0,0 +1,176 @@
+"""
+Motion Engine
+
+Motion and scene-change detection for the center object classifier, tuned for
+high-resolution feeds. Each frame is converted to grayscale once and
+downscaled with an image pyramid. Background subtraction (MOG2) and frame
+differencing run only on a padded region of interest around the center
+region. Only the previous small grayscale frame is kept between frames, and
+the engine reports the processing cost of every frame.
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Default engine parameters
+DEFAULT_PYRAMID_LEVEL = 2  # Number of pyrDown steps (each halves width and height)
+DEFAULT_MIN_WIDTH = 160  # Never downscale below this width
+DEFAULT_ROI_PADDING = 0.25  # Padding around the center region, as a fraction of its size
+
+
+class MotionEngine:
+    """
+    Single-conversion, downscaled motion and scene-change detector.
+    """
+
+    def __init__(self, motion_threshold: int = 30, motion_ratio_threshold: float = 0.01,
+                 histogram_threshold: float = 0.7, pyramid_level: int = DEFAULT_PYRAMID_LEVEL,
+                 min_width: int = DEFAULT_MIN_WIDTH, roi_padding: float = DEFAULT_ROI_PADDING):
+        """
+        Initialize the engine.
+
+        Args:
+            motion_threshold: Pixel difference threshold for frame differencing
+            motion_ratio_threshold: Minimum ratio of the center region with motion
+            histogram_threshold: Histogram correlation below which the scene changed
+            pyramid_level: Requested number of pyrDown steps
+            min_width: Smallest width the pyramid may reach
+            roi_padding: Padding around the center region for MOG2 and differencing
+        """
+        self.motion_threshold = motion_threshold
+        self.motion_ratio_threshold = motion_ratio_threshold
+        self.histogram_threshold = histogram_threshold
+        self.pyramid_level = pyramid_level
+        self.min_width = min_width
+        self.roi_padding = roi_padding
+
+        self.background_subtractor = None
+        self.previous_small_gray: Optional[np.ndarray] = None
+        self.reference_histogram: Optional[np.ndarray] = None
+        self._geometry: Optional[Tuple[Any, ...]] = None  # (frame shape, levels, roi, center within roi)
+
+        self.frames_processed = 0
+        self.total_cost = 0.0
+        self.max_cost = 0.0
+        self.last_cost = 0.0
+
+    def reset(self) -> None:
+        """Forget the background model, previous frame and reference histogram."""
+        self.background_subtractor = None
+        self.previous_small_gray = None
+        self.reference_histogram = None
+        self._geometry = None
+
+    def _levels_for(self, width: int) -> int:
+        """Number of pyrDown steps that keep the frame at or above min_width."""
+        levels = 0
+        while levels < self.pyramid_level and width // 2 >= self.min_width:
+            width //= 2
+            levels += 1
+        return levels
+
+    def _prepare_geometry(self, frame_shape: Tuple[int, ...],
+                          center_region: Tuple[int, int, int, int]) -> Tuple[Any, ...]:
+        """Compute (and cache) pyramid depth, padded ROI and the center region inside it."""
+        key = (frame_shape[:2], center_region)
+        if self._geometry is not None and self._geometry[0] == key:
+            return self._geometry
+
+        frame_height, frame_width = frame_shape[:2]
+        levels = self._levels_for(frame_width)
+        scale = 1 << levels
+        small_width = (frame_width + scale - 1) // scale
+        small_height = (frame_height + scale - 1) // scale
+
+        left, top, right, bottom = (coord // scale for coord in center_region)
+        pad_x = int((right - left) * self.roi_padding)
+        pad_y = int((bottom - top) * self.roi_padding)
+        roi = (max(0, left - pad_x), max(0, top - pad_y),
+               min(small_width, right + pad_x), min(small_height, bottom + pad_y))
+        center_in_roi = (left - roi[0], top - roi[1], right - roi[0], bottom - roi[1])
+
+        # The background model is tied to the ROI size; rebuild it when the geometry changes
+        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        self.previous_small_gray = None
+        self._geometry = (key, levels, roi, center_in_roi)
+        return self._geometry
+
+    def process(self, frame: np.ndarray, center_region: Tuple[int, int, int, int]) -> Dict[str, Any]:
+        """
+        Analyze one BGR frame.
+
+        Args:
+            frame: Full-resolution BGR frame
+            center_region: (left, top, right, bottom) in full-resolution pixels
+
+        Returns:
+            Dictionary with motion ratios/pixels, scene change flag and per-frame cost
+        """
+        start = time.perf_counter()
+        _, levels, roi, center_in_roi = self._prepare_geometry(frame.shape, center_region)
+
+        # Single grayscale conversion, then downscale
+        small_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for _ in range(levels):
+            small_gray = cv2.pyrDown(small_gray)
+
+        # Scene change: compare against the first frame's histogram
+        scene_changed = False
+        current_histogram = cv2.calcHist([small_gray], [0], None, [256], [0, 256])
+        if self.reference_histogram is not None:
+            correlation = cv2.compareHist(self.reference_histogram, current_histogram, cv2.HISTCMP_CORREL)
+            scene_changed = correlation < self.histogram_threshold
+        else:
+            self.reference_histogram = current_histogram
+
+        roi_left, roi_top, roi_right, roi_bottom = roi
+        c_left, c_top, c_right, c_bottom = center_in_roi
+        roi_gray = small_gray[roi_top:roi_bottom, roi_left:roi_right]
+
+        # Method 1: Background subtraction on the padded ROI
+        fg_mask = self.background_subtractor.apply(roi_gray)
+        motion_pixels_bg = cv2.countNonZero(fg_mask[c_top:c_bottom, c_left:c_right])
+
+        # Method 2: Frame differencing against the previous small frame
+        motion_pixels_diff = 0
+        if self.previous_small_gray is not None:
+            diff = cv2.absdiff(self.previous_small_gray, roi_gray)
+            _, thresh = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+            motion_pixels_diff = cv2.countNonZero(thresh[c_top:c_bottom, c_left:c_right])
+        self.previous_small_gray = roi_gray.copy()
+
+        center_area = (c_right - c_left) * (c_bottom - c_top)
+        motion_ratio_bg = motion_pixels_bg / center_area if center_area > 0 else 0
+        motion_ratio_diff = motion_pixels_diff / center_area if center_area > 0 else 0
+        motion_detected = (motion_ratio_bg > self.motion_ratio_threshold
+                           or motion_ratio_diff > self.motion_ratio_threshold)
+
+        cost = time.perf_counter() - start
+        self.frames_processed += 1
+        self.total_cost += cost
+        self.max_cost = max(self.max_cost, cost)
+        self.last_cost = cost
+
+        return {
+            'motion_detected': motion_detected,
+            'scene_changed': scene_changed,
+            'motion_ratio_bg': motion_ratio_bg,
+            'motion_ratio_diff': motion_ratio_diff,
+            'motion_pixels_bg': motion_pixels_bg,
+            'motion_pixels_diff': motion_pixels_diff,
+            'pyramid_level': levels,
+            'cost_ms': round(cost * 1000, 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-frame cost figures."""
+        return {
+            'frames': self.frames_processed,
+            'avg_ms': round(self.total_cost / self.frames_processed * 1000, 3) if self.frames_processed else 0.0,
+            'max_ms': round(self.max_cost * 1000, 3),
+            'last_ms': round(self.last_cost * 1000, 3),
+            'pyramid_level': self._geometry[1] if self._geometry else None,
+        }
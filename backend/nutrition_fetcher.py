@@ -3,13 +3,58 @@ USDA FoodData Central API Integration
 
 This module fetches nutritional data from the USDA FoodData Central API
 to enhance sustainability scoring with real nutritional information.
+
+Search results (keyed by normalized query) and food details (keyed by fdcId)
+are kept in a persistent SQLite cache, requests go through one pooled
+keep-alive session, and details for many products are fetched with the
+multi-id POST /foods endpoint. Use get_nutrition_fetcher() to share one
+fetcher (and its pool and cache) across the process.
+
+With backend="local" (or "auto") lookups are served from an offline FDC
+snapshot built by fdc_snapshot.py, without any network access.
 """
 
 import os
+import threading
 import requests
 import json
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from fdc_snapshot import FDC_SNAPSHOT_FILE, FDCSnapshot, JSON_DATA_TYPES
+from persistent_cache import PersistentTTLCache
+from rate_limiter import get_rate_limiter
+
+# HTTP client configuration
+USDA_BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+USDA_REQUEST_TIMEOUT = 10  # Seconds per request
+USDA_MAX_RETRIES = 3  # Retries on connection errors, 429 and 5xx responses
+USDA_BACKOFF_FACTOR = 0.5  # Exponential backoff base in seconds
+USDA_POOL_SIZE = 8  # Keep-alive connections kept open to the USDA API
+USDA_BULK_MAX_IDS = 20  # fdcIds per POST /foods request (API limit)
+
+# Response cache configuration (persistent across sessions)
+USDA_CACHE_FILE = Path("usda_cache.sqlite3")
+USDA_SEARCH_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached search result is reused
+USDA_FOOD_CACHE_TTL = 30 * 24 * 3600  # Seconds cached food details are reused (FDC records rarely change)
+USDA_CACHE_MAX_ENTRIES = 5000  # LRU bound per namespace (searches, foods)
+
+# Lookup backend: "api" (live USDA API), "local" (offline FDC snapshot only)
+# or "auto" (snapshot first, live API for products the snapshot does not match)
+USDA_BACKEND = os.getenv("USDA_BACKEND", "api")
+USDA_BACKENDS = ("api", "local", "auto")
+
+API_SOURCE = "USDA FoodData Central"
+SNAPSHOT_SOURCE = "USDA FoodData Central (offline snapshot)"
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a search query (lowercase, single spaces)."""
+    return " ".join((query or "").lower().split())
 
 
 class NutritionFetcher:
@@ -18,15 +63,62 @@ class NutritionFetcher:
     and processes it for sustainability scoring.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache_file: Optional[Path] = USDA_CACHE_FILE,
+                 pool_size: int = USDA_POOL_SIZE, backend: str = USDA_BACKEND,
+                 snapshot_file: Path = FDC_SNAPSHOT_FILE):
         """
         Initialize the nutrition fetcher.
         
         Args:
             api_key: USDA FoodData Central API key (optional, uses DEMO_KEY as fallback)
+            cache_file: SQLite file for cached searches and food details (None disables caching)
+            pool_size: Keep-alive connections kept open to the USDA API
+            backend: "api", "local" or "auto" (see USDA_BACKEND)
+            snapshot_file: Offline FDC snapshot used by the local and auto backends
+        
+        Raises:
+            FileNotFoundError: If backend is "local" and the snapshot does not exist
         """
+        if backend not in USDA_BACKENDS:
+            raise ValueError(f"backend must be one of {USDA_BACKENDS}, got {backend!r}")
+        self.backend = backend
+        self.snapshot: Optional[FDCSnapshot] = None
+        if backend != "api":
+            try:
+                self.snapshot = FDCSnapshot(snapshot_file)
+                print(f"📦 Using offline FDC snapshot {snapshot_file} ({self.snapshot.food_count} foods)")
+            except FileNotFoundError:
+                if backend == "local":
+                    raise
+                print(f"⚠️ FDC snapshot {snapshot_file} not found; using the live USDA API only")
+        
         self.api_key = api_key or os.getenv('USDA_API_KEY', 'la9NWPFZF84fyiOlgbIaY1Z2vBZhIOPgvzXDbB50')
-        self.base_url = "https://api.nal.usda.gov/fdc/v1"
+        self.base_url = USDA_BASE_URL
+        self.requests_made = 0  # HTTP requests sent to the USDA API
+        
+        # Pooled keep-alive session with retry/backoff on 429/5xx
+        self.session = requests.Session()
+        retry = Retry(
+            total=USDA_MAX_RETRIES,
+            backoff_factor=USDA_BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry))
+        self.rate_limiter = get_rate_limiter("usda")  # Shared by every fetcher in the process
+        
+        # Persistent response caches (searches by normalized query, foods by fdcId)
+        self.search_cache = None
+        self.food_cache = None
+        if cache_file is not None:
+            self.search_cache = PersistentTTLCache(
+                cache_file, namespace="usda_search", ttl=USDA_SEARCH_CACHE_TTL, max_entries=USDA_CACHE_MAX_ENTRIES
+            )
+            self.food_cache = PersistentTTLCache(
+                cache_file, namespace="usda_food", ttl=USDA_FOOD_CACHE_TTL, max_entries=USDA_CACHE_MAX_ENTRIES
+            )
         
         # Nutritional components we care about for sustainability scoring
         self.nutrition_components = {
@@ -74,6 +166,19 @@ class NutritionFetcher:
                 'thresholds': [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50]  # % DV
             }
         }
+        
+        # Nutrient id -> component (each id belongs to exactly one component)
+        self._nutrient_components: Dict[int, str] = {}
+        for component, config in self.nutrition_components.items():
+            ids = config['nutrient_id'] if isinstance(config['nutrient_id'], list) else [config['nutrient_id']]
+            for nutrient_id in ids:
+                self._nutrient_components[nutrient_id] = component
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send one USDA API request through the pooled session and the shared rate limiter."""
+        with self.rate_limiter:
+            self.requests_made += 1
+            return self.session.request(method, url, timeout=USDA_REQUEST_TIMEOUT, **kwargs)
     
     def search_food(self, query: str, data_type: str = "Branded", page_size: int = 10) -> List[Dict]:
         """
@@ -87,6 +192,19 @@ class NutritionFetcher:
         Returns:
             List of food items with basic information
         """
+        if self.snapshot is not None:
+            data_types = [JSON_DATA_TYPES[data_type]] if data_type in JSON_DATA_TYPES else None
+            local_foods = self.snapshot.search(query, page_size, data_types)
+            if local_foods or self.backend == "local":
+                return [self._snapshot_food_to_search_result(food) for food in local_foods]
+        
+        cache_key = f"{data_type}|{page_size}|{normalize_query(query)}"
+        if self.search_cache is not None:
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                print(f"💾 Using cached USDA search results for: {query}")
+                return cached.value
+        
         try:
             url = f"{self.base_url}/foods/search"
             params = {
@@ -100,7 +218,7 @@ class NutritionFetcher:
             
             print(f"🔍 Searching USDA FoodData Central for: {query}")
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._request("GET", url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -108,6 +226,8 @@ class NutritionFetcher:
             
             print(f"📊 Found {len(foods)} food items from USDA FoodData Central")
             
+            if self.search_cache is not None:
+                self.search_cache.set(cache_key, foods)
             return foods
             
         except Exception as e:
@@ -124,25 +244,87 @@ class NutritionFetcher:
         Returns:
             Detailed food information with nutritional data
         """
+        if self.food_cache is not None:
+            cached = self.food_cache.get(str(fdc_id))
+            if cached is not None:
+                return cached.value
+        
         try:
             url = f"{self.base_url}/food/{fdc_id}"
             params = {'api_key': self.api_key}
             
             print(f"📋 Fetching detailed nutrition data for FDC ID: {fdc_id}")
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._request("GET", url, params=params)
             response.raise_for_status()
             
             food_data = response.json()
             
             print(f"✅ Retrieved nutrition data for: {food_data.get('description', 'Unknown')}")
             
+            if self.food_cache is not None:
+                self.food_cache.set(str(fdc_id), food_data)
             return food_data
             
         except Exception as e:
             print(f"❌ Error fetching food details: {e}")
             return None
     
+    def get_foods_details(self, fdc_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Get detailed nutritional information for many food items.
+        
+        Cached foods are served from the cache; the rest are fetched with the
+        multi-id POST /foods endpoint, USDA_BULK_MAX_IDS per request. A chunk
+        whose bulk request fails is retried one food at a time.
+        
+        Args:
+            fdc_ids: FoodData Central IDs
+            
+        Returns:
+            Dictionary mapping each found fdcId to its food data
+        """
+        details: Dict[int, Dict] = {}
+        missing: List[int] = []
+        for fdc_id in dict.fromkeys(fdc_ids):
+            cached = self.food_cache.get(str(fdc_id)) if self.food_cache is not None else None
+            if cached is not None:
+                details[fdc_id] = cached.value
+            else:
+                missing.append(fdc_id)
+        
+        for start in range(0, len(missing), USDA_BULK_MAX_IDS):
+            chunk = missing[start:start + USDA_BULK_MAX_IDS]
+            try:
+                print(f"📋 Fetching nutrition data for {len(chunk)} FDC IDs in one request")
+                response = self._request(
+                    "POST",
+                    f"{self.base_url}/foods",
+                    params={'api_key': self.api_key},
+                    json={'fdcIds': chunk, 'format': 'full'}
+                )
+                response.raise_for_status()
+                foods = response.json()
+                if not isinstance(foods, list):
+                    raise ValueError(f"Expected a list of foods, got {type(foods).__name__}")
+            except Exception as e:
+                print(f"❌ Bulk food details request failed ({e}); fetching individually")
+                for fdc_id in chunk:
+                    food_data = self.get_food_details(fdc_id)
+                    if food_data:
+                        details[fdc_id] = food_data
+                continue
+            
+            for food_data in foods:
+                fdc_id = food_data.get('fdcId') if isinstance(food_data, dict) else None
+                if fdc_id is None:
+                    continue
+                details[fdc_id] = food_data
+                if self.food_cache is not None:
+                    self.food_cache.set(str(fdc_id), food_data)
+        
+        return details
+    
     def extract_nutrition_data(self, food_data: Dict) -> Dict:
         """
         Extract relevant nutritional data from USDA food data.
@@ -186,22 +368,17 @@ class NutritionFetcher:
             # Extract nutrient values
             for nutrient in food_nutrients:
                 nutrient_info = nutrient.get('nutrient', {})
-                nutrient_id = nutrient_info.get('id')
+                component = self._nutrient_components.get(nutrient_info.get('id'))
+                if component is None:
+                    continue
                 amount = nutrient.get('amount', 0)
                 
-                # Map to our nutrition components
-                for component, config in self.nutrition_components.items():
-                    if isinstance(config['nutrient_id'], list):
-                        # Handle multiple nutrient IDs (like vitamins/minerals)
-                        if nutrient_id in config['nutrient_id']:
-                            if component not in nutrition_data:
-                                nutrition_data[component] = 0
-                            nutrition_data[component] += amount
-                    else:
-                        # Handle single nutrient ID
-                        if nutrient_id == config['nutrient_id']:
-                            nutrition_data[component] = amount
-                            break
+                if isinstance(self.nutrition_components[component]['nutrient_id'], list):
+                    # Handle multiple nutrient IDs (like vitamins/minerals)
+                    nutrition_data[component] = nutrition_data.get(component, 0) + amount
+                else:
+                    # Handle single nutrient ID
+                    nutrition_data[component] = amount
         
         # USDA data is per serving, convert to per 100g for consistent scoring
         serving_size = food_data.get('servingSize', 100)
@@ -297,6 +474,102 @@ class NutritionFetcher:
         
         return round(final_score, 1), score_breakdown
     
+    def calculate_nutrition_scores(self, nutrition_data_list: List[Dict],
+                                   include_breakdown: bool = True) -> Tuple[List[float], List[Dict]]:
+        """
+        Calculate nutrition scores for many products at once.
+        
+        Builds an N x components value matrix and scores every column with
+        np.searchsorted plus linear interpolation. Scores and breakdowns are
+        identical to calling calculate_nutrition_score on each product.
+        
+        Args:
+            nutrition_data_list: Extracted nutritional data, one dict per product
+            include_breakdown: Also build the per-product score breakdowns
+            
+        Returns:
+            Tuple of (nutrition scores, score breakdowns); breakdowns are empty
+            dicts when include_breakdown is False
+        """
+        count = len(nutrition_data_list)
+        components = list(self.nutrition_components)
+        values = np.full((count, len(components)), np.nan)
+        for row, nutrition_data in enumerate(nutrition_data_list):
+            for column, component in enumerate(components):
+                value = nutrition_data.get(component) if nutrition_data else None
+                if value is not None:
+                    values[row, column] = value
+        
+        present = ~np.isnan(values)
+        component_scores = np.zeros_like(values)
+        contributions = np.zeros_like(values)
+        positive_score = np.zeros(count)
+        negative_score = np.zeros(count)
+        max_positive = np.zeros(count)
+        max_negative = np.zeros(count)
+        
+        # Accumulate component by component, in the scalar path's order
+        for column, component in enumerate(components):
+            config = self.nutrition_components[component]
+            component_scores[:, column] = self._calculate_component_scores(values[:, column], config['thresholds'])
+            weight = config['weight']
+            counted = present[:, column] & (values[:, column] > 0)
+            score = component_scores[:, column]
+            if weight > 0:
+                contribution = np.where(counted, score * weight, 0.0)
+                positive_score = np.where(counted, positive_score + contribution, positive_score)
+                max_positive = np.where(counted, max_positive + 10 * weight, max_positive)
+            else:
+                contribution = np.where(counted, (10 - score) * abs(weight), 0.0)
+                negative_score = np.where(counted, negative_score + contribution, negative_score)
+                max_negative = np.where(counted, max_negative + 10 * abs(weight), max_negative)
+            contributions[:, column] = contribution
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            positive_contribution = np.where(max_positive > 0, (positive_score / max_positive) * 5, 2.5)
+            negative_contribution = np.where(max_negative > 0, (negative_score / max_negative) * 5, 2.5)
+        final_scores = np.clip(positive_contribution - negative_contribution + 5, 0, 10)
+        
+        scores: List[float] = []
+        breakdowns: List[Dict] = []
+        for row, nutrition_data in enumerate(nutrition_data_list):
+            if not nutrition_data:
+                scores.append(5.0)
+                breakdowns.append({"message": "No nutrition data available"})
+                continue
+            scores.append(round(float(final_scores[row]), 1))
+            if not include_breakdown:
+                breakdowns.append({})
+                continue
+            breakdowns.append({
+                component: {
+                    'value': nutrition_data[component],
+                    'score': float(component_scores[row, column]),
+                    'weight': self.nutrition_components[component]['weight'],
+                    'contribution': float(contributions[row, column])
+                }
+                for column, component in enumerate(components)
+                if present[row, column]
+            })
+        
+        print(f"📈 Scored {count} products (average {float(np.mean(scores)) if scores else 0:.1f}/10)")
+        return scores, breakdowns
+    
+    @staticmethod
+    def _calculate_component_scores(values: np.ndarray, thresholds: List[float]) -> np.ndarray:
+        """Vectorized _calculate_component_score over an array of values (NaN scores as 0)."""
+        thresholds = np.asarray(thresholds, dtype=float)
+        # First threshold >= value; 0 means at or below the lowest, len means above all
+        index = np.searchsorted(thresholds, values, side='left')
+        inner = np.clip(index, 1, len(thresholds) - 1)
+        lower = thresholds[inner - 1]
+        upper = thresholds[inner]
+        ratio = (values - lower) / (upper - lower)
+        scores = 10.0 - ((inner - 1) + ratio)
+        scores = np.where(index == 0, 10.0, scores)
+        scores = np.where(index >= len(thresholds), 0.0, scores)
+        return np.where(np.isnan(values), 0.0, scores)
+    
     def _calculate_component_score(self, value: float, thresholds: List[float]) -> float:
         """
         Calculate score based on value and thresholds.
@@ -358,6 +631,76 @@ class NutritionFetcher:
         else:
             return "medium"
     
+    def _no_data_result(self, product_name: str, message: str) -> Dict:
+        """Neutral result used when no nutrition data could be found."""
+        return {
+            "product_name": product_name,
+            "nutrition_score": 5.0,
+            "nutrition_data": {},
+            "processed_level": "medium",
+            "message": message,
+            "source": API_SOURCE
+        }
+    
+    @staticmethod
+    def _snapshot_food_to_search_result(food: Dict) -> Dict:
+        """Shape a snapshot food like an entry of the /foods/search response."""
+        return {
+            "fdcId": food["fdc_id"],
+            "description": food["description"],
+            "brandOwner": food["brand"],
+            "dataType": food["data_type"],
+            "ingredients": food["ingredients"],
+        }
+    
+    def _match_local(self, product_name: str) -> Optional[Dict]:
+        """Best offline snapshot food for a product, or None if it has no match."""
+        foods = self.snapshot.search(product_name, limit=1)
+        if not foods:
+            return None
+        food = foods[0]
+        print(f"📦 Offline FDC match for {product_name}: {food['description']} ({food['brand'] or food['data_type']})")
+        return food
+    
+    def _fetch_local(self, product_name: str) -> Optional[Dict]:
+        """Nutrition result from the offline snapshot, or None if it has no match."""
+        food = self._match_local(product_name)
+        if food is None:
+            return None
+        # Snapshot values are already per 100g
+        return self._build_result(
+            product_name, food["fdc_id"], food, nutrition_data=dict(food["per_100g"]), source=SNAPSHOT_SOURCE
+        )
+    
+    def _build_result(self, product_name: str, fdc_id: int, food_details: Dict,
+                      nutrition_data: Optional[Dict] = None, source: str = API_SOURCE,
+                      scored: Optional[Tuple[float, Dict]] = None) -> Dict:
+        """Extract (unless given), score (unless scored) and package the nutrition data of one food."""
+        if nutrition_data is None:
+            nutrition_data = self.extract_nutrition_data(food_details)
+        if scored is None:
+            scored = self.calculate_nutrition_score(nutrition_data)
+        nutrition_score, score_breakdown = scored
+        processed_level = self.get_processed_level(food_details)
+        
+        result = {
+            "product_name": product_name,
+            "fdc_id": fdc_id,
+            "description": food_details.get('description', ''),
+            "nutrition_score": nutrition_score,
+            "nutrition_data": nutrition_data,
+            "score_breakdown": score_breakdown,
+            "processed_level": processed_level,
+            "source": source,
+            "fetch_timestamp": datetime.now().isoformat()
+        }
+        
+        print(f"✅ Nutrition analysis complete: {nutrition_score}/10")
+        print(f"   Processed Level: {processed_level}")
+        print(f"   Key Nutrients: {list(nutrition_data.keys())}")
+        
+        return result
+    
     def fetch_nutrition_for_product(self, product_name: str) -> Dict:
         """
         Fetch comprehensive nutrition data for a product.
@@ -371,18 +714,18 @@ class NutritionFetcher:
         print(f"\n🥗 Fetching nutrition data for: {product_name}")
         print("=" * 60)
         
+        if self.snapshot is not None:
+            result = self._fetch_local(product_name)
+            if result is not None:
+                return result
+            if self.backend == "local":
+                return self._no_data_result(product_name, "No match in offline FDC snapshot")
+        
         # Search for the product
         foods = self.search_food(product_name)
         
         if not foods:
-            return {
-                "product_name": product_name,
-                "nutrition_score": 5.0,
-                "nutrition_data": {},
-                "processed_level": "medium",
-                "message": "No nutrition data found",
-                "source": "USDA FoodData Central"
-            }
+            return self._no_data_result(product_name, "No nutrition data found")
         
         # Get detailed data for the first result
         best_food = foods[0]
@@ -390,37 +733,131 @@ class NutritionFetcher:
         food_details = self.get_food_details(fdc_id)
         
         if not food_details:
-            return {
-                "product_name": product_name,
-                "nutrition_score": 5.0,
-                "nutrition_data": {},
-                "processed_level": "medium",
-                "message": "Could not fetch detailed nutrition data",
-                "source": "USDA FoodData Central"
-            }
+            return self._no_data_result(product_name, "Could not fetch detailed nutrition data")
         
-        # Extract and process nutrition data
-        nutrition_data = self.extract_nutrition_data(food_details)
-        nutrition_score, score_breakdown = self.calculate_nutrition_score(nutrition_data)
-        processed_level = self.get_processed_level(food_details)
+        return self._build_result(product_name, fdc_id, food_details)
+    
+    def fetch_nutrition_for_products(self, product_names: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch nutrition data for many products, batching the detail lookups.
         
-        result = {
-            "product_name": product_name,
-            "fdc_id": fdc_id,
-            "description": food_details.get('description', ''),
-            "nutrition_score": nutrition_score,
-            "nutrition_data": nutrition_data,
-            "score_breakdown": score_breakdown,
-            "processed_level": processed_level,
-            "source": "USDA FoodData Central",
-            "fetch_timestamp": datetime.now().isoformat()
-        }
+        Each product still needs a (cached) search, but the details of all
+        matched foods come from one POST /foods request per USDA_BULK_MAX_IDS
+        foods instead of one request per product, and all products are scored
+        in one calculate_nutrition_scores call.
         
-        print(f"✅ Nutrition analysis complete: {nutrition_score}/10")
-        print(f"   Processed Level: {processed_level}")
-        print(f"   Key Nutrients: {list(nutrition_data.keys())}")
+        Args:
+            product_names: Names of the products to analyze
+            
+        Returns:
+            Dictionary mapping each product name to its nutrition result
+        """
+        print(f"\n🥗 Fetching nutrition data for {len(product_names)} products")
+        print("=" * 60)
         
-        return result
+        results: Dict[str, Dict] = {}
+        matched: List[Tuple[str, int, Dict, Dict, str]] = []  # (product, fdc_id, food, nutrition data, source)
+        
+        local_foods: Dict[str, Dict] = {}
+        remaining = self._names_needing_api(product_names, local_foods)
+        for product_name, food in local_foods.items():
+            matched.append((product_name, food["fdc_id"], food, dict(food["per_100g"]), SNAPSHOT_SOURCE))
+        
+        if self.backend == "local":
+            for product_name in remaining:
+                results[product_name] = self._no_data_result(product_name, "No match in offline FDC snapshot")
+            remaining = []
+        
+        best_ids, details = self._resolve_foods(remaining) if remaining else ({}, {})
+        for product_name, fdc_id in best_ids.items():
+            if fdc_id is None:
+                results[product_name] = self._no_data_result(product_name, "No nutrition data found")
+            elif fdc_id not in details:
+                results[product_name] = self._no_data_result(product_name, "Could not fetch detailed nutrition data")
+            else:
+                food = details[fdc_id]
+                matched.append((product_name, fdc_id, food, self.extract_nutrition_data(food), API_SOURCE))
+        
+        scores, breakdowns = self.calculate_nutrition_scores([entry[3] for entry in matched])
+        for (product_name, fdc_id, food, nutrition_data, source), score, breakdown in zip(matched, scores, breakdowns):
+            results[product_name] = self._build_result(
+                product_name, fdc_id, food, nutrition_data, source, scored=(score, breakdown)
+            )
+        return results
+    
+    def _names_needing_api(self, product_names: List[str], local_foods: Optional[Dict[str, Dict]] = None) -> List[str]:
+        """Product names the offline snapshot cannot answer (all of them without a snapshot); matches go to local_foods."""
+        names = list(dict.fromkeys(product_names))
+        if self.snapshot is None:
+            return names
+        remaining = []
+        for product_name in names:
+            if local_foods is None:
+                matched = bool(self.snapshot.search(product_name, limit=1))
+            else:
+                food = self._match_local(product_name)
+                matched = food is not None
+                if matched:
+                    local_foods[product_name] = food
+            if not matched:
+                remaining.append(product_name)
+        return remaining
+    
+    def _resolve_foods(self, product_names: List[str]) -> Tuple[Dict[str, Optional[int]], Dict[int, Dict]]:
+        """Search each product and bulk-fetch the details of the best matches."""
+        best_ids: Dict[str, Optional[int]] = {}
+        for product_name in dict.fromkeys(product_names):
+            foods = self.search_food(product_name)
+            best_ids[product_name] = foods[0].get('fdcId') if foods else None
+        
+        details = self.get_foods_details(fdc_id for fdc_id in best_ids.values() if fdc_id is not None)
+        return best_ids, details
+    
+    def prefetch_products(self, product_names: List[str]) -> int:
+        """
+        Warm the caches for products that will be analyzed one by one later.
+        
+        Returns:
+            Number of products whose food details are now cached (snapshot matches need no warming)
+        """
+        remaining = self._names_needing_api(product_names)
+        if self.backend == "local" or not remaining:
+            return 0
+        _, details = self._resolve_foods(remaining)
+        return len(details)
+    
+    def stats(self) -> Dict:
+        """Return request and cache counters."""
+        return {
+            "requests_made": self.requests_made,
+            "rate_limiter": self.rate_limiter.stats(),
+            "search_cache": self.search_cache.stats() if self.search_cache is not None else None,
+            "food_cache": self.food_cache.stats() if self.food_cache is not None else None,
+            "snapshot": self.snapshot.stats() if self.snapshot is not None else None,
+        }
+    
+    def close(self):
+        """Close the HTTP session and the response caches."""
+        self.session.close()
+        for cache in (self.search_cache, self.food_cache):
+            if cache is not None:
+                cache.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+
+_fetcher_lock = threading.Lock()
+_shared_fetchers: Dict[Optional[str], NutritionFetcher] = {}
+
+
+def get_nutrition_fetcher(api_key: Optional[str] = None) -> NutritionFetcher:
+    """Return the process-wide fetcher for an API key (one pooled session and cache per key)."""
+    with _fetcher_lock:
+        fetcher = _shared_fetchers.get(api_key)
+        if fetcher is None:
+            fetcher = NutritionFetcher(api_key)
+            _shared_fetchers[api_key] = fetcher
+        return fetcher
 
 
 # Convenience function for easy use
@@ -435,8 +872,7 @@ def fetch_nutrition_data(product_name: str, api_key: Optional[str] = None) -> Di
     Returns:
         Dictionary with nutrition data and scoring
     """
-    fetcher = NutritionFetcher(api_key)
-    return fetcher.fetch_nutrition_for_product(product_name)
+    return get_nutrition_fetcher(api_key).fetch_nutrition_for_product(product_name)
 
 
 # Example usage and testing
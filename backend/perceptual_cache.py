@@ -0,0 +1,119 @@
+"""
+Perceptual Hash Cache
+
+Maps perceptual fingerprints (dHash) of the center region to classification
+results. Consecutive captures of an item held in front of the camera are
+near-identical and hash to fingerprints a few bits apart, so they can reuse
+the earlier result instead of calling Gemini again. A fingerprint with no
+close match means a genuinely new object.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def dhash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of a grayscale image.
+
+    Args:
+        gray: Grayscale image
+        hash_size: Hash grid size (hash_size**2 bits)
+
+    Returns:
+        Fingerprint as an integer
+    """
+    resized = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (resized[:, 1:] > resized[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def center_fingerprint(frame: np.ndarray, region: Tuple[int, int, int, int], hash_size: int = 8) -> Optional[int]:
+    """dHash of the (left, top, right, bottom) region of a BGR frame, or None if the region is empty."""
+    left, top, right, bottom = region
+    crop = frame[max(0, top):bottom, max(0, left):right]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return dhash(gray, hash_size)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return (a ^ b).bit_count()
+
+
+class PerceptualHashCache:
+    """
+    Bounded, TTL-limited fingerprint -> result cache with nearest-match lookup.
+    """
+
+    def __init__(self, max_distance: int = 10, ttl: float = 120.0, max_entries: int = 256):
+        """
+        Initialize the cache.
+
+        Args:
+            max_distance: Largest Hamming distance treated as the same image
+            ttl: Seconds an entry may be reused
+            max_entries: Maximum fingerprints kept (least recently used are evicted)
+        """
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[Any, float]]" = OrderedDict()  # {fingerprint: (result, stored_at)}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, fingerprint: int) -> Optional[Tuple[Any, int]]:
+        """
+        Find the closest unexpired entry within max_distance.
+
+        Returns:
+            (result, distance) or None
+        """
+        now = time.time()
+        best: Optional[Tuple[int, int]] = None  # (distance, fingerprint)
+
+        for stored, (_, stored_at) in list(self._entries.items()):
+            if now - stored_at > self.ttl:
+                del self._entries[stored]
+                continue
+            distance = hamming_distance(fingerprint, stored)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, stored)
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best[1])
+        return self._entries[best[1]][0], best[0]
+
+    def add(self, fingerprint: int, result: Any) -> None:
+        """Store a result for a fingerprint, evicting the least recently used entry if full."""
+        self._entries[fingerprint] = (result, time.time())
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
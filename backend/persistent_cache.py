@@ -0,0 +1,227 @@
+"""
+Persistent TTL Cache
+
+SQLite-backed key/value cache shared across sessions and processes. Entries
+carry a time-to-live; entries past their TTL but still inside the stale
+window are served flagged as stale so callers can refresh them in the
+background (stale-while-revalidate). The cache is bounded by evicting the
+least recently used entries, and keeps hit/miss counters for reporting.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+@dataclass
+class CacheEntry:
+    """A cached value together with its freshness information."""
+
+    key: str
+    value: Any
+    created_at: float
+    expires_at: float
+    stale: bool
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entry was written."""
+        return time.time() - self.created_at
+
+
+class PersistentTTLCache:
+    """
+    SQLite-backed cache with per-entry TTL, LRU size bound and hit/miss counters.
+    """
+
+    def __init__(self, db_path: Union[str, Path], namespace: str = "default",
+                 ttl: float = 24 * 3600, stale_ttl: float = 0.0, max_entries: int = 1000):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite database file (created if missing)
+            namespace: Logical table partition so several caches can share one file
+            ttl: Default seconds an entry stays fresh
+            stale_ttl: Extra seconds an expired entry may still be served as stale
+            max_entries: Maximum entries kept in this namespace (LRU eviction)
+        """
+        self.db_path = Path(db_path)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (namespace, last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Look up an entry.
+
+        Returns:
+            The entry (possibly flagged stale), or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value_json, created_at, expires_at = row
+            if now > expires_at + self.stale_ttl:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._conn.commit()
+
+            stale = now > expires_at
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+
+        return CacheEntry(
+            key=key,
+            value=json.loads(value_json),
+            created_at=created_at,
+            expires_at=expires_at,
+            stale=stale,
+        )
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Override for the default TTL in seconds
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), now, expires_at, now),
+            )
+            self._evict_over_limit()
+            self._conn.commit()
+
+    def set_default(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store a value only if the key is not already cached (used for warm-up entries).
+
+        Returns:
+            True if the value was written
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            self._conn.commit()
+
+    def _evict_over_limit(self) -> None:
+        """Delete least recently used entries beyond max_entries (caller holds the lock)."""
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+
+        self._conn.execute(
+            """
+            DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                SELECT key FROM cache_entries WHERE namespace = ?
+                ORDER BY last_access ASC LIMIT ?
+            )
+            """,
+            (self.namespace, self.namespace, overflow),
+        )
+        self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
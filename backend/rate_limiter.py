@@ -0,0 +1,288 @@
+"""
+Upstream Rate Limiter
+
+Token-bucket rate limits plus a concurrency cap for each upstream API the
+scorers call (Oxylabs, USDA, GNews, Gemini). Each upstream gets one shared
+limiter per process, so parallel product and category analysis cannot burst
+past an API's quota no matter how many threads are scoring at once.
+
+Usage:
+    with get_rate_limiter("gemini"):
+        response = requests.post(...)
+
+    async with get_rate_limiter("oxylabs"):  # From a coroutine; waits without blocking the loop
+        async with session.post(...) as response:
+            ...
+
+Limits can be overridden per upstream with environment variables, e.g.
+GEMINI_RATE_LIMIT=2 (requests per second), GEMINI_RATE_BURST=5 and
+GEMINI_MAX_CONCURRENT=4.
+
+Work with its own deadline (e.g. a scoring leg) can run under
+track_queue_wait(tracker): every limiter the thread passes through then
+reports its queue time to the tracker, so the deadline can exclude time
+spent waiting for a token, and abandoning the tracker makes any further
+acquire() on that thread give up instead of spending a token.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Default limits per upstream: (requests per second, burst size, max requests in flight)
+UPSTREAM_RATE_LIMITS: Dict[str, Tuple[float, int, int]] = {
+    "oxylabs": (5.0, 10, 8),  # Realtime scrapes are slow; stay within the connection pool
+    "usda": (1000 / 3600, 40, 8),  # FDC API keys allow 1000 requests per hour
+    "gnews": (1.0, 2, 2),  # GNews free plan: about one request per second
+    "gemini": (1.0, 5, 4),  # Gemini 2.0 Flash, conservative for free-tier keys
+}
+DEFAULT_RATE_LIMIT = (2.0, 5, 4)  # Limits for an upstream missing from UPSTREAM_RATE_LIMITS
+ABANDON_POLL_INTERVAL = 0.25  # Seconds between abandonment checks while a tracked thread is queued
+ASYNC_POLL_INTERVAL = 0.05  # Longest sleep of a queued coroutine before it re-checks for a free slot
+
+
+class QueueWaitAbandoned(Exception):
+    """Raised by acquire() on a thread whose QueueWaitTracker has been abandoned."""
+
+
+class QueueWaitTracker:
+    """
+    Time one unit of work has spent queued in rate limiters, readable from other threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queued = 0.0
+        self._waiting_since: Optional[float] = None
+        self._abandoned = threading.Event()
+
+    def _begin_wait(self) -> None:
+        with self._lock:
+            self._waiting_since = time.monotonic()
+
+    def _end_wait(self) -> None:
+        with self._lock:
+            if self._waiting_since is not None:
+                self._queued += time.monotonic() - self._waiting_since
+                self._waiting_since = None
+
+    @property
+    def waiting(self) -> bool:
+        """Whether the tracked thread is queued in a limiter right now."""
+        return self._waiting_since is not None
+
+    def queued_seconds(self) -> float:
+        """Total queue time so far, including a wait still in progress."""
+        with self._lock:
+            queued = self._queued
+            if self._waiting_since is not None:
+                queued += time.monotonic() - self._waiting_since
+            return queued
+
+    def abandon(self) -> None:
+        """Make further (and in-progress) acquires on the tracked thread raise QueueWaitAbandoned."""
+        self._abandoned.set()
+
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned.is_set()
+
+
+_tracking = threading.local()
+
+
+@contextmanager
+def track_queue_wait(tracker: QueueWaitTracker) -> Iterator[QueueWaitTracker]:
+    """Report limiter queue time of the current thread to tracker for the duration of the block."""
+    previous = getattr(_tracking, "tracker", None)
+    _tracking.tracker = tracker
+    try:
+        yield tracker
+    finally:
+        _tracking.tracker = previous
+
+
+def queue_wait_abandoned() -> bool:
+    """Whether the current thread runs under a tracker that has been abandoned."""
+    tracker = getattr(_tracking, "tracker", None)
+    return tracker is not None and tracker.abandoned
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket with a cap on concurrent requests.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, max_concurrent: Optional[int] = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Upstream name (used in log messages and stats)
+            rate: Tokens added per second (sustained requests per second)
+            burst: Bucket size (requests that may be sent back to back)
+            max_concurrent: Maximum requests in flight (None for no cap)
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        if max_concurrent is not None and max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+        self.requests = 0
+        self.waited_seconds = 0.0
+        self.timeouts = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a request may be sent, then take a token and an in-flight slot.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if acquired, False if the timeout expired (nothing is taken)
+
+        Raises:
+            QueueWaitAbandoned: If the thread's QueueWaitTracker was abandoned
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        tracker: Optional[QueueWaitTracker] = getattr(_tracking, "tracker", None)
+        queued = False
+
+        try:
+            with self._condition:
+                while True:
+                    if tracker is not None and tracker.abandoned:
+                        raise QueueWaitAbandoned(self.name)
+                    now = time.monotonic()
+                    self._refill(now)
+                    slot_free = self.max_concurrent is None or self._in_flight < self.max_concurrent
+                    if slot_free and self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        self._in_flight += 1
+                        self.requests += 1
+                        self.waited_seconds += now - start
+                        return True
+
+                    # Sleep until a token is due (or a slot is released, which notifies)
+                    wait = (1.0 - self._tokens) / self.rate if slot_free else None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    if tracker is not None:
+                        if not queued:
+                            tracker._begin_wait()
+                            queued = True
+                        wait = ABANDON_POLL_INTERVAL if wait is None else min(wait, ABANDON_POLL_INTERVAL)
+                    self._condition.wait(wait)
+        finally:
+            if queued:
+                tracker._end_wait()
+
+    async def acquire_async(self) -> None:
+        """
+        acquire() for coroutines: waits with asyncio.sleep instead of blocking the event loop.
+
+        Released slots only notify waiting threads, so a queued coroutine
+        re-checks at least every ASYNC_POLL_INTERVAL seconds.
+        """
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                self._refill(now)
+                slot_free = self.max_concurrent is None or self._in_flight < self.max_concurrent
+                if slot_free and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    self.requests += 1
+                    self.waited_seconds += now - start
+                    return
+                wait = (1.0 - self._tokens) / self.rate if slot_free else ASYNC_POLL_INTERVAL
+            await asyncio.sleep(min(wait, ASYNC_POLL_INTERVAL))
+
+    def release(self) -> None:
+        """Free the in-flight slot taken by acquire()."""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify()
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, float]:
+        """Return limits and usage counters."""
+        with self._condition:
+            return {
+                "rate_per_second": round(self.rate, 3),
+                "burst": self.burst,
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "requests": self.requests,
+                "waited_seconds": round(self.waited_seconds, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+def _configured_limits(name: str) -> Tuple[float, int, int]:
+    """Default limits for an upstream with environment overrides applied."""
+    rate, burst, max_concurrent = UPSTREAM_RATE_LIMITS.get(name, DEFAULT_RATE_LIMIT)
+    prefix = name.upper()
+    rate = float(os.getenv(f"{prefix}_RATE_LIMIT", rate))
+    burst = int(os.getenv(f"{prefix}_RATE_BURST", burst))
+    max_concurrent = int(os.getenv(f"{prefix}_MAX_CONCURRENT", max_concurrent))
+    return rate, burst, max_concurrent
+
+
+_limiters_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Return the process-wide limiter for an upstream ("oxylabs", "usda", "gnews", "gemini")."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate, burst, max_concurrent = _configured_limits(name)
+            limiter = RateLimiter(name, rate, burst, max_concurrent)
+            _limiters[name] = limiter
+        return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Stats of every limiter created so far, keyed by upstream name."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -5,11 +5,13 @@ Flask API server for analyzing real grocery products with sustainability scoring
 Integrates Google Shopping data via Oxylabs with comprehensive sustainability analysis.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
 import os
 from datetime import datetime
-from real_grocery_scorer_oxylabs import RealGroceryScorerOxylabs
+from real_grocery_scorer_oxylabs import AnalysisCancelled, RealGroceryScorerOxylabs
+from job_queue import JobCancelled, JobQueue
 from ray_ban_integration import RayBanAPI
 from ray_ban_routes import create_ray_ban_routes
 
@@ -27,6 +29,9 @@ grocery_scorer = RealGroceryScorerOxylabs(
     oxylabs_password=os.getenv('OXYLABS_PASSWORD')
 )
 
+# Long-running category and report analyses run as background jobs
+job_queue = JobQueue()
+
 # Initialize Ray-Bans integration
 ray_ban_api = RayBanAPI(os.getenv('ELEVENLABS_API_KEY'))
 
@@ -35,8 +40,11 @@ print("Available endpoints:")
 print("  GET  /health - Health check")
 print("  POST /grocery/search - Search for grocery products")
 print("  POST /grocery/analyze - Analyze single grocery product")
-print("  POST /grocery/category - Analyze grocery category")
-print("  POST /grocery/report - Generate comprehensive report")
+print("  POST /grocery/category - Analyze grocery category (returns a job id)")
+print("  POST /grocery/report - Generate comprehensive report (returns a job id)")
+print("  GET  /jobs/<id> - Job status, partial results and final result")
+print("  GET  /jobs/<id>/events - Job progress stream (Server-Sent Events)")
+print("  DELETE /jobs/<id> - Cancel a job")
 print("  POST /ray-ban/start-stream - Start live streaming session")
 print("  POST /ray-ban/stop-stream - Stop live streaming session")
 print("  POST /ray-ban/analyze-product - Analyze product in real-time")
@@ -66,7 +74,8 @@ def health_check():
             "USDA nutrition data",
             "News-based sustainability scoring",
             "Real grocery product analysis"
-        ]
+        ],
+        "jobs": job_queue.stats()
     })
 
 
@@ -155,13 +164,15 @@ def analyze_grocery_product():
 @app.route('/grocery/category', methods=['POST'])
 def analyze_grocery_category():
     """
-    Analyze a category of grocery products.
+    Queue the analysis of a category of grocery products.
     
     Expected JSON payload:
     {
         "category": "string",
         "num_products": int (optional, default 10)
     }
+    
+    Returns 202 with the job id; follow it via GET /jobs/<id> or /jobs/<id>/events.
     """
     try:
         data = request.get_json()
@@ -175,10 +186,18 @@ def analyze_grocery_category():
         
         num_products = data.get('num_products', 10)
         
-        # Analyze the category
-        analysis = grocery_scorer.analyze_grocery_category(category, num_products)
+        def run(job):
+            try:
+                return grocery_scorer.analyze_grocery_category(
+                    category, num_products,
+                    progress_callback=job.report_progress,
+                    cancel_event=job.cancel_event
+                )
+            except AnalysisCancelled:
+                raise JobCancelled(job.id)
         
-        return jsonify(analysis)
+        job = job_queue.submit("category", run, {"category": category, "num_products": num_products})
+        return job_accepted(job)
         
     except Exception as e:
         return jsonify({
@@ -190,13 +209,16 @@ def analyze_grocery_category():
 @app.route('/grocery/report', methods=['POST'])
 def generate_grocery_report():
     """
-    Generate a comprehensive grocery sustainability report.
+    Queue a comprehensive grocery sustainability report.
     
     Expected JSON payload:
     {
         "categories": ["string"],
         "products_per_category": int (optional, default 5)
     }
+    
+    Returns 202 with the job id. Each finished category appears under the
+    job's partial_results before the full report is done.
     """
     try:
         data = request.get_json()
@@ -210,10 +232,19 @@ def generate_grocery_report():
         
         products_per_category = data.get('products_per_category', 5)
         
-        # Generate report
-        report = grocery_scorer.generate_grocery_report(categories, products_per_category)
+        def run(job):
+            try:
+                return grocery_scorer.generate_grocery_report(
+                    categories, products_per_category,
+                    progress_callback=job.report_progress,
+                    category_callback=job.add_partial,
+                    cancel_event=job.cancel_event
+                )
+            except AnalysisCancelled:
+                raise JobCancelled(job.id)
         
-        return jsonify(report)
+        job = job_queue.submit("report", run, {"categories": categories, "products_per_category": products_per_category})
+        return job_accepted(job)
         
     except Exception as e:
         return jsonify({
@@ -222,6 +253,82 @@ def generate_grocery_report():
         }), 500
 
 
+def job_accepted(job):
+    """202 response pointing the client at a queued job."""
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "timestamp": datetime.now().isoformat()
+    }), 202
+
+
+def job_not_found(job_id):
+    return jsonify({
+        "error": f"Job {job_id} not found (unknown or expired)",
+        "timestamp": datetime.now().isoformat()
+    }), 404
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List retained jobs (newest first) without their results."""
+    return jsonify({
+        "jobs": [job.to_dict(include_result=False) for job in job_queue.list()],
+        "stats": job_queue.stats()
+    })
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, latest progress, partial results and (once finished) the result."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job (finished jobs are left unchanged)."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    return jsonify(job.to_dict(include_result=False))
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's status, progress and partial results.
+    
+    Reconnecting clients resume after the Last-Event-ID header (or ?after=N).
+    The stream ends after the job's final status event.
+    """
+    if job_queue.get(job_id) is None:
+        return job_not_found(job_id)
+    
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        after = 0
+    
+    def generate():
+        for event in job_queue.stream(job_id, after_seq=after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event.seq}\nevent: {event.type}\ndata: {json.dumps({**event.data, 'timestamp': event.timestamp})}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/grocery/quick-test', methods=['GET'])
 def quick_test():
     """
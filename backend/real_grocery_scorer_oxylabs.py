@@ -9,15 +9,30 @@ import os
 import json
 import requests
 import re
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from simple_news_scorer import SimpleNewsScorer
-from nutrition_fetcher import NutritionFetcher
+from nutrition_fetcher import get_nutrition_fetcher
 from sustainability_scorer import SustainabilityScorer
 from google_scrape import scrape_google_shopping_deals
+from rate_limiter import rate_limiter_stats
 
 # No config fallback needed - using .env file only
 
+# Parallel analysis (upstream request rates are capped separately by rate_limiter)
+CATEGORY_MAX_WORKERS = int(os.getenv("GROCERY_CATEGORY_WORKERS", "4"))  # Categories scraped and analyzed at once
+PRODUCT_MAX_WORKERS = int(os.getenv("GROCERY_PRODUCT_WORKERS", "8"))  # Products scored at once, across all categories
+LEGS_PER_PRODUCT = 4  # Concurrent network legs in SimpleNewsScorer.calculate_sustainability_score
+
+# Called with a progress event dict, e.g. {"stage": "product", "category": ..., "completed": 3, "total": 5}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class AnalysisCancelled(Exception):
+    """Raised when a category or report analysis is stopped through its cancel_event."""
+
 
 class RealGroceryScorerOxylabs:
     """
@@ -45,19 +60,27 @@ class RealGroceryScorerOxylabs:
         self.news_api_key = news_api_key or os.getenv('GNEWS_API_KEY') or os.getenv('NEWS_API_KEY')
         self.gemini_api_key = gemini_api_key or os.getenv('GEMINI_API_KEY')
         
-        # Initialize components with API keys
+        # Initialize components with API keys; the scoring-leg pool is sized so
+        # every product running in parallel can have all its legs in flight
         self.news_scorer = SimpleNewsScorer(
             news_api_key=self.news_api_key,
             usda_api_key=self.usda_api_key,
-            gemini_api_key=self.gemini_api_key
+            gemini_api_key=self.gemini_api_key,
+            max_workers=PRODUCT_MAX_WORKERS * LEGS_PER_PRODUCT
         )
-        self.nutrition_fetcher = NutritionFetcher(self.usda_api_key)
+        self.nutrition_fetcher = get_nutrition_fetcher(self.usda_api_key)  # Same instance as news_scorer's
         self.sustainability_scorer = SustainabilityScorer()
         
+        # Separate pools so category workers waiting on their products never
+        # hold the product slots they are waiting for
+        self.category_executor = ThreadPoolExecutor(max_workers=CATEGORY_MAX_WORKERS, thread_name_prefix="grocery-category")
+        self.product_executor = ThreadPoolExecutor(max_workers=PRODUCT_MAX_WORKERS, thread_name_prefix="grocery-product")
+        
         print("🛒 Real Grocery Scorer (Oxylabs) initialized")
         print(f"   Oxylabs Username: {'✅ Set' if self.oxylabs_username else '❌ Missing'}")
         print(f"   Oxylabs Password: {'✅ Set' if self.oxylabs_password else '❌ Missing'}")
         print(f"   USDA API Key: {'✅ Set' if self.usda_api_key != 'DEMO_KEY' else '⚠️  Using DEMO_KEY'}")
+        print(f"   Parallelism: {CATEGORY_MAX_WORKERS} categories, {PRODUCT_MAX_WORKERS} products at once")
     
     def scrape_grocery_products(self, query: str, num_results: int = 20) -> List[Dict[str, Any]]:
         """
@@ -149,13 +172,16 @@ class RealGroceryScorerOxylabs:
         first_word = title.split()[0] if title.split() else ""
         return first_word.lower()
     
-    def analyze_grocery_product(self, product: Dict[str, Any], use_usda_nutrition: bool = True) -> Dict[str, Any]:
+    def analyze_grocery_product(self, product: Dict[str, Any], use_usda_nutrition: bool = True,
+                                usda_nutrition_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyze a single grocery product for sustainability.
         
         Args:
             product: Product data from Google Shopping
             use_usda_nutrition: Whether to use USDA nutrition data
+            usda_nutrition_data: Nutrition result already fetched for this product
+                (fetched during scoring if omitted)
             
         Returns:
             Comprehensive sustainability analysis
@@ -175,7 +201,8 @@ class RealGroceryScorerOxylabs:
                 carbon_footprint=None,  # Will be estimated
                 nutrition_metrics=None,  # Will be fetched from USDA
                 days_back=30,
-                use_usda_nutrition=use_usda_nutrition
+                use_usda_nutrition=use_usda_nutrition,
+                usda_nutrition_data=usda_nutrition_data
             )
         except Exception as e:
             print(f"❌ Error calculating sustainability score: {e}")
@@ -208,16 +235,38 @@ class RealGroceryScorerOxylabs:
         
         return result
     
-    def analyze_grocery_category(self, category: str, num_products: int = 10) -> Dict[str, Any]:
+    @staticmethod
+    def _notify(progress_callback: Optional[ProgressCallback], event: Dict[str, Any]) -> None:
+        """Send a progress event to the callback; callback errors never abort the analysis."""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(event)
+        except Exception as e:
+            print(f"⚠️ Progress callback failed: {e}")
+    
+    def analyze_grocery_category(self, category: str, num_products: int = 10,
+                                 progress_callback: Optional[ProgressCallback] = None,
+                                 cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Analyze a category of grocery products.
         
+        Products are scored in parallel on the shared product pool, so the
+        category takes about as long as its slowest product.
+        
         Args:
             category: Grocery category (e.g., "organic fruits", "whole grain bread")
             num_products: Number of products to analyze
+            progress_callback: Optional callable receiving a {"stage": "product", ...}
+                event as each product finishes
+            cancel_event: Optional event; once set, products not yet started are
+                dropped and AnalysisCancelled is raised
             
         Returns:
             Category analysis with sustainability insights
+            
+        Raises:
+            AnalysisCancelled: If cancel_event is set before the category finishes
         """
         print(f"\n🛒 ANALYZING GROCERY CATEGORY: {category.upper()}")
         print("=" * 60)
@@ -225,6 +274,9 @@ class RealGroceryScorerOxylabs:
         # Scrape products
         products = self.scrape_grocery_products(category, num_products)
         
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelled(category)
+        
         if not products:
             return {
                 "category": category,
@@ -233,31 +285,63 @@ class RealGroceryScorerOxylabs:
                 "analysis_timestamp": datetime.now().isoformat()
             }
         
-        # Analyze each product
-        analyzed_products = []
-        total_sustainability_score = 0
-        total_news_score = 0
-        total_base_score = 0
+        selected = products[:num_products]
+        
+        # Fetch and score the whole category's nutrition at once: one bulk details
+        # request per 20 products and one vectorized scoring pass, instead of a
+        # USDA leg per product
+        titles = [product.get("title", "") for product in selected]
+        try:
+            nutrition = self.nutrition_fetcher.fetch_nutrition_for_products([title for title in titles if title])
+        except Exception as e:
+            print(f"⚠️ Batch nutrition fetch failed, scoring products individually: {e}")
+            nutrition = {}
+        
+        # Analyze the products in parallel
+        futures = {
+            self.product_executor.submit(self.analyze_grocery_product, product, True, nutrition.get(title)): index
+            for index, (product, title) in enumerate(zip(selected, titles))
+        }
+        results: Dict[int, Dict[str, Any]] = {}
+        completed = 0
         
-        for i, product in enumerate(products[:num_products]):
-            print(f"\n--- Product {i+1}/{min(len(products), num_products)} ---")
+        for future in as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise AnalysisCancelled(category)
+            
+            index = futures[future]
+            completed += 1
+            print(f"\n--- {category}: product {completed}/{len(selected)} done ---")
             
             try:
-                analysis = self.analyze_grocery_product(product)
-                analyzed_products.append(analysis)
-                
-                # Accumulate scores
-                sus_score = analysis["sustainability_analysis"].get("sustainability_score", 5.0)
-                news_score = analysis["sustainability_analysis"].get("news_score", 5.0)
-                base_score = analysis["sustainability_analysis"].get("base_score", 5.0)
-                
-                total_sustainability_score += sus_score
-                total_news_score += news_score
-                total_base_score += base_score
-                
+                results[index] = future.result()
+                status = "ok"
             except Exception as e:
                 print(f"❌ Error analyzing product: {e}")
-                continue
+                status = "error"
+            
+            self._notify(progress_callback, {
+                "stage": "product",
+                "category": category,
+                "title": selected[index].get("title", ""),
+                "status": status,
+                "completed": completed,
+                "total": len(selected)
+            })
+        
+        # Keep the scraped order so reports are stable across runs
+        analyzed_products = [results[index] for index in sorted(results)]
+        
+        # Accumulate scores
+        total_sustainability_score = 0
+        total_news_score = 0
+        total_base_score = 0
+        for analysis in analyzed_products:
+            total_sustainability_score += analysis["sustainability_analysis"].get("sustainability_score", 5.0)
+            total_news_score += analysis["sustainability_analysis"].get("news_score", 5.0)
+            total_base_score += analysis["sustainability_analysis"].get("base_score", 5.0)
         
         # Calculate category averages
         num_analyzed = len(analyzed_products)
@@ -302,16 +386,92 @@ class RealGroceryScorerOxylabs:
         
         return insights
     
-    def generate_grocery_report(self, categories: List[str], products_per_category: int = 5) -> Dict[str, Any]:
+    def iter_category_analyses(self, categories: List[str], products_per_category: int = 5,
+                               progress_callback: Optional[ProgressCallback] = None,
+                               cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Analyze categories in parallel, yielding each one as soon as it finishes.
+        
+        Abandoning the iterator cancels the categories that have not started yet.
+        
+        Args:
+            categories: Grocery categories to analyze (duplicates are analyzed once)
+            products_per_category: Number of products per category
+            progress_callback: Optional callable receiving product events and a
+                {"stage": "category", ...} event per finished category
+            cancel_event: Optional event; once set, no further categories or
+                products are started and AnalysisCancelled is raised
+            
+        Yields:
+            (category, category analysis) pairs in completion order
+            
+        Raises:
+            AnalysisCancelled: If cancel_event is set before every category finishes
+        """
+        unique_categories = list(dict.fromkeys(categories))
+        futures = {
+            self.category_executor.submit(
+                self.analyze_grocery_category, category, products_per_category, progress_callback, cancel_event
+            ): category
+            for category in unique_categories
+        }
+        completed = 0
+        
+        try:
+            for future in as_completed(futures):
+                category = futures[future]
+                completed += 1
+                try:
+                    analysis = future.result()
+                except AnalysisCancelled:
+                    raise
+                except Exception as e:
+                    print(f"❌ Error analyzing category {category}: {e}")
+                    analysis = {
+                        "category": category,
+                        "error": str(e),
+                        "products_analyzed": 0,
+                        "analysis_timestamp": datetime.now().isoformat()
+                    }
+                
+                print(f"✅ Category {completed}/{len(unique_categories)} done: {category}")
+                self._notify(progress_callback, {
+                    "stage": "category",
+                    "category": category,
+                    "status": "error" if "error" in analysis else "ok",
+                    "products_analyzed": analysis.get("products_analyzed", 0),
+                    "completed": completed,
+                    "total": len(unique_categories)
+                })
+                yield category, analysis
+                if cancel_event is not None and cancel_event.is_set():
+                    raise AnalysisCancelled("report")
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def generate_grocery_report(self, categories: List[str], products_per_category: int = 5,
+                                progress_callback: Optional[ProgressCallback] = None,
+                                category_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                                cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Generate a comprehensive grocery sustainability report.
         
+        Categories (and the products within them) are analyzed in parallel.
+        
         Args:
             categories: List of grocery categories to analyze
             products_per_category: Number of products per category
+            progress_callback: Optional callable receiving product and category progress events
+            category_callback: Optional callable receiving (category, analysis) as
+                each category finishes, for streaming partial results
+            cancel_event: Optional event that stops the report (see iter_category_analyses)
             
         Returns:
             Comprehensive grocery sustainability report
+            
+        Raises:
+            AnalysisCancelled: If cancel_event is set before the report finishes
         """
         print(f"\n📊 GENERATING GROCERY SUSTAINABILITY REPORT")
         print("=" * 70)
@@ -319,9 +479,10 @@ class RealGroceryScorerOxylabs:
         print(f"Products per category: {products_per_category}")
         print("=" * 70)
         
+        started_at = datetime.now()
         report = {
             "report_metadata": {
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": started_at.isoformat(),
                 "categories_analyzed": categories,
                 "products_per_category": products_per_category,
                 "total_categories": len(categories),
@@ -331,13 +492,21 @@ class RealGroceryScorerOxylabs:
             "overall_insights": {}
         }
         
+        finished: Dict[str, Dict[str, Any]] = {}
+        for category, category_analysis in self.iter_category_analyses(categories, products_per_category,
+                                                                       progress_callback, cancel_event):
+            finished[category] = category_analysis
+            if category_callback is not None:
+                try:
+                    category_callback(category, category_analysis)
+                except Exception as e:
+                    print(f"⚠️ Category callback failed: {e}")
+        
+        # Report categories in the requested order, not completion order
         all_scores = []
         category_summaries = []
-        
-        # Analyze each category
-        for category in categories:
-            print(f"\n🛒 Analyzing category: {category}")
-            category_analysis = self.analyze_grocery_category(category, products_per_category)
+        for category in dict.fromkeys(categories):
+            category_analysis = finished[category]
             report["category_analyses"][category] = category_analysis
             
             if "average_sustainability_score" in category_analysis:
@@ -358,6 +527,9 @@ class RealGroceryScorerOxylabs:
                 "category_rankings": sorted(category_summaries, key=lambda x: x["average_score"], reverse=True)
             }
         
+        report["report_metadata"]["duration_seconds"] = round((datetime.now() - started_at).total_seconds(), 2)
+        report["report_metadata"]["rate_limits"] = rate_limiter_stats()
+        report["report_metadata"]["brand_memo"] = self.news_scorer.brand_memo.stats()
         return report
 
 
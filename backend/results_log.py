@@ -0,0 +1,234 @@
+"""
+Results Event Log
+
+Append-only JSON-lines log of classification and deal analysis events. The
+classifier buffers events in memory and appends only the new ones on each
+flush, while results.json holds a small snapshot of the cart state. Flush cost
+therefore grows with the number of new events, not with the session length.
+
+The reader API (`load_results_view`) rebuilds the full view of a session,
+including the classification history, from the snapshot and the log.
+`ResultsLog.compact` drops old sessions and truncated lines from the log.
+
+Usage:
+    python results_log.py                 # Print a summary of the latest session
+    python results_log.py export out.json # Write the full view of the latest session
+    python results_log.py compact         # Compact the event log
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# Event kinds written by the classifier
+CLASSIFICATION_EVENT = "classification"
+DEAL_ANALYSIS_EVENT = "deal_analysis"
+
+# Number of sessions kept in the event log when compacting
+DEFAULT_KEEP_SESSIONS = 5
+
+
+def default_log_path(results_file: Union[str, Path]) -> Path:
+    """Event log path that belongs to a results snapshot (results.json -> results.events.jsonl)."""
+    results_path = Path(results_file)
+    return results_path.with_name(f"{results_path.stem}.events.jsonl")
+
+
+def write_json_atomic(path: Union[str, Path], data: Dict[str, Any], indent: Optional[int] = None) -> None:
+    """Write JSON to a temporary file and move it into place so readers never see a partial file."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class ResultsLog:
+    """
+    Buffered writer for the append-only results event log.
+    """
+
+    def __init__(self, results_file: Union[str, Path], log_file: Optional[Union[str, Path]] = None,
+                 session_id: Optional[str] = None):
+        """
+        Initialize the log.
+
+        Args:
+            results_file: Snapshot file the log belongs to
+            log_file: Event log path (defaults to <results stem>.events.jsonl)
+            session_id: Identifier stamped on every event (generated if omitted)
+        """
+        self.results_file = Path(results_file)
+        self.log_file = Path(log_file) if log_file else default_log_path(self.results_file)
+        self.session_id = session_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.events_written = 0
+        self._sequence = 0
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+
+    def append(self, kind: str, record: Dict[str, Any]) -> None:
+        """
+        Buffer an event; it is serialized now and written on the next flush.
+
+        Args:
+            kind: Event kind (CLASSIFICATION_EVENT or DEAL_ANALYSIS_EVENT)
+            record: JSON-serializable event payload
+        """
+        with self._lock:
+            self._sequence += 1
+            event = {
+                "session": self.session_id,
+                "seq": self._sequence,
+                "kind": kind,
+                "record": record,
+            }
+            self._pending.append(json.dumps(event, ensure_ascii=False))
+
+    def flush(self) -> int:
+        """
+        Append buffered events to the log file.
+
+        Returns:
+            Number of events written
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            lines, self._pending = self._pending, []
+
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        self.events_written += len(lines)
+        return len(lines)
+
+    def write_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Write the compact results snapshot, tagged with this session and its log file."""
+        snapshot = dict(snapshot)
+        snapshot["session_id"] = self.session_id
+        snapshot["event_log"] = self.log_file.name
+        write_json_atomic(self.results_file, snapshot)
+
+    def compact(self, keep_sessions: int = DEFAULT_KEEP_SESSIONS) -> Dict[str, int]:
+        """
+        Rewrite the log keeping only the most recent sessions and dropping truncated lines.
+
+        Args:
+            keep_sessions: Number of most recent sessions to keep
+
+        Returns:
+            Counts of kept and dropped events
+        """
+        self.flush()
+        if not self.log_file.exists():
+            return {"kept": 0, "dropped": 0}
+
+        events = list(read_events(self.log_file))
+        sessions: List[str] = []
+        for event in events:
+            if event["session"] not in sessions:
+                sessions.append(event["session"])
+        kept_sessions = set(sessions[-keep_sessions:]) if keep_sessions > 0 else set()
+        kept_sessions.add(self.session_id)
+
+        kept = [event for event in events if event["session"] in kept_sessions]
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            total_lines = sum(1 for line in f if line.strip())
+
+        tmp_path = self.log_file.with_name(f".{self.log_file.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for event in kept:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.log_file)
+
+        return {"kept": len(kept), "dropped": total_lines - len(kept)}
+
+
+def read_events(log_file: Union[str, Path], session: Optional[str] = None,
+                kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over events in the log, skipping lines truncated by an interrupted write.
+
+    Args:
+        log_file: Event log path
+        session: Only yield events from this session
+        kind: Only yield events of this kind
+    """
+    log_path = Path(log_file)
+    if not log_path.exists():
+        return
+
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if session is not None and event.get("session") != session:
+                continue
+            if kind is not None and event.get("kind") != kind:
+                continue
+            yield event
+
+
+def load_results_view(results_file: Union[str, Path] = "results.json", log_file: Optional[Union[str, Path]] = None,
+                      session: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Rebuild the full results view (snapshot plus event history) of a session.
+
+    Args:
+        results_file: Snapshot file written by the classifier
+        log_file: Event log path (defaults to the one recorded in the snapshot)
+        session: Session to rebuild (defaults to the snapshot's session)
+
+    Returns:
+        Snapshot fields plus "all_classifications" and "deal_analysis_results"
+    """
+    results_path = Path(results_file)
+    view: Dict[str, Any] = {}
+    if results_path.exists():
+        with open(results_path, 'r', encoding='utf-8') as f:
+            view = json.load(f)
+
+    if log_file is None:
+        log_file = results_path.with_name(view["event_log"]) if view.get("event_log") else default_log_path(results_path)
+    session = session or view.get("session_id")
+
+    view["all_classifications"] = []
+    view["deal_analysis_results"] = []
+    for event in read_events(log_file, session=session):
+        if event["kind"] == CLASSIFICATION_EVENT:
+            view["all_classifications"].append(event["record"])
+        elif event["kind"] == DEAL_ANALYSIS_EVENT:
+            view["deal_analysis_results"].append(event["record"])
+
+    return view
+
+
+if __name__ == "__main__":
+    import sys
+
+    results_path = Path("results.json")
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+
+    if command == "export":
+        output_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("results.full.json")
+        write_json_atomic(output_path, load_results_view(results_path), indent=2)
+        print(f"📄 Full results written to {output_path}")
+    elif command == "compact":
+        log = ResultsLog(results_path)
+        counts = log.compact()
+        print(f"🗜️  Compacted {log.log_file}: kept {counts['kept']} events, dropped {counts['dropped']}")
+    else:
+        view = load_results_view(results_path)
+        print(f"Session: {view.get('session_id', 'unknown')}")
+        print(f"Classifications: {len(view['all_classifications'])}")
+        print(f"Deal analyses: {len(view['deal_analysis_results'])}")
+        print(f"Cart items: {len(view.get('shopping_cart', {}))}")
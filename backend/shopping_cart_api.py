@@ -1,11 +1,16 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import json
 import os
 import base64
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from cart_state import cart_store
+from thumbnails import DEFAULT_THUMBNAIL_WIDTH, MEDIA_TYPES, PIL_AVAILABLE, get_thumbnail, image_etag, pick_format, snap_width
 
 app = FastAPI(title="Shopping Cart API", description="API to retrieve shopping cart data and images")
 
@@ -23,17 +28,110 @@ BASE_DIR = Path(__file__).parent
 RESULTS_FILE = BASE_DIR / "results.json"
 CAPTURES_DIR = BASE_DIR / "captures"
 
+# Server-Sent Events settings
+STREAM_WAIT_TIMEOUT = 1.0  # Seconds to wait for a cart change before re-checking results.json
+STREAM_KEEPALIVE_INTERVAL = 15.0  # Seconds between keep-alive comments on idle streams
 
-def load_results() -> Dict[str, Any]:
-    """Load and parse the results.json file."""
-    if not RESULTS_FILE.exists():
-        raise HTTPException(status_code=404, detail="results.json not found")
-    
+
+def sync_cart_store() -> None:
+    """Make sure the cart store holds data, reloading results.json only when it changed on disk."""
     try:
-        with open(RESULTS_FILE, 'r') as f:
-            return json.load(f)
+        has_data = cart_store.refresh_from_file(RESULTS_FILE)
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Invalid JSON in results.json")
+    
+    if not has_data:
+        raise HTTPException(status_code=404, detail="results.json not found")
+
+
+def load_results() -> Dict[str, Any]:
+    """Return the current cart state (live from the classifier or loaded from results.json)."""
+    sync_cart_store()
+    _, data = cart_store.snapshot()
+    return data
+
+
+def cart_response(request: Request, build: Callable[[Dict[str, Any]], Dict[str, Any]],
+                  variant: Optional[str] = None) -> Response:
+    """
+    Serve a view of the cart state with ETag revalidation.
+    
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        build: Function turning the cart state into the response payload
+        variant: Request-dependent part of the payload (e.g. image width and format),
+            folded into the ETag; the response also varies on Accept
+    
+    Returns:
+        304 Not Modified if the client already has this version, otherwise the
+        JSON payload with the cart version added
+    """
+    sync_cart_store()
+    version, data = cart_store.snapshot()
+    etag = cart_store.etag
+    headers = {"Cache-Control": "no-cache", "X-Cart-Version": str(version)}
+    if variant is not None:
+        etag = f'{etag[:-1]}-{variant}"'
+        headers["Vary"] = "Accept"
+    headers["ETag"] = etag
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    payload = build(data)
+    payload["version"] = version
+    return JSONResponse(payload, headers=headers)
+
+
+def add_image_url(item_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a cart item and add its /image URLs when it has a captured image."""
+    item_copy = item_data.copy()
+    image_path = item_data.get("image_path")
+    if image_path:
+        # Get the filename (e.g., "20251005-032746_motion_0.80.jpg")
+        filename = Path(image_path).name
+        item_copy["image_url"] = f"/image/{filename}"
+        item_copy["thumbnail_url"] = f"/image/{filename}?w={DEFAULT_THUMBNAIL_WIDTH}"
+    return item_copy
+
+
+def resolve_capture(image_name: str) -> Path:
+    """Validate an image name and return its path inside the captures directory."""
+    # Security: Prevent path traversal attacks
+    if ".." in image_name or "/" in image_name or "\\" in image_name:
+        raise HTTPException(status_code=400, detail="Invalid image name")
+    
+    image_path = CAPTURES_DIR / image_name
+    
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail=f"Image {image_name} not found")
+    
+    if not image_path.is_file():
+        raise HTTPException(status_code=400, detail="Invalid image path")
+    
+    return image_path
+
+
+def select_image_variant(image_path: Path, width: Optional[int], accept: Optional[str]) -> Tuple[Path, str, str]:
+    """
+    Pick the file to serve for an image request.
+    
+    Args:
+        image_path: Full-resolution capture
+        width: Requested width, or None/0 for the original
+        accept: Client Accept header (WebP is used when accepted)
+    
+    Returns:
+        (file path, media type, ETag)
+    """
+    if width and PIL_AVAILABLE:
+        fmt = pick_format(accept)
+        bucket = snap_width(width)
+        thumb = get_thumbnail(image_path, bucket, fmt)
+        if thumb is not None:
+            return thumb, MEDIA_TYPES[fmt], image_etag(image_path, bucket, fmt)
+    
+    return image_path, "image/jpeg", image_etag(image_path)
 
 
 @app.get("/")
@@ -44,7 +142,9 @@ async def root():
         "endpoints": {
             "/shopping-cart": "Get shopping cart data with image paths",
             "/shopping-cart/with-urls": "Get shopping cart data with full image URLs",
-            "/image/{image_name}": "Get a specific image by name",
+            "/shopping-cart/changes?since={version}": "Get cart items changed since a version",
+            "/shopping-cart/stream": "Server-Sent Events stream of cart changes",
+            "/image/{image_name}?w={width}": "Get a specific image by name, optionally as a resized thumbnail",
             "/cart-summary": "Get cart summary information",
             "/all-items": "Get all items with image URLs",
             "/all-items-with-images": "Get all items with embedded base64 images (for frontend)"
@@ -53,107 +153,156 @@ async def root():
 
 
 @app.get("/shopping-cart")
-async def get_shopping_cart():
+async def get_shopping_cart(request: Request):
     """
-    Get the shopping cart data from results.json.
+    Get the shopping cart data from the cart store.
     Returns the shopping_cart object with image paths.
     """
-    data = load_results()
-    return {
+    return cart_response(request, lambda data: {
         "shopping_cart": data.get("shopping_cart", {}),
         "cart_summary": data.get("cart_summary", {}),
         "timestamp": data.get("timestamp", "")
-    }
+    })
 
 
 @app.get("/shopping-cart/with-urls")
-async def get_shopping_cart_with_urls():
+async def get_shopping_cart_with_urls(request: Request):
     """
     Get the shopping cart data with full image URLs.
     Constructs image URLs that can be accessed via the /image endpoint.
     """
-    data = load_results()
-    shopping_cart = data.get("shopping_cart", {})
-    
-    # Add full image URLs to each item
-    cart_with_urls = {}
-    for item_key, item_data in shopping_cart.items():
-        item_copy = item_data.copy()
-        if "image_path" in item_data:
-            # Extract just the filename from the path
-            image_path = item_data["image_path"]
-            if image_path:
-                # Get the filename (e.g., "20251005-032746_motion_0.80.jpg")
-                filename = Path(image_path).name
-                item_copy["image_url"] = f"/image/{filename}"
-        cart_with_urls[item_key] = item_copy
-    
-    return {
-        "shopping_cart": cart_with_urls,
+    return cart_response(request, lambda data: {
+        "shopping_cart": {
+            item_key: add_image_url(item_data)
+            for item_key, item_data in data.get("shopping_cart", {}).items()
+        },
         "cart_summary": data.get("cart_summary", {}),
         "timestamp": data.get("timestamp", "")
-    }
+    })
+
+
+@app.get("/shopping-cart/changes")
+async def get_shopping_cart_changes(since: int = 0):
+    """
+    Get the cart items that changed after a given version.
+    
+    Args:
+        since: Last version the client has seen (0 for everything)
+    
+    Returns:
+        Changed items (with image URLs), removed item keys and the current summary.
+        "full" is true when the version is unknown and the whole cart is returned.
+    """
+    sync_cart_store()
+    delta = cart_store.changes_since(since)
+    delta["changed"] = {key: add_image_url(item) for key, item in delta["changed"].items()}
+    return delta
+
+
+@app.get("/shopping-cart/stream")
+async def stream_shopping_cart(request: Request, since: Optional[int] = None):
+    """
+    Stream cart changes as Server-Sent Events.
+    
+    Each "cart" event carries the same payload as /shopping-cart/changes and uses
+    the cart version as its event id, so reconnecting clients resume via Last-Event-ID.
+    """
+    sync_cart_store()
+    last_event_id = request.headers.get("last-event-id")
+    if since is None:
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    async def event_stream():
+        version = since
+        idle = 0.0
+        yield "retry: 2000\n\n"
+        while not await request.is_disconnected():
+            if cart_store.version > version:
+                delta = cart_store.changes_since(version)
+                delta["changed"] = {key: add_image_url(item) for key, item in delta["changed"].items()}
+                version = delta["version"]
+                idle = 0.0
+                yield f"id: {version}\nevent: cart\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+                continue
+            
+            changed = await cart_store.wait_for_change_async(version, STREAM_WAIT_TIMEOUT)
+            if not changed:
+                # Another process may be writing results.json
+                try:
+                    cart_store.refresh_from_file(RESULTS_FILE)
+                except (json.JSONDecodeError, OSError):
+                    pass
+                idle += STREAM_WAIT_TIMEOUT
+                if idle >= STREAM_KEEPALIVE_INTERVAL:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/image/{image_name}")
-async def get_image(image_name: str):
+async def get_image(image_name: str, request: Request, w: Optional[int] = None):
     """
     Serve an image from the captures directory.
     
     Args:
         image_name: Name of the image file (e.g., "20251005-032746_motion_0.80.jpg")
+        w: Optional width; returns a cached resized variant (WebP if accepted, JPEG otherwise)
     
     Returns:
-        The image file
+        The image file (Range requests supported), or 304 if the client's ETag matches
     """
-    # Security: Prevent path traversal attacks
-    if ".." in image_name or "/" in image_name or "\\" in image_name:
-        raise HTTPException(status_code=400, detail="Invalid image name")
+    image_path = resolve_capture(image_name)
     
-    image_path = CAPTURES_DIR / image_name
-    
-    if not image_path.exists():
-        raise HTTPException(status_code=404, detail=f"Image {image_name} not found")
+    try:
+        file_path, media_type, etag = await asyncio.to_thread(
+            select_image_variant, image_path, w, request.headers.get("accept")
+        )
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not read image {image_name}: {e}")
     
-    if not image_path.is_file():
-        raise HTTPException(status_code=400, detail="Invalid image path")
+    headers = {"Cache-Control": "public, max-age=3600", "ETag": etag, "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    return FileResponse(
-        image_path,
-        media_type="image/jpeg",
-        headers={"Cache-Control": "public, max-age=3600"}
-    )
+    return FileResponse(file_path, media_type=media_type, headers=headers)
 
 
 @app.get("/cart-summary")
-async def get_cart_summary():
+async def get_cart_summary(request: Request):
     """Get just the cart summary information."""
-    data = load_results()
-    return {
+    return cart_response(request, lambda data: {
         "cart_summary": data.get("cart_summary", {}),
         "timestamp": data.get("timestamp", ""),
         "total_frames_processed": data.get("total_frames_processed", 0),
         "bag_detected": data.get("bag_detected", False)
-    }
+    })
 
 
 @app.get("/deal-analysis")
-async def get_deal_analysis():
+async def get_deal_analysis(request: Request):
     """Get deal analysis information from the shopping cart."""
-    data = load_results()
-    return {
+    return cart_response(request, lambda data: {
         "deal_analysis_cache": data.get("deal_analysis_cache", {}),
         "deal_analysis_summary": data.get("deal_analysis_summary", {})
-    }
+    })
 
 
 @app.get("/all-items")
-async def get_all_items_with_images():
+async def get_all_items_with_images(request: Request):
     """
     Get all shopping cart items with their complete information and image URLs.
     This is a comprehensive endpoint that includes everything you might need.
     """
-    data = load_results()
+    return cart_response(request, build_all_items)
+
+
+def build_all_items(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the /all-items payload from the cart state."""
     shopping_cart = data.get("shopping_cart", {})
     
     items = []
@@ -174,6 +323,7 @@ async def get_all_items_with_images():
         if "image_path" in item_data and item_data["image_path"]:
             filename = Path(item_data["image_path"]).name
             item["image_url"] = f"/image/{filename}"
+            item["thumbnail_url"] = f"/image/{filename}?w={DEFAULT_THUMBNAIL_WIDTH}"
             item["image_path"] = item_data["image_path"]
         
         items.append(item)
@@ -186,16 +336,29 @@ async def get_all_items_with_images():
 
 
 @app.get("/all-items-with-images")
-async def get_all_items_with_embedded_images():
+async def get_all_items_with_embedded_images(request: Request, w: int = DEFAULT_THUMBNAIL_WIDTH):
     """
     Get all shopping cart items with images embedded as base64 data.
     This endpoint includes the actual image data in the JSON response,
     allowing the frontend to display images without additional requests.
     
+    Images are embedded as thumbnails of width `w` (default 320); pass w=0
+    for the full-resolution captures.
+    
     Note: This response can be large. For better performance, use /all-items
     with the /image/{name} endpoint instead.
     """
-    data = load_results()
+    accept = request.headers.get("accept")
+    # The embedded images depend on the width bucket and the Accept-negotiated format
+    variant = f"{snap_width(w)}-{pick_format(accept)}" if w and PIL_AVAILABLE else "original"
+    return await asyncio.to_thread(
+        cart_response, request, lambda data: build_all_items_with_embedded_images(data, w, accept), variant
+    )
+
+
+def build_all_items_with_embedded_images(data: Dict[str, Any], width: int = 0,
+                                         accept: Optional[str] = None) -> Dict[str, Any]:
+    """Build the /all-items-with-images payload from the cart state."""
     shopping_cart = data.get("shopping_cart", {})
     
     items = []
@@ -217,9 +380,10 @@ async def get_all_items_with_embedded_images():
             image_path = BASE_DIR / item_data["image_path"]
             if image_path.exists():
                 try:
-                    with open(image_path, "rb") as img_file:
+                    file_path, media_type, _ = select_image_variant(image_path, width, accept)
+                    with open(file_path, "rb") as img_file:
                         image_data = base64.b64encode(img_file.read()).decode('utf-8')
-                        item["image_base64"] = f"data:image/jpeg;base64,{image_data}"
+                        item["image_base64"] = f"data:{media_type};base64,{image_data}"
                         item["image_path"] = item_data["image_path"]
                 except Exception as e:
                     item["image_error"] = str(e)
@@ -233,6 +397,22 @@ async def get_all_items_with_embedded_images():
     }
 
 
+def start_api_server(host: str = "0.0.0.0", port: int = 8000) -> threading.Thread:
+    """
+    Run the API on a daemon thread inside the current process.
+    
+    Used by the classifier (--serve-api) so endpoints read the live cart store
+    instead of polling results.json.
+    """
+    import uvicorn
+    
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="shopping-cart-api", daemon=True)
+    thread.start()
+    print(f"🛒 Shopping Cart API serving live cart on http://{host}:{port}")
+    return thread
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -243,7 +423,9 @@ if __name__ == "__main__":
     print("  - http://localhost:8000/                         - API documentation")
     print("  - http://localhost:8000/shopping-cart            - Get shopping cart data")
     print("  - http://localhost:8000/shopping-cart/with-urls  - Cart with image URLs")
-    print("  - http://localhost:8000/image/{name}             - Get specific image")
+    print("  - http://localhost:8000/shopping-cart/changes    - Cart changes since ?since=version")
+    print("  - http://localhost:8000/shopping-cart/stream     - Live cart updates (Server-Sent Events)")
+    print("  - http://localhost:8000/image/{name}?w=320       - Get specific image (optionally resized)")
     print("  - http://localhost:8000/cart-summary             - Get cart summary")
     print("  - http://localhost:8000/deal-analysis            - Get deal analysis")
     print("  - http://localhost:8000/all-items                - Get all items with URLs")
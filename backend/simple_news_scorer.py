@@ -7,11 +7,32 @@ then calculating sustainability scores based on the news analysis.
 
 import os
 import json
+import hashlib
+import time
 import requests
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sustainability_scorer import SustainabilityScorer
-from nutrition_fetcher import NutritionFetcher
+from nutrition_fetcher import get_nutrition_fetcher
+from rate_limiter import QueueWaitTracker, get_rate_limiter, queue_wait_abandoned, track_queue_wait
+from brand_memo import get_brand_memo
+
+
+# Seconds each network leg of calculate_sustainability_score may take before
+# its neutral fallback is used (news_sentiment is timed from when news arrives).
+# Time a leg spends queued in the upstream rate limiters does not count.
+SCORING_LEG_TIMEOUTS = {
+    'usda': 25.0,
+    'news': 15.0,
+    'ethics': 35.0,
+    'news_sentiment': 35.0,
+}
+SCORING_MAX_QUEUE_SECONDS = 120.0  # Rate-limiter queue time after which a leg gives up anyway
+LEG_POLL_INTERVAL = 0.5  # Seconds between deadline re-checks while a leg is queued
+
+# Worker threads used to run the independent legs concurrently
+SCORING_MAX_WORKERS = 8
 
 
 class SimpleNewsScorer:
@@ -23,7 +44,8 @@ class SimpleNewsScorer:
     4. Calculates a sustainability score
     """
     
-    def __init__(self, news_api_key: Optional[str] = None, usda_api_key: Optional[str] = None, gemini_api_key: Optional[str] = None):
+    def __init__(self, news_api_key: Optional[str] = None, usda_api_key: Optional[str] = None, gemini_api_key: Optional[str] = None,
+                 max_workers: int = SCORING_MAX_WORKERS):
         """
         Initialize the simple news scorer.
         
@@ -31,6 +53,7 @@ class SimpleNewsScorer:
             news_api_key: News API key (optional, uses Google News RSS as fallback)
             usda_api_key: USDA FoodData Central API key (optional, uses DEMO_KEY as fallback)
             gemini_api_key: Google Gemini API key for AI analysis
+            max_workers: Threads used to run the scoring legs concurrently
         """
         self.news_api_key = news_api_key or os.getenv('GNEWS_API_KEY') 
         self.gemini_api_key = gemini_api_key or os.getenv('GEMINI_API_KEY')
@@ -41,8 +64,14 @@ class SimpleNewsScorer:
         # Initialize base sustainability scorer
         self.sustainability_scorer = SustainabilityScorer()
         
-        # Initialize nutrition fetcher
-        self.nutrition_fetcher = NutritionFetcher(usda_api_key)
+        # Shared nutrition fetcher (pooled session and persistent response cache)
+        self.nutrition_fetcher = get_nutrition_fetcher(usda_api_key)
+        
+        # Brand research (news, sentiment, ethics) shared across SKUs and restarts
+        self.brand_memo = get_brand_memo()
+        
+        # Shared pool for the concurrent scoring legs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring-leg")
         
         # Sustainability keywords for news filtering
         self.sustainability_keywords = [
@@ -131,7 +160,8 @@ class SimpleNewsScorer:
                 'token': self.news_api_key
             }
             
-            response = requests.get(self.news_base_url, params=params, timeout=10)
+            with get_rate_limiter("gnews"):
+                response = requests.get(self.news_base_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -290,12 +320,13 @@ class SimpleNewsScorer:
                 }]
             }
             
-            response = requests.post(
-                f"{self.gemini_api_url}?key={self.gemini_api_key}",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+            with get_rate_limiter("gemini"):
+                response = requests.post(
+                    f"{self.gemini_api_url}?key={self.gemini_api_key}",
+                    headers=headers,
+                    json=data,
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -540,7 +571,8 @@ class SimpleNewsScorer:
                 }
             }
             
-            response = requests.post(self.gemini_api_url, headers=headers, json=payload, timeout=30)
+            with get_rate_limiter("gemini"):
+                response = requests.post(self.gemini_api_url, headers=headers, json=payload, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -581,20 +613,137 @@ class SimpleNewsScorer:
         except Exception as e:
             return 5.0, {"message": f"Gemini API error: {str(e)}", "analysis": "fallback"}
 
+    def search_news_memoized(self, brand_name: str, days_back: int = 60) -> List[Dict]:
+        """
+        search_news, memoized per brand (see brand_memo.BRAND_CACHE_TTLS).
+        
+        Results of a leg abandoned while queued for rate limits are not stored.
+        """
+        return self.brand_memo.get_or_compute(
+            "news", brand_name, lambda: self.search_news(brand_name, days_back),
+            key_suffix=str(days_back), cacheable=lambda articles: not queue_wait_abandoned()
+        )
+    
+    def analyze_news_with_gemini_memoized(self, articles: List[Dict], brand_name: str,
+                                          days_back: int = 60) -> Tuple[float, Dict]:
+        """
+        analyze_news_with_gemini, memoized per brand.
+        
+        The key includes a digest of the article URLs, so a sentiment never
+        outlives the article set it was computed from. Keyword fallbacks caused
+        by a Gemini error are not stored, and the neutral score for no articles
+        (possibly a news outage) is kept only for BRAND_EMPTY_TTL.
+        """
+        def cacheable(result: Tuple[float, Dict]) -> bool:
+            return bool(result[1].get("ai_analysis")) or not (self.gemini_api_key and articles)
+        
+        urls = sorted(article.get("url") or article.get("title") or "" for article in articles)
+        digest = hashlib.sha1("\n".join(urls).encode("utf-8")).hexdigest()[:16]
+        return self.brand_memo.get_or_compute(
+            "sentiment", brand_name, lambda: self.analyze_news_with_gemini(articles, brand_name),
+            key_suffix=f"{days_back}|{digest}", cacheable=cacheable, decode=tuple,
+            empty=lambda result: not articles
+        )
+    
+    def calculate_social_ethics_score_memoized(self, brand_name: str, product_name: str) -> Tuple[float, Dict]:
+        """
+        calculate_social_ethics_score_with_gemini, memoized per brand.
+        
+        The first product seen for a brand names the product in the prompt;
+        fallback scores (no key, API errors) are not stored.
+        """
+        return self.brand_memo.get_or_compute(
+            "ethics", brand_name, lambda: self.calculate_social_ethics_score_with_gemini(brand_name, product_name),
+            cacheable=lambda result: result[1].get("analysis") != "fallback", decode=tuple
+        )
+    
+    @staticmethod
+    def _timed(tracker: QueueWaitTracker, func: Callable, *args) -> Tuple[Any, float]:
+        """Run func(*args) with its rate-limiter queue time reported to tracker; return (value, duration_seconds)."""
+        start = time.time()
+        with track_queue_wait(tracker):
+            value = func(*args)
+        return value, time.time() - start
+    
+    def _collect_leg(self, name: str, future: Future, started_at: float, tracker: QueueWaitTracker,
+                     fallback: Any, timings: Dict[str, Dict]) -> Any:
+        """
+        Wait for a scoring leg until its deadline, falling back on timeout or error.
+        
+        The deadline is SCORING_LEG_TIMEOUTS[name] after started_at plus the time
+        the leg has spent queued in rate limiters (up to SCORING_MAX_QUEUE_SECONDS),
+        so legs are not timed out merely for waiting their turn. A timed-out leg
+        is abandoned: it takes no further rate-limiter tokens.
+        
+        Args:
+            name: Leg name (key in SCORING_LEG_TIMEOUTS)
+            future: Future returned by submitting self._timed(tracker, ...)
+            started_at: Time the leg was started
+            tracker: Queue-wait tracker the leg runs under
+            fallback: Value to use if the leg times out or fails
+            timings: Dict that receives this leg's duration, queue time and status
+            
+        Returns:
+            The leg's value or the fallback
+        """
+        timeout = SCORING_LEG_TIMEOUTS[name]
+        try:
+            while True:
+                queued = tracker.queued_seconds()
+                remaining = started_at + timeout + min(queued, SCORING_MAX_QUEUE_SECONDS) - time.time()
+                expired = remaining <= 0 and not (tracker.waiting and queued < SCORING_MAX_QUEUE_SECONDS)
+                # While the leg is queued its deadline keeps moving: re-check periodically
+                if expired:
+                    wait = 0.0
+                elif tracker.waiting:
+                    wait = min(max(remaining, 0.0), LEG_POLL_INTERVAL)
+                else:
+                    wait = max(remaining, 0.0)
+                try:
+                    value, duration = future.result(timeout=wait)
+                except FutureTimeoutError:
+                    if expired:
+                        raise
+                    continue
+                timings[name] = {"seconds": round(duration, 3), "queued_seconds": round(tracker.queued_seconds(), 3), "status": "ok"}
+                return value
+        except FutureTimeoutError:
+            future.cancel()
+            tracker.abandon()
+            queued = tracker.queued_seconds()
+            print(f"⏱️  {name} leg timed out after {timeout:.0f}s (+{queued:.1f}s queued for rate limits), using fallback")
+            timings[name] = {"seconds": timeout, "queued_seconds": round(queued, 3), "status": "timeout"}
+        except Exception as e:
+            print(f"⚠️  {name} leg failed: {e}")
+            timings[name] = {"seconds": None, "status": "error", "error": str(e)}
+        return fallback
+    
     def calculate_sustainability_score(self, product_name: str, 
                                      carbon_footprint: Optional[float] = None,
                                      nutrition_metrics: Optional[Dict] = None,
                                      days_back: int = 30,
-                                     use_usda_nutrition: bool = True) -> Dict:
+                                     use_usda_nutrition: bool = True,
+                                     usda_nutrition_data: Optional[Dict] = None) -> Dict:
         """
         Calculate sustainability score based on product name and news analysis.
         
+        The USDA lookup, news search and Gemini ethics call run concurrently; the
+        Gemini news-sentiment call starts as soon as the news search returns.
+        Each leg has its own timeout (SCORING_LEG_TIMEOUTS, not counting time
+        queued for upstream rate limits) and falls back to the neutral 5.0 score,
+        and per-leg timings are reported under "timings".
+        News, news sentiment and ethics depend only on the brand and are served
+        from the persistent brand memo when another product of the brand was
+        scored recently.
+        
         Args:
             product_name: Name of the product
             carbon_footprint: Optional carbon footprint data
             nutrition_metrics: Optional nutrition data
             days_back: Number of days to look back for news
             use_usda_nutrition: Whether to fetch real nutrition data from USDA API
+            usda_nutrition_data: USDA result already fetched for this product (e.g. by a
+                category-wide fetch_nutrition_for_products call); skips the USDA leg
             
         Returns:
             Dictionary with sustainability score and analysis
@@ -602,35 +751,85 @@ class SimpleNewsScorer:
         print(f"\n🌱 Calculating sustainability score for: {product_name}")
         print("=" * 60)
         
+        started_at = time.time()
+        timings: Dict[str, Dict] = {}
+        
         # Step 1: Extract brand name
         brand_name = self.extract_brand_name(product_name)
         print(f"🏷️  Extracted brand: {brand_name}")
         
-        # Step 2: Fetch USDA nutrition data (if enabled)
-        usda_nutrition_data = None
-        if use_usda_nutrition:
-            try:
-                usda_nutrition_data = self.nutrition_fetcher.fetch_nutrition_for_product(product_name)
+        # Steps 2-3, 5: Launch the independent network legs concurrently
+        trackers = {leg: QueueWaitTracker() for leg in SCORING_LEG_TIMEOUTS}
+        usda_future = None
+        if use_usda_nutrition and usda_nutrition_data is None:
+            usda_future = self.executor.submit(self._timed, trackers['usda'], self.nutrition_fetcher.fetch_nutrition_for_product, product_name)
+        news_future = self.executor.submit(self._timed, trackers['news'], self.search_news_memoized, brand_name, days_back)
+        ethics_future = self.executor.submit(self._timed, trackers['ethics'], self.calculate_social_ethics_score_memoized, brand_name, product_name)
+        
+        # Step 6 depends only on the news results: chain it onto the news leg
+        sentiment_future: Future = Future()
+        sentiment_started_at: Dict[str, float] = {}
+        
+        def start_sentiment_leg(done_news: Future) -> None:
+            if not sentiment_future.set_running_or_notify_cancel():
+                return  # News leg timed out and the sentiment leg was abandoned
+            if done_news.cancelled() or done_news.exception() is not None:
+                sentiment_future.set_exception(RuntimeError("news search failed"))
+                return
+            articles_ready, _ = done_news.result()
+            sentiment_started_at['time'] = time.time()
+            inner = self.executor.submit(self._timed, trackers['news_sentiment'], self.analyze_news_with_gemini_memoized, articles_ready, brand_name, days_back)
+            
+            def relay(done_inner: Future) -> None:
+                if done_inner.exception() is not None:
+                    sentiment_future.set_exception(done_inner.exception())
+                else:
+                    sentiment_future.set_result(done_inner.result())
+            inner.add_done_callback(relay)
+        
+        news_future.add_done_callback(start_sentiment_leg)
+        
+        # Step 2: Collect USDA nutrition data (if enabled)
+        if usda_nutrition_data is not None:
+            timings['usda'] = {"seconds": 0.0, "status": "prefetched"}
+        elif usda_future is not None:
+            usda_nutrition_data = self._collect_leg(
+                'usda', usda_future, started_at, trackers['usda'], None, timings
+            )
+            if usda_nutrition_data:
                 print(f"🥗 USDA Nutrition Score: {usda_nutrition_data.get('nutrition_score', 'N/A')}/10")
                 print(f"   Processed Level: {usda_nutrition_data.get('processed_level', 'N/A')}")
-            except Exception as e:
-                print(f"⚠️  Could not fetch USDA nutrition data: {e}")
-                usda_nutrition_data = None
+        else:
+            timings['usda'] = {"seconds": 0.0, "status": "skipped"}
         
-        # Step 3: Search for news
-        articles = self.search_news(brand_name, days_back)
+        # Step 3: Collect news search results
+        articles = self._collect_leg(
+            'news', news_future, started_at, trackers['news'], [], timings
+        )
         
         # Step 4: Calculate dynamic carbon score
         nutrition_data = usda_nutrition_data.get('nutrition_data', {}) if usda_nutrition_data else {}
         carbon_score = self.calculate_carbon_score(product_name, nutrition_data)
         print(f"🌍 Dynamic Carbon Score: {carbon_score}/10")
         
-        # Step 5: Calculate dynamic social ethics score with Gemini AI
-        ethics_score, ethics_analysis = self.calculate_social_ethics_score_with_gemini(brand_name, product_name)
+        # Step 5: Collect social ethics score from Gemini AI
+        ethics_score, ethics_analysis = self._collect_leg(
+            'ethics', ethics_future, started_at, trackers['ethics'],
+            (5.0, {"message": "Gemini ethics analysis unavailable", "analysis": "fallback"}), timings
+        )
         print(f"⚖️ Dynamic Social Ethics Score: {ethics_score}/10")
         
-        # Step 6: Analyze news sentiment with Gemini AI
-        news_score, news_analysis = self.analyze_news_with_gemini(articles, brand_name)
+        # Step 6: Collect news sentiment from Gemini AI
+        neutral_news = (5.0, {"message": "News sentiment analysis unavailable", "articles_analyzed": len(articles)})
+        if timings['news']['status'] == 'ok':
+            news_score, news_analysis = self._collect_leg(
+                'news_sentiment', sentiment_future, sentiment_started_at.get('time', time.time()),
+                trackers['news_sentiment'], neutral_news, timings
+            )
+        else:
+            sentiment_future.cancel()
+            news_score, news_analysis = neutral_news
+            timings['news_sentiment'] = {"seconds": 0.0, "status": "skipped"}
         
         # Step 7: Calculate base sustainability score
         # Use USDA nutrition data if available, otherwise use provided nutrition_metrics
@@ -685,6 +884,10 @@ class SimpleNewsScorer:
             "news_analysis": news_analysis,
             "articles_found": len(articles),
             "justification": justification,
+            "timings": {
+                "legs": timings,
+                "total_seconds": round(time.time() - started_at, 3)
+            },
             "analysis_timestamp": datetime.now().isoformat()
         }
         
@@ -702,6 +905,8 @@ class SimpleNewsScorer:
         print(f"   Base Score: {base_score.sustainability_score:.1f}/10")
         print(f"   News Score: {news_score:.1f}/10")
         print(f"   Articles Analyzed: {len(articles)}")
+        leg_summary = ", ".join(f"{leg} {info['seconds']}s" for leg, info in timings.items())
+        print(f"   Scoring time: {result['timings']['total_seconds']:.2f}s ({leg_summary})")
         
         return result
     
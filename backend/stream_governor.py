@@ -0,0 +1,286 @@
+"""
+Adaptive Stream Governor
+
+Keeps a live stream inside its frame budget instead of letting latency
+build up. The capture loop reports how long each frame took to process,
+the broadcaster reports encoded frame sizes, and the Socket.IO sender
+reports acknowledgement latency and frames dropped for slow clients. Every
+GOVERNOR_INTERVAL seconds the governor compares these measurements with the
+budget and moves one setting one step within its configured bounds:
+
+- CPU pressure (processing time per frame over budget): first process only
+  every Nth frame (stride), then lower the capture FPS.
+- Bandwidth pressure (slow acks, drops, or over the bitrate cap): first
+  lower JPEG quality, then the output resolution.
+
+With headroom the same settings are restored in reverse order, but only
+once BANDWIDTH_RECOVERY_HOLDOFF seconds have passed since the last bandwidth
+degrade and only if the projected bitrate of the restored setting (frame
+size scaled by pixel count or quality, times FPS) stays under the cap, so a
+stream just over the cap settles instead of flipping between two settings.
+Each change is recorded with its rationale so /health can explain the
+current settings.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+GOVERNOR_INTERVAL = 2.0  # Seconds between adjustments
+GOVERNOR_EWMA_ALPHA = 0.2  # Weight of the newest sample in the moving averages
+CPU_HIGH_LOAD = 0.9  # Processing time / frame budget above which CPU settings degrade
+CPU_LOW_LOAD = 0.5  # Load below which CPU settings recover
+ACK_LATENCY_HIGH_MS = 150.0  # Client ack latency above which bandwidth settings degrade
+ACK_LATENCY_LOW_MS = 60.0  # Ack latency below which bandwidth settings recover
+DROP_RATIO_HIGH = 0.2  # Share of frames dropped for slow clients that counts as congestion
+MAX_STREAM_KBPS = 8000  # Bitrate cap (encoded frame size x FPS)
+QUALITY_STEP = 10  # JPEG quality change per adjustment
+QUALITY_STEP_SIZE_FACTOR = 1.25  # Estimated frame size growth per QUALITY_STEP of JPEG quality
+BANDWIDTH_RECOVERY_HOLDOFF = 10.0  # Seconds after a bandwidth degrade before recovery is considered
+RATIONALE_HISTORY = 20  # Adjustments kept for /health
+
+
+@dataclass
+class StreamSettings:
+    """Current stream parameters."""
+
+    fps: int
+    stride: int  # Run the classifier on every Nth frame (1 = every frame)
+    width: int
+    height: int
+    jpeg_quality: int
+
+
+@dataclass
+class StreamBounds:
+    """Limits the governor may move the settings within."""
+
+    min_fps: int = 10
+    max_fps: int = 30
+    max_stride: int = 6
+    resolutions: Tuple[Tuple[int, int], ...] = ((640, 480), (480, 360), (320, 240))  # Largest first
+    min_quality: int = 50
+    max_quality: int = 85
+
+
+class StreamGovernor:
+    """
+    Measures stream load and adapts FPS, processing stride, resolution and JPEG quality.
+    """
+
+    def __init__(self, settings: StreamSettings, bounds: Optional[StreamBounds] = None,
+                 interval: float = GOVERNOR_INTERVAL):
+        """
+        Initialize the governor.
+
+        Args:
+            settings: Starting (and best-case) settings
+            bounds: Limits for each setting (defaults to StreamBounds())
+            interval: Seconds between adjustments
+        """
+        self.bounds = bounds or StreamBounds()
+        self.settings = settings
+        self.interval = interval
+        self._lock = threading.Lock()
+
+        self.processing_ms: Optional[float] = None  # EWMA per processed frame
+        self.frame_bytes: Optional[float] = None  # EWMA encoded size
+        self.ack_latency_ms: Optional[float] = None  # Latest EWMA reported by the sender
+        self._sent_total = 0
+        self._dropped_total = 0
+        self._sent_at_last_adjust = 0
+        self._dropped_at_last_adjust = 0
+        self._last_adjust = time.monotonic()
+        self._last_bandwidth_degrade: Optional[float] = None
+
+        self.adjustments = 0
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=RATIONALE_HISTORY)
+        self.rationale = "Starting at configured settings"
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + GOVERNOR_EWMA_ALPHA * (sample - current)
+
+    def record_processing(self, seconds: float) -> None:
+        """Report the classifier time of one processed frame."""
+        with self._lock:
+            self.processing_ms = self._ewma(self.processing_ms, seconds * 1000)
+
+    def record_encoded(self, frame) -> None:
+        """Broadcaster listener: report the size of an encoded frame."""
+        with self._lock:
+            self.frame_bytes = self._ewma(self.frame_bytes, len(frame.jpeg))
+
+    def record_delivery(self, sender_stats: Dict[str, Any]) -> None:
+        """Report SocketIOFrameSender.stats() (ack latency and sent/dropped totals)."""
+        with self._lock:
+            self.ack_latency_ms = sender_stats.get("ack_latency_ms")
+            self._sent_total = sender_stats.get("sent", 0)
+            self._dropped_total = sender_stats.get("dropped", 0)
+
+    def should_process(self, frame_index: int) -> bool:
+        """Whether the classifier should run on this frame (per the current stride)."""
+        return frame_index % self.settings.stride == 0
+
+    def _cpu_load(self) -> Optional[float]:
+        if self.processing_ms is None:
+            return None
+        budget_ms = 1000.0 / self.settings.fps
+        return (self.processing_ms / self.settings.stride) / budget_ms
+
+    def _bandwidth_state(self) -> Tuple[Optional[str], Optional[str]]:
+        """('degrade' | 'recover' | None, reason)."""
+        sent = self._sent_total - self._sent_at_last_adjust
+        dropped = self._dropped_total - self._dropped_at_last_adjust
+        drop_ratio = dropped / (sent + dropped) if sent + dropped else 0.0
+        kbps = self.frame_bytes * 8 * self.settings.fps / 1000 if self.frame_bytes else 0.0
+
+        if kbps > MAX_STREAM_KBPS:
+            return "degrade", f"bitrate {kbps:.0f} kbps over the {MAX_STREAM_KBPS} kbps cap"
+        if self.ack_latency_ms is not None and self.ack_latency_ms > ACK_LATENCY_HIGH_MS:
+            return "degrade", f"ack latency {self.ack_latency_ms:.0f} ms over {ACK_LATENCY_HIGH_MS:.0f} ms"
+        if drop_ratio > DROP_RATIO_HIGH:
+            return "degrade", f"{drop_ratio:.0%} of frames dropped for slow clients"
+        if (self.ack_latency_ms is None or self.ack_latency_ms < ACK_LATENCY_LOW_MS) and drop_ratio == 0:
+            if kbps < MAX_STREAM_KBPS * 0.7:
+                reason = "no clients" if self.ack_latency_ms is None else f"ack latency {self.ack_latency_ms:.0f} ms"
+                return "recover", reason
+        return None, None
+
+    def _resolution_index(self) -> int:
+        current = (self.settings.width, self.settings.height)
+        resolutions = self.bounds.resolutions
+        return resolutions.index(current) if current in resolutions else 0
+
+    def _degrade_cpu(self) -> Optional[str]:
+        if self.settings.stride < self.bounds.max_stride:
+            self.settings.stride += 1
+            return f"processing every {self.settings.stride} frames"
+        if self.settings.fps > self.bounds.min_fps:
+            self.settings.fps = max(self.bounds.min_fps, self.settings.fps - 5)
+            return f"capture lowered to {self.settings.fps} FPS"
+        return None
+
+    def _recover_cpu(self) -> Optional[str]:
+        if self.settings.fps < self.bounds.max_fps:
+            self.settings.fps = min(self.bounds.max_fps, self.settings.fps + 5)
+            return f"capture raised to {self.settings.fps} FPS"
+        if self.settings.stride > 1:
+            self.settings.stride -= 1
+            return f"processing every {self.settings.stride} frame(s)"
+        return None
+
+    def _scale_frame_bytes(self, factor: float) -> None:
+        """Rescale the frame size estimate after a setting change so projections stay consistent."""
+        if self.frame_bytes is not None:
+            self.frame_bytes *= factor
+
+    def _degrade_bandwidth(self) -> Optional[str]:
+        if self.settings.jpeg_quality > self.bounds.min_quality:
+            quality = max(self.bounds.min_quality, self.settings.jpeg_quality - QUALITY_STEP)
+            self._scale_frame_bytes(QUALITY_STEP_SIZE_FACTOR ** ((quality - self.settings.jpeg_quality) / QUALITY_STEP))
+            self.settings.jpeg_quality = quality
+            return f"JPEG quality lowered to {self.settings.jpeg_quality}"
+        index = self._resolution_index()
+        if index + 1 < len(self.bounds.resolutions):
+            width, height = self.bounds.resolutions[index + 1]
+            self._scale_frame_bytes(width * height / (self.settings.width * self.settings.height))
+            self.settings.width, self.settings.height = width, height
+            return f"resolution lowered to {self.settings.width}x{self.settings.height}"
+        return None
+
+    def _projected_kbps(self, size_factor: float) -> float:
+        """Bitrate if the frame size grew by size_factor at the current FPS."""
+        return (self.frame_bytes or 0.0) * size_factor * 8 * self.settings.fps / 1000
+
+    def _recover_bandwidth(self) -> Optional[str]:
+        index = self._resolution_index()
+        if index > 0:
+            width, height = self.bounds.resolutions[index - 1]
+            factor = width * height / (self.settings.width * self.settings.height)
+            if self._projected_kbps(factor) > MAX_STREAM_KBPS:
+                return None
+            self._scale_frame_bytes(factor)
+            self.settings.width, self.settings.height = width, height
+            return f"resolution raised to {self.settings.width}x{self.settings.height}"
+        if self.settings.jpeg_quality < self.bounds.max_quality:
+            quality = min(self.bounds.max_quality, self.settings.jpeg_quality + QUALITY_STEP)
+            factor = QUALITY_STEP_SIZE_FACTOR ** ((quality - self.settings.jpeg_quality) / QUALITY_STEP)
+            if self._projected_kbps(factor) > MAX_STREAM_KBPS:
+                return None
+            self._scale_frame_bytes(factor)
+            self.settings.jpeg_quality = quality
+            return f"JPEG quality raised to {self.settings.jpeg_quality}"
+        return None
+
+    def maybe_adjust(self) -> Optional[str]:
+        """
+        Adjust at most one CPU and one bandwidth setting if the interval has elapsed.
+
+        Returns:
+            The rationale of the changes made, or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_adjust < self.interval:
+                return None
+            self._last_adjust = now
+
+            changes: List[str] = []
+            load = self._cpu_load()
+            if load is not None and load > CPU_HIGH_LOAD:
+                change = self._degrade_cpu()
+                if change:
+                    changes.append(f"{change} (processing load {load:.0%} of frame budget)")
+            elif load is not None and load < CPU_LOW_LOAD:
+                # Only recover if the recovered setting would still fit the budget
+                before = (self.settings.fps, self.settings.stride)
+                change = self._recover_cpu()
+                if change and self._cpu_load() > CPU_HIGH_LOAD:
+                    self.settings.fps, self.settings.stride = before
+                    change = None
+                if change:
+                    changes.append(f"{change} (processing load {load:.0%} of frame budget)")
+
+            direction, reason = self._bandwidth_state()
+            if direction == "degrade":
+                change = self._degrade_bandwidth()
+                if change:
+                    self._last_bandwidth_degrade = now
+                    changes.append(f"{change} ({reason})")
+            elif direction == "recover" and (self._last_bandwidth_degrade is None
+                                             or now - self._last_bandwidth_degrade >= BANDWIDTH_RECOVERY_HOLDOFF):
+                change = self._recover_bandwidth()
+                if change:
+                    changes.append(f"{change} ({reason})")
+
+            self._sent_at_last_adjust = self._sent_total
+            self._dropped_at_last_adjust = self._dropped_total
+
+            if not changes:
+                return None
+            self.adjustments += 1
+            self.rationale = "; ".join(changes)
+            self.history.append({"time": time.time(), "settings": asdict(self.settings), "rationale": self.rationale})
+            print(f"🎛️ Stream governor: {self.rationale}")
+            return self.rationale
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current settings, bounds, measurements and the rationale of recent adjustments."""
+        with self._lock:
+            load = self._cpu_load()
+            return {
+                "settings": asdict(self.settings),
+                "bounds": asdict(self.bounds),
+                "measurements": {
+                    "processing_ms": round(self.processing_ms, 1) if self.processing_ms is not None else None,
+                    "processing_load": round(load, 2) if load is not None else None,
+                    "frame_kb": round(self.frame_bytes / 1024, 1) if self.frame_bytes is not None else None,
+                    "ack_latency_ms": round(self.ack_latency_ms, 1) if self.ack_latency_ms is not None else None,
+                },
+                "rationale": self.rationale,
+                "adjustments": self.adjustments,
+                "history": list(self.history),
+            }
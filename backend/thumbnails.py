@@ -0,0 +1,140 @@
+"""
+Capture Thumbnails
+
+Generates resized WebP/JPEG variants of captured images and caches them next
+to the captures (captures/.thumbs). Variants are created lazily on first
+request (or ahead of time via `warm_thumbnails`) and regenerated when the
+source image changes. Every variant gets an ETag derived from the source
+image's content hash so clients can revalidate with If-None-Match.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Optional imports with fallback
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+    WEBP_AVAILABLE = features.check("webp")
+except ImportError:
+    print("Warning: Pillow not found. Thumbnails are disabled and full images will be served.")
+    print("Install with: pip install pillow")
+    PIL_AVAILABLE = False
+    WEBP_AVAILABLE = False
+    Image = None
+
+# Thumbnail configuration
+THUMBNAIL_DIR_NAME = ".thumbs"
+THUMBNAIL_WIDTHS = (96, 160, 320, 640, 1280)  # Requested widths snap up to one of these buckets
+DEFAULT_THUMBNAIL_WIDTH = 320
+JPEG_THUMBNAIL_QUALITY = 80
+WEBP_THUMBNAIL_QUALITY = 75
+
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+_hash_cache: Dict[Path, Tuple[float, int, str]] = {}  # {path: (mtime, size, sha1)}
+_hash_lock = threading.Lock()
+_generate_lock = threading.Lock()
+
+
+def snap_width(width: int) -> int:
+    """Round a requested width up to the nearest supported bucket."""
+    for bucket in THUMBNAIL_WIDTHS:
+        if width <= bucket:
+            return bucket
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def pick_format(accept_header: Optional[str]) -> str:
+    """Choose WebP when the client accepts it and Pillow can encode it, JPEG otherwise."""
+    if WEBP_AVAILABLE and accept_header and "image/webp" in accept_header:
+        return "webp"
+    return "jpeg"
+
+
+def content_hash(path: Path) -> str:
+    """SHA-1 of a file's contents, memoized by (mtime, size)."""
+    stat = path.stat()
+    with _hash_lock:
+        cached = _hash_cache.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    file_hash = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_cache[path] = (stat.st_mtime, stat.st_size, file_hash)
+    return file_hash
+
+
+def image_etag(source_path: Path, width: Optional[int] = None, fmt: str = "jpeg") -> str:
+    """ETag for the original image (width None) or one of its variants."""
+    file_hash = content_hash(source_path)[:16]
+    if width is None:
+        return f'"{file_hash}"'
+    return f'"{file_hash}-w{width}.{fmt}"'
+
+
+def thumbnail_path(source_path: Path, width: int, fmt: str) -> Path:
+    """Cache location of a thumbnail variant."""
+    extension = "webp" if fmt == "webp" else "jpg"
+    return source_path.parent / THUMBNAIL_DIR_NAME / f"{source_path.stem}_w{width}.{extension}"
+
+
+def get_thumbnail(source_path: Path, width: int, fmt: str = "jpeg") -> Optional[Path]:
+    """
+    Return a cached thumbnail, generating it if missing or older than the source.
+
+    Args:
+        source_path: Full-resolution capture
+        width: Target width (snapped to a supported bucket by the caller)
+        fmt: "jpeg" or "webp"
+
+    Returns:
+        Path to the thumbnail, or None if thumbnails are unavailable
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    target = thumbnail_path(source_path, width, fmt)
+    source_mtime = source_path.stat().st_mtime
+    if target.exists() and target.stat().st_mtime >= source_mtime:
+        return target
+
+    with _generate_lock:
+        # Another request may have produced it while we waited
+        if target.exists() and target.stat().st_mtime >= source_mtime:
+            return target
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(source_path) as image:
+            image = image.convert("RGB")
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+
+            tmp_path = target.with_name(f".{target.name}.tmp")
+            if fmt == "webp":
+                image.save(tmp_path, "WEBP", quality=WEBP_THUMBNAIL_QUALITY, method=4)
+            else:
+                image.save(tmp_path, "JPEG", quality=JPEG_THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_path, target)
+
+    return target
+
+
+def warm_thumbnails(source_path: Path, widths: Tuple[int, ...] = (DEFAULT_THUMBNAIL_WIDTH,)) -> None:
+    """Pre-generate thumbnails for a new capture so the first request is a cache hit."""
+    if not PIL_AVAILABLE:
+        return
+    formats = ("jpeg", "webp") if WEBP_AVAILABLE else ("jpeg",)
+    for width in widths:
+        for fmt in formats:
+            get_thumbnail(source_path, snap_width(width), fmt)
@@ -1,23 +1,24 @@
 #!/usr/bin/env python3
 """
 Video Stream Server for CV2 Feed
-Streams CV2 video output to frontend via SocketIO
+Streams CV2 video output to frontend via SocketIO (binary JPEG frames) or
+as an MJPEG HTTP stream at /video_feed
 Works efficiently on localhost for same-machine setups
 """
 
-from flask import Flask
+from flask import Flask, Response, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
-import base64
 import threading
 import time
 import os
 import sys
-import asyncio
 
 # Import your existing CV2 processing
-from center_object_classifier import CenterObjectClassifier
+from center_object_classifier import CenterObjectClassifier, FRAME_PROCESSING_RATE
+from frame_broadcaster import MJPEG_BOUNDARY, FrameBroadcaster, SocketIOFrameSender
+from stream_governor import StreamBounds, StreamGovernor, StreamSettings
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -29,8 +30,9 @@ streaming = False
 stream_thread = None
 camera_lock = threading.Lock()
 
-# CV2 Classifier instance
+# CV2 Classifier instance and the detections drawn on frames it skips
 classifier = None
+last_detection_data = None
 
 # Configuration
 CAMERA_ID = 1  # Change this to your camera ID
@@ -38,26 +40,52 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 FPS = 30
 JPEG_QUALITY = 85
+FPS_LOG_INTERVAL = 100  # Log delivered FPS every N frames
 
-def process_frame_with_classifier(frame):
+# Bounds the stream governor adapts FPS, processing stride, output resolution
+# and JPEG quality within (the values above are the best-case settings)
+STREAM_BOUNDS = StreamBounds(
+    min_fps=10,
+    max_fps=FPS,
+    max_stride=6,
+    resolutions=((FRAME_WIDTH, FRAME_HEIGHT), (480, 360), (320, 240)),
+    min_quality=50,
+    max_quality=JPEG_QUALITY
+)
+
+# Frames are JPEG-encoded once on the broadcaster's worker thread and shared
+# by all Socket.IO and MJPEG viewers
+broadcaster = FrameBroadcaster(jpeg_quality=JPEG_QUALITY)
+frame_sender = SocketIOFrameSender(socketio)
+broadcaster.add_listener(frame_sender)
+
+# Adapts the stream to CPU load and client bandwidth
+governor = StreamGovernor(
+    StreamSettings(fps=FPS, stride=FRAME_PROCESSING_RATE, width=FRAME_WIDTH, height=FRAME_HEIGHT, jpeg_quality=JPEG_QUALITY),
+    STREAM_BOUNDS
+)
+broadcaster.add_listener(governor.record_encoded)
+
+def process_frame_with_classifier(frame, run_classifier=True):
     """
     Process frame using your CenterObjectClassifier
     This adds motion detection, scene change detection, and bounding boxes
+    
+    With run_classifier=False (frames skipped by the governor's stride) the
+    previous detections are drawn again instead.
     """
-    global classifier
+    global classifier, last_detection_data
     
     try:
         if classifier is None:
             return frame
-            
-        # Process frame with your classifier (sync wrapper for async function)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        detection_data = loop.run_until_complete(classifier.process_frame(frame))
-        loop.close()
+        
+        if run_classifier or last_detection_data is None:
+            # Motion analysis is synchronous CPU work: run it here on the capture thread
+            last_detection_data = classifier.analyze_frame(frame)
         
         # Draw detections on the frame
-        classifier.draw_detections(frame, detection_data)
+        classifier.draw_detections(frame, last_detection_data)
         
         return frame
     except Exception as e:
@@ -96,6 +124,8 @@ def stream_camera():
         
         frame_count = 0
         start_time = time.time()
+        next_deadline = time.monotonic()
+        broadcaster.start()
         
         while streaming:
             with camera_lock:
@@ -109,37 +139,52 @@ def stream_camera():
                 time.sleep(0.1)
                 continue
             
-            # Process frame with your CenterObjectClassifier CV2 code
-            processed_frame = process_frame_with_classifier(frame)
+            settings = governor.settings
+            
+            # Process frame with your CenterObjectClassifier CV2 code (every
+            # `stride` frames; skipped frames reuse the last detections)
+            run_classifier = governor.should_process(frame_count)
+            process_start = time.monotonic()
+            processed_frame = process_frame_with_classifier(frame, run_classifier)
+            if run_classifier:
+                governor.record_processing(time.monotonic() - process_start)
             
-            # Encode frame as JPEG
-            encode_param = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
-            _, buffer = cv2.imencode('.jpg', processed_frame, encode_param)
-            frame_data = base64.b64encode(buffer).decode('utf-8')
+            # Scale to the governed output resolution
+            if (processed_frame.shape[1], processed_frame.shape[0]) != (settings.width, settings.height):
+                processed_frame = cv2.resize(processed_frame, (settings.width, settings.height), interpolation=cv2.INTER_AREA)
             
-            # Emit frame to all connected clients
-            socketio.emit('video_frame', {
-                'frame': frame_data,
-                'timestamp': time.time(),
-                'frame_count': frame_count
-            })
+            # Hand the frame to the encoder thread (never blocks)
+            broadcaster.jpeg_quality = settings.jpeg_quality
+            broadcaster.publish(processed_frame)
             
             frame_count += 1
+            governor.record_delivery(frame_sender.stats())
+            governor.maybe_adjust()
             
-            # Log FPS every 100 frames
-            if frame_count % 100 == 0:
+            # Log delivered FPS periodically
+            if frame_count % FPS_LOG_INTERVAL == 0:
                 elapsed = time.time() - start_time
                 actual_fps = frame_count / elapsed
-                print(f"📊 Streaming at {actual_fps:.1f} FPS (sent {frame_count} frames)")
+                sender = frame_sender.stats()
+                print(f"📊 Streaming at {actual_fps:.1f} FPS (captured {frame_count}, encoded {broadcaster.encoded}, "
+                      f"sent {sender['sent']}, dropped for slow clients {sender['dropped']})")
             
-            # Control frame rate
-            time.sleep(1/FPS)
+            # Pace by deadline so processing time counts against the frame budget;
+            # when more than a frame behind, resync instead of bursting to catch up
+            frame_interval = 1.0 / governor.settings.fps
+            next_deadline += frame_interval
+            delay = next_deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -frame_interval:
+                next_deadline = time.monotonic()
             
     except Exception as e:
         print(f"❌ Error in camera stream: {str(e)}")
         socketio.emit('stream_error', {'message': f'Camera streaming error: {str(e)}'})
     
     finally:
+        broadcaster.stop()
         with camera_lock:
             if camera:
                 camera.release()
@@ -149,12 +194,14 @@ def stream_camera():
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    print(f"✅ Client connected: {request.sid if 'request' in dir() else 'unknown'}")
+    print(f"✅ Client connected: {request.sid}")
+    frame_sender.add_client(request.sid)
     emit('connection_status', {'status': 'connected', 'streaming': streaming})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    frame_sender.remove_client(request.sid)
     print(f"🔌 Client disconnected")
 
 @socketio.on('start_stream')
@@ -217,14 +264,30 @@ def index():
         'service': 'CV2 Video Stream Server',
         'streaming': streaming,
         'camera_id': CAMERA_ID,
-        'resolution': f"{FRAME_WIDTH}x{FRAME_HEIGHT}",
-        'fps': FPS
+        'resolution': f"{governor.settings.width}x{governor.settings.height}",
+        'fps': governor.settings.fps
     }
 
+@app.route('/video_feed')
+def video_feed():
+    """MJPEG stream of the processed frames (works in a plain <img> tag)"""
+    if not broadcaster.running:
+        return {'status': 'error', 'message': 'Stream not active'}, 503
+    return Response(
+        broadcaster.mjpeg_stream(),
+        mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'
+    )
+
 @app.route('/health')
 def health():
     """Health check"""
-    return {'status': 'healthy', 'streaming': streaming}
+    return {
+        'status': 'healthy',
+        'streaming': streaming,
+        'broadcaster': broadcaster.stats(),
+        'socketio': frame_sender.stats(),
+        'governor': governor.snapshot()
+    }
 
 if __name__ == '__main__':
     print("=" * 70)
@@ -240,7 +303,8 @@ if __name__ == '__main__':
     print("📡 SocketIO events:")
     print("   - emit 'start_stream' to start")
     print("   - emit 'stop_stream' to stop")
-    print("   - listen for 'video_frame' to receive frames")
+    print("   - listen for 'video_frame' to receive frames (binary JPEG, acknowledge each)")
+    print("🖼️  MJPEG stream: http://localhost:5001/video_feed")
     print("\nPress Ctrl+C to stop\n")
     
     socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
@@ -25,6 +25,7 @@ export const BackendVideoFeed = ({
   
   const lastFrameTimeRef = useRef<number>(Date.now());
   const frameCountRef = useRef<number>(0);
+  const frameUrlRef = useRef<string | null>(null);
 
   useEffect(() => {
     if (isActive) {
@@ -119,10 +120,17 @@ export const BackendVideoFeed = ({
         });
       });
 
-      // Video frame handler
-      socket.on('video_frame', (data: { frame: string; timestamp: number; frame_count: number }) => {
+      // Video frame handler: frames arrive as binary JPEG; acknowledging each
+      // one tells the server this client is ready for the next
+      socket.on('video_frame', (data: { frame: ArrayBuffer; timestamp: number; frame_count: number }, ack?: () => void) => {
+        ack?.();
         if (imgRef.current) {
-          imgRef.current.src = `data:image/jpeg;base64,${data.frame}`;
+          const url = URL.createObjectURL(new Blob([data.frame], { type: 'image/jpeg' }));
+          if (frameUrlRef.current) {
+            URL.revokeObjectURL(frameUrlRef.current);
+          }
+          frameUrlRef.current = url;
+          imgRef.current.src = url;
           setFrameCount(data.frame_count);
           
           // Calculate FPS
@@ -162,6 +170,10 @@ export const BackendVideoFeed = ({
       socketRef.current.disconnect();
       socketRef.current = null;
     }
+    if (frameUrlRef.current) {
+      URL.revokeObjectURL(frameUrlRef.current);
+      frameUrlRef.current = null;
+    }
     
     setIsConnected(false);
     setIsStreaming(false);
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from "react";
+import { useState, useEffect, useCallback, useMemo, useRef } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import { Radio } from "lucide-react";
 import { TopNavigation } from "@/components/TopNavigation";
@@ -19,24 +19,44 @@ type BackendCartItem = {
   name?: string;
   price?: number | string | null;
   image_url?: string | null;
+  thumbnail_url?: string | null;
   image_path?: string | null;
   sustainabilityScore?: number | null;
 };
 
+type CartSummary = {
+  total_price?: number;
+};
+
 type ShoppingCartResponse = {
   shopping_cart?: Record<string, BackendCartItem>;
-  cart_summary?: {
-    total_price?: number;
-  };
+  cart_summary?: CartSummary;
+};
+
+// Payload of /shopping-cart/changes and of each /shopping-cart/stream "cart" event
+type CartDelta = {
+  version: number;
+  since: number;
+  full?: boolean;
+  changed?: Record<string, BackendCartItem>;
+  removed?: string[];
+  cart_summary?: CartSummary;
 };
 
 const API_BASE_URL = (import.meta.env.VITE_BACKEND_URL as string | undefined) ?? "http://localhost:8000";
 const CART_ENDPOINT = "/shopping-cart/with-urls";
+const CART_STREAM_ENDPOINT = "/shopping-cart/stream";
+const CART_CHANGES_ENDPOINT = "/shopping-cart/changes";
+const FALLBACK_POLL_INTERVAL_MS = 2000;
 const PLACEHOLDER_IMAGE = "/placeholder.svg";
 
 const normalizePath = (path: string): string => (path.startsWith("/") ? path : `/${path}`);
 
 const buildImageUrl = (item: BackendCartItem): string => {
+  if (item.thumbnail_url) {
+    return `${API_BASE_URL}${normalizePath(item.thumbnail_url)}`;
+  }
+
   if (item.image_url) {
     return `${API_BASE_URL}${normalizePath(item.image_url)}`;
   }
@@ -83,6 +103,37 @@ const SUSTAINABILITY_SCORE_CACHE: Record<string, number> = {
 
 const normalizeCacheKey = (value: string): string => value.toLowerCase().replace(/[^a-z0-9]+/g, " ").trim();
 
+const toCartItem = (id: string, item: BackendCartItem): CartItemType => {
+  const name = item.name ?? "Unknown item";
+  const normalizedName = normalizeCacheKey(name);
+
+  let sustainabilityScore = deriveSustainabilityScore(item.sustainabilityScore);
+  if (!item.sustainabilityScore) {
+    const cacheMatch = Object.entries(SUSTAINABILITY_SCORE_CACHE).find(([key]) => {
+      const normalizedKey = normalizeCacheKey(key);
+      if (!normalizedKey) {
+        return false;
+      }
+
+      const mergedName = ` ${normalizedName} `;
+      const mergedKey = ` ${normalizedKey} `;
+      return mergedName.includes(mergedKey) || mergedKey.includes(mergedName);
+    });
+
+    if (cacheMatch) {
+      sustainabilityScore = Math.round(cacheMatch[1] * 10);
+    }
+  }
+
+  return {
+    id,
+    name,
+    price: parsePrice(item.price),
+    image: buildImageUrl(item),
+    sustainabilityScore,
+  };
+};
+
 const Dashboard = () => {
   const navigate = useNavigate();
   const location = useLocation();
@@ -104,6 +155,68 @@ const Dashboard = () => {
     ? Math.round(items.reduce((sum, item) => sum + item.sustainabilityScore, 0) / items.length)
     : 0;
 
+  // Last cart version applied from the stream (0 before the first event)
+  const cartVersionRef = useRef(0);
+  // In-flight full refetch, and the newest stream version skipped while it ran
+  const resyncRef = useRef({ pending: false, skippedVersion: 0 });
+
+  const applyCartSummary = useCallback((summary?: CartSummary) => {
+    if (summary && typeof summary.total_price === "number") {
+      setTotalSpentExternal(summary.total_price);
+    } else {
+      setTotalSpentExternal(null);
+    }
+  }, []);
+
+  const applyCartDelta = useCallback((delta: CartDelta) => {
+    const changed = delta.changed ?? {};
+    const removed = new Set(delta.removed ?? []);
+
+    setItems((current) => {
+      if (delta.full) {
+        return Object.entries(changed).map(([id, item]) => toCartItem(id, item));
+      }
+
+      // Unchanged items keep their object identity (and list position); new ones are appended
+      const known = new Set(current.map((item) => item.id));
+      const updated = current
+        .filter((item) => !removed.has(item.id))
+        .map((item) => (changed[item.id] ? toCartItem(item.id, changed[item.id]) : item));
+      const added = Object.entries(changed)
+        .filter(([id]) => !known.has(id))
+        .map(([id, item]) => toCartItem(id, item));
+      return added.length > 0 ? [...updated, ...added] : updated;
+    });
+    applyCartSummary(delta.cart_summary);
+    cartVersionRef.current = delta.version;
+  }, [applyCartSummary]);
+
+  // Full refetch, used only when the stream skipped versions we never applied
+  const resyncCart = useCallback(async () => {
+    const resync = resyncRef.current;
+    if (resync.pending) {
+      return;
+    }
+    resync.pending = true;
+    try {
+      // Repeat while events skipped during the refetch are newer than what it returned
+      do {
+        resync.skippedVersion = 0;
+        const response = await fetch(`${API_BASE_URL}${CART_CHANGES_ENDPOINT}?since=0`);
+        if (!response.ok) {
+          throw new Error(`Failed to fetch cart changes: ${response.status}`);
+        }
+
+        const delta: CartDelta = await response.json();
+        applyCartDelta({ ...delta, full: true });
+      } while (resync.skippedVersion > cartVersionRef.current);
+    } catch (error) {
+      console.error("Error resyncing cart:", error);
+    } finally {
+      resync.pending = false;
+    }
+  }, [applyCartDelta]);
+
   const fetchCartData = useCallback(async () => {
     try {
       const response = await fetch(`${API_BASE_URL}${CART_ENDPOINT}`);
@@ -113,57 +226,72 @@ const Dashboard = () => {
 
       const data: ShoppingCartResponse = await response.json();
       const shoppingCart = data.shopping_cart ?? {};
-      const cartItems: CartItemType[] = Object.entries(shoppingCart).map(([id, item]) => {
-        const name = item.name ?? "Unknown item";
-        const normalizedName = normalizeCacheKey(name);
-
-        let sustainabilityScore = deriveSustainabilityScore(item.sustainabilityScore);
-        if (!item.sustainabilityScore) {
-          const cacheMatch = Object.entries(SUSTAINABILITY_SCORE_CACHE).find(([key]) => {
-            const normalizedKey = normalizeCacheKey(key);
-            if (!normalizedKey) {
-              return false;
-            }
-
-            const mergedName = ` ${normalizedName} `;
-            const mergedKey = ` ${normalizedKey} `;
-            return mergedName.includes(mergedKey) || mergedKey.includes(mergedName);
-          });
-
-          if (cacheMatch) {
-            sustainabilityScore = Math.round(cacheMatch[1] * 10);
-          }
-        }
-
-        return {
-          id,
-          name,
-          price: parsePrice(item.price),
-          image: buildImageUrl(item),
-          sustainabilityScore,
-        };
-      });
-
-      setItems(cartItems);
-
-      if (data.cart_summary && typeof data.cart_summary.total_price === "number") {
-        setTotalSpentExternal(data.cart_summary.total_price);
-      } else {
-        setTotalSpentExternal(null);
-      }
+      setItems(Object.entries(shoppingCart).map(([id, item]) => toCartItem(id, item)));
+      applyCartSummary(data.cart_summary);
     } catch (error) {
       console.error("Error fetching cart data:", error);
     }
-  }, []);
+  }, [applyCartSummary]);
 
   useEffect(() => {
-    fetchCartData();
-    const intervalId = window.setInterval(fetchCartData, 2000);
+    // Poll only while the push stream is unavailable; the cart endpoint answers
+    // unchanged polls with 304 via its ETag.
+    let intervalId: number | null = null;
+    const startPolling = () => {
+      if (intervalId === null) {
+        intervalId = window.setInterval(fetchCartData, FALLBACK_POLL_INTERVAL_MS);
+      }
+    };
+    const stopPolling = () => {
+      if (intervalId !== null) {
+        window.clearInterval(intervalId);
+        intervalId = null;
+      }
+    };
+
+    if (typeof EventSource === "undefined") {
+      fetchCartData();
+      startPolling();
+      return stopPolling;
+    }
+
+    // The first event carries the whole cart and reconnects resume from
+    // Last-Event-ID, so each event is applied as a delta without refetching.
+    const source = new EventSource(`${API_BASE_URL}${CART_STREAM_ENDPOINT}`);
+    source.addEventListener("cart", (event) => {
+      let delta: CartDelta;
+      try {
+        delta = JSON.parse(event.data);
+      } catch (error) {
+        console.error("Error parsing cart event:", error);
+        resyncCart();
+        return;
+      }
+
+      const resync = resyncRef.current;
+      if (resync.pending) {
+        resync.skippedVersion = Math.max(resync.skippedVersion, delta.version);
+        return;
+      }
+      // A delta only applies on top of the version it was built from
+      if (!delta.full && delta.since !== cartVersionRef.current) {
+        resyncCart();
+        return;
+      }
+      applyCartDelta(delta);
+    });
+    source.onopen = () => {
+      stopPolling();
+    };
+    source.onerror = () => {
+      startPolling();
+    };
 
     return () => {
-      window.clearInterval(intervalId);
+      source.close();
+      stopPolling();
     };
-  }, [fetchCartData]);
+  }, [fetchCartData, applyCartDelta, resyncCart]);
 
   useEffect(() => {
     if (totalSpent > budget) {
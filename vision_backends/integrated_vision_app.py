@@ -15,12 +15,12 @@ import time
 import os
 import tempfile
 import numpy as np
-import asyncio
 import json
 from datetime import datetime
 
 # Import the vision sustainability analyzer
 from vision_sustainability_backend import vision_analyzer
+from async_runner import run_coroutine
 
 app = Flask(__name__)
 CORS(app)
@@ -375,10 +375,7 @@ def simulate_product_detection():
     
     # Analyze the detected product
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(detected_product))
-        loop.close()
+        result = run_coroutine(vision_analyzer.analyze_detected_product(detected_product))
         
         # Emit results to all connected clients
         socketio.emit('product_analysis_result', result)
@@ -433,11 +430,8 @@ def handle_stop_stream():
 def handle_analyze_product(data):
     """Handle real-time product analysis via WebSocket"""
     try:
-        # Run async analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(data))
-        loop.close()
+        # Run async analysis on the shared background event loop
+        result = run_coroutine(vision_analyzer.analyze_detected_product(data))
         
         # Emit results to all connected clients
         emit('product_analysis_result', result)
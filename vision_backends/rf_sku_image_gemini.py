@@ -4,6 +4,7 @@ import json
 import math
 import os
 import re
+import sys
 import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, TypedDict
@@ -17,12 +18,23 @@ from apple_ocr import recognize_with_boxes
 
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gemini_batcher import BatchResponseError, GeminiBatcher, demultiplex_results
+
 load_dotenv()
 
 ROBOFLOW_WORKSPACE: str = "orbifold-ai"
 ROBOFLOW_WORKFLOW_ID: str = "detect-count-and-visualize-3"
 MODEL_NAME: str = "gemini-flash-lite-latest"
 DEFAULT_CROPS_DIR: Path = Path(__file__).resolve().parent / "crops"
+GEMINI_BATCH_SIZE: int = 10
+GEMINI_BATCH_WINDOW: float = 0.02
+
+
+class CropRequest(TypedDict):
+    image_bytes: bytes
+    detection_index: int
+    context_text: Optional[str]
 
 
 class OCRWord(TypedDict):
@@ -240,6 +252,64 @@ def build_contents(image_bytes: bytes, context_text: Optional[str]) -> List[type
     return [types.Content(role="user", parts=parts)]
 
 
+def build_batch_contents(requests: List[CropRequest]) -> List[types.Content]:
+    prompt: str = (
+        "You are an assistant that identifies retail products. "
+        f"You are given {len(requests)} cropped product images, each introduced by 'Image N:'. "
+        "Identify each product independently and respond with a JSON array containing one object "
+        "per image, with the keys image_index (the N of its image), product_name, brand, and price. "
+        "If any value is unknown, use null. "
+        "Price should be a numeric string without currency symbols."
+    )
+
+    parts: List[types.Part] = [types.Part.from_text(text=prompt)]
+
+    for image_index, request in enumerate(requests, start=1):
+        parts.append(types.Part.from_text(text=f"Image {image_index}:"))
+        parts.append(types.Part.from_bytes(data=request["image_bytes"], mime_type="image/png"))
+        if request["context_text"]:
+            parts.append(
+                types.Part.from_text(
+                    text=f"Text located directly beneath product {image_index}: {request['context_text']}"
+                )
+            )
+
+    return [types.Content(role="user", parts=parts)]
+
+
+BATCH_RESPONSE_SCHEMA: types.Schema = types.Schema(
+    type=types.Type.ARRAY,
+    items=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "image_index": types.Schema(type=types.Type.INTEGER),
+            "product_name": types.Schema(type=types.Type.STRING, nullable=True),
+            "brand": types.Schema(type=types.Type.STRING, nullable=True),
+            "price": types.Schema(type=types.Type.STRING, nullable=True),
+        },
+        required=["image_index", "product_name", "brand", "price"],
+    ),
+)
+
+
+def extract_response_text(response: Any) -> str:
+    response_text: str = getattr(response, "text", "") or ""
+
+    if not response_text and hasattr(response, "candidates"):
+        candidates: Any = getattr(response, "candidates", [])
+        if candidates:
+            first_candidate: Any = candidates[0]
+            content: Any = getattr(first_candidate, "content", None)
+            if content is not None:
+                parts: Any = getattr(content, "parts", None)
+                if isinstance(parts, list):
+                    response_text = "".join(
+                        part.text for part in parts if hasattr(part, "text")
+                    )
+
+    return response_text
+
+
 def parse_response_text(text: str) -> Dict[str, Any]:
     cleaned_text: str = text.strip()
 
@@ -306,19 +376,7 @@ async def call_gemini(
         config=generate_content_config,
     )
 
-    response_text: str = getattr(response, "text", "")
-
-    if not response_text and hasattr(response, "candidates"):
-        candidates: Any = getattr(response, "candidates", [])
-        if candidates:
-            first_candidate: Any = candidates[0]
-            content: Any = getattr(first_candidate, "content", None)
-            if content is not None:
-                parts: Any = getattr(content, "parts", None)
-                if isinstance(parts, list):
-                    response_text = "".join(
-                        part.text for part in parts if hasattr(part, "text")
-                    )
+    response_text: str = extract_response_text(response)
 
     parsed: Dict[str, Any] = parse_response_text(response_text)
     parsed.setdefault("product_name", None)
@@ -329,6 +387,63 @@ async def call_gemini(
     return parsed
 
 
+async def call_gemini_batch(
+    client: genai.Client,
+    requests: List[CropRequest],
+) -> List[Dict[str, Any]]:
+    contents: List[types.Content] = build_batch_contents(requests)
+
+    generate_content_config = types.GenerateContentConfig(
+        thinking_config=types.ThinkingConfig(thinking_budget=0),
+        safety_settings=[
+            types.SafetySetting(
+                category="HARM_CATEGORY_HARASSMENT",
+                threshold="BLOCK_NONE",
+            )
+        ],
+        response_mime_type="application/json",
+        response_schema=BATCH_RESPONSE_SCHEMA,
+    )
+
+    response = await asyncio.to_thread(
+        client.models.generate_content,
+        model=MODEL_NAME,
+        contents=contents,
+        config=generate_content_config,
+    )
+
+    try:
+        parsed: Any = json.loads(extract_response_text(response))
+    except json.JSONDecodeError as exc:
+        raise BatchResponseError(f"Batch response is not valid JSON: {exc}") from exc
+
+    results: List[Dict[str, Any]] = demultiplex_results(parsed, len(requests))
+
+    for request, result in zip(requests, results):
+        result.pop("image_index", None)
+        result.setdefault("product_name", None)
+        result.setdefault("brand", None)
+        result.setdefault("price", None)
+        result["detection_index"] = request["detection_index"]
+
+    return results
+
+
+def create_crop_batcher(client: genai.Client) -> GeminiBatcher:
+    return GeminiBatcher(
+        send_batch=lambda requests: call_gemini_batch(client, requests),
+        send_single=lambda request: call_gemini(
+            client,
+            request["image_bytes"],
+            request["detection_index"],
+            request["context_text"],
+        ),
+        max_batch_size=GEMINI_BATCH_SIZE,
+        max_wait=GEMINI_BATCH_WINDOW,
+        name="crop classification",
+    )
+
+
 async def process_detections(
     image_path: Path,
     detections: List[Dict[str, Any]],
@@ -344,6 +459,7 @@ async def process_detections(
     image_height: int = int(image.shape[0])
     image_width: int = int(image.shape[1])
 
+    batcher: GeminiBatcher = create_crop_batcher(gemini_client)
     tasks: List[asyncio.Task[Dict[str, Any]]] = []
     crops: Dict[int, bytes] = {}
     context_by_index: Dict[int, Optional[str]] = {}
@@ -373,11 +489,12 @@ async def process_detections(
         context_by_index[index] = context_text
         tasks.append(
             asyncio.create_task(
-                call_gemini(
-                    gemini_client,
-                    crop_bytes,
-                    index,
-                    context_text,
+                batcher.submit(
+                    CropRequest(
+                        image_bytes=crop_bytes,
+                        detection_index=index,
+                        context_text=context_text,
+                    )
                 )
             )
         )
@@ -386,6 +503,11 @@ async def process_detections(
         return []
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
+    batch_stats: Dict[str, Any] = batcher.stats()
+    print(
+        f"Gemini requests: {batch_stats['requests']} for {batch_stats['items']} crops "
+        f"({batch_stats['fallbacks']} batch fallbacks)"
+    )
 
     parsed_results: List[Dict[str, Any]] = []
     for result in results:
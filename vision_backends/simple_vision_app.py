@@ -11,7 +11,6 @@ import base64
 import threading
 import time
 import os
-import asyncio
 import json
 from datetime import datetime
 
@@ -356,12 +355,10 @@ def simulate_product_detection():
     try:
         # Import here to avoid circular imports
         from vision_sustainability_backend import vision_analyzer
+        from async_runner import run_coroutine
         
-        # Run async analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(detected_product))
-        loop.close()
+        # Run async analysis on the shared background event loop
+        result = run_coroutine(vision_analyzer.analyze_detected_product(detected_product))
         
         # Emit results to all connected clients
         socketio.emit('product_analysis_result', result)
@@ -418,12 +415,10 @@ def handle_analyze_product(data):
     try:
         # Import here to avoid circular imports
         from vision_sustainability_backend import vision_analyzer
+        from async_runner import run_coroutine
         
-        # Run async analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(data))
-        loop.close()
+        # Run async analysis on the shared background event loop
+        result = run_coroutine(vision_analyzer.analyze_detected_product(data))
         
         # Emit results to all connected clients
         emit('product_analysis_result', result)
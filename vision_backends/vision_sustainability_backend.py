@@ -24,10 +24,11 @@ import sys
 sys.path.append('/Users/ethanwang/hackharvard/google-gemini/backend')
 
 from real_grocery_scorer_oxylabs import RealGroceryScorerOxylabs
-from nutrition_fetcher import NutritionFetcher
+from nutrition_fetcher import get_nutrition_fetcher
 from simple_news_scorer import SimpleNewsScorer
 from sustainability_scorer import SustainabilityScorer
 from tts_service import PriceComparisonTTS
+from async_runner import run_coroutine
 
 class VisionSustainabilityAnalyzer:
     """
@@ -45,7 +46,7 @@ class VisionSustainabilityAnalyzer:
             oxylabs_password=os.getenv('OXYLABS_PASSWORD')
         )
         
-        self.nutrition_fetcher = NutritionFetcher(os.getenv('USDA_API_KEY'))
+        self.nutrition_fetcher = get_nutrition_fetcher(os.getenv('USDA_API_KEY'))
         self.news_scorer = SimpleNewsScorer(
             news_api_key=os.getenv('GNEWS_API_KEY') or os.getenv('NEWS_API_KEY'),
             usda_api_key=os.getenv('USDA_API_KEY'),
@@ -148,9 +149,9 @@ class VisionSustainabilityAnalyzer:
             Dictionary with nutrition analysis
         """
         try:
-            # Use USDA API to get nutrition data
-            from nutrition_fetcher import fetch_nutrition_data
-            nutrition_data = fetch_nutrition_data(product_name, self.nutrition_fetcher.api_key)
+            # Use USDA API to get nutrition data (shared fetcher, cached responses);
+            # blocking calls run on a worker thread so the shared event loop stays free
+            nutrition_data = await asyncio.to_thread(self.nutrition_fetcher.fetch_nutrition_for_product, product_name)
             
             if nutrition_data and nutrition_data.get('nutrition_data'):
                 # Calculate nutrition score
@@ -201,7 +202,8 @@ class VisionSustainabilityAnalyzer:
             }
             
             # Get sustainability analysis
-            sustainability_analysis = self.grocery_scorer.analyze_grocery_product(
+            sustainability_analysis = await asyncio.to_thread(
+                self.grocery_scorer.analyze_grocery_product,
                 mock_product, use_usda_nutrition=False  # We already have nutrition separately
             )
             
@@ -250,7 +252,7 @@ class VisionSustainabilityAnalyzer:
                 detected_price_float = 0.0
             
             # Search for online prices
-            online_products = self.grocery_scorer.scrape_grocery_products(product_name, num_results=5)
+            online_products = await asyncio.to_thread(self.grocery_scorer.scrape_grocery_products, product_name, num_results=5)
             
             if online_products and 'products' in online_products and online_products['products']:
                 products = online_products['products']
@@ -368,7 +370,7 @@ class VisionSustainabilityAnalyzer:
                     announcement += " Prices are similar online and in store."
             
             # Generate audio
-            audio_data = self.tts_service.tts.text_to_speech(announcement.strip())
+            audio_data = await asyncio.to_thread(self.tts_service.tts.text_to_speech, announcement.strip())
             if audio_data:
                 filename = f"product_announcement_{int(time.time())}.mp3"
                 self.tts_service.tts.save_audio(audio_data, filename)
@@ -407,11 +409,8 @@ def analyze_product_endpoint():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Run async analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(data))
-        loop.close()
+        # Run async analysis on the shared background event loop
+        result = run_coroutine(vision_analyzer.analyze_detected_product(data))
         
         return jsonify(result)
         
@@ -422,11 +421,8 @@ def analyze_product_endpoint():
 def handle_analyze_product(data):
     """Handle real-time product analysis via WebSocket"""
     try:
-        # Run async analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(vision_analyzer.analyze_detected_product(data))
-        loop.close()
+        # Run async analysis on the shared background event loop
+        result = run_coroutine(vision_analyzer.analyze_detected_product(data))
         
         # Emit results to all connected clients
         emit('product_analysis_result', result)